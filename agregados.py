@@ -0,0 +1,119 @@
+"""
+Cubo de agregados Región × Cluster × Nivel de Riesgo.
+
+Cada celda guarda el número de sucursales y, por métrica, la suma y el
+número de valores no nulos. Con eso los KPIs, las tablas por región y por
+cluster, la distribución cluster/riesgo y el resumen ejecutivo se derivan
+sumando celdas, sin volver a recorrer las filas en cada interacción.
+"""
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONES = ['Región', 'Cluster_KM', 'Nivel_Riesgo']
+
+METRICAS = [
+    'Capital_Dispersado_Actual',
+    'Saldo_Insoluto_Total_Actual',
+    'Saldo_Insoluto_Vencido_Actual',
+    'FPD_Actual',
+    'ICV_Actual',
+    'Tasa_Morosidad',
+    'Score_Riesgo',
+]
+
+# Columnas de las tablas "Por Región" / "Por Cluster": (nombre, métrica, agregación)
+COLUMNAS_TABLA = [
+    ('Capital_Dispersado', 'Capital_Dispersado_Actual', 'suma'),
+    ('Saldo_Insoluto', 'Saldo_Insoluto_Total_Actual', 'suma'),
+    ('Saldo_Vencido', 'Saldo_Insoluto_Vencido_Actual', 'suma'),
+    ('FPD_Promedio', 'FPD_Actual', 'promedio'),
+    ('ICV_Promedio', 'ICV_Actual', 'promedio'),
+    ('Morosidad_Promedio', 'Tasa_Morosidad', 'promedio'),
+    ('Score_Riesgo', 'Score_Riesgo', 'promedio'),
+]
+
+
+def _promedio(suma, n):
+    # Igual que pandas.mean(): NaN cuando no hay valores
+    return np.divide(suma, n, out=np.full(np.shape(suma), np.nan), where=np.asarray(n) > 0)
+
+
+class CuboAgregado:
+    """
+    Agregados por celda (Región, Cluster_KM, Nivel_Riesgo).
+
+    Args:
+        celdas: DataFrame indexado por DIMENSIONES con la columna 'n' y las
+            columnas '<métrica>_suma' / '<métrica>_n'
+    """
+
+    def __init__(self, celdas: pd.DataFrame):
+        self.celdas = celdas
+
+    @classmethod
+    def desde_filas(cls, df: pd.DataFrame, metricas: List[str] = METRICAS) -> 'CuboAgregado':
+        """Construye el cubo con un solo groupby sobre las filas de sucursales"""
+        grupos = df.groupby(DIMENSIONES, dropna=False, sort=True)
+        celdas = grupos.size().to_frame('n')
+        sumas = grupos[metricas].sum()
+        conteos = grupos[metricas].count()
+        for m in metricas:
+            celdas[f'{m}_suma'] = sumas[m]
+            celdas[f'{m}_n'] = conteos[m]
+        return cls(celdas)
+
+    def seleccionar(self, regiones: Optional[Iterable] = None, clusters: Optional[Iterable] = None,
+                    niveles: Optional[Iterable] = None) -> 'CuboAgregado':
+        """Sub-cubo con las celdas de los valores dados (None o vacío = todos)"""
+        mascara = np.ones(len(self.celdas), dtype=bool)
+        for dim, valores in zip(DIMENSIONES, (regiones, clusters, niveles)):
+            if valores:
+                mascara &= self.celdas.index.get_level_values(dim).isin(list(valores))
+        return CuboAgregado(self.celdas[mascara])
+
+    @property
+    def num_sucursales(self) -> int:
+        return int(self.celdas['n'].sum())
+
+    def suma(self, metrica: str) -> float:
+        return float(self.celdas[f'{metrica}_suma'].sum())
+
+    def promedio(self, metrica: str) -> float:
+        return float(_promedio(self.suma(metrica), self.celdas[f'{metrica}_n'].sum()))
+
+    def num_valores(self, dimension: str) -> int:
+        """Número de valores distintos (no nulos) de una dimensión con sucursales"""
+        valores = self.celdas.index.get_level_values(dimension)[self.celdas['n'].to_numpy() > 0]
+        return int(valores.dropna().nunique())
+
+    def conteo(self, dimensiones: List[str]) -> pd.Series:
+        """Número de sucursales por combinación de dimensiones (sin grupos vacíos ni nulos)"""
+        conteo = self.celdas['n'].groupby(level=dimensiones, dropna=True).sum()
+        return conteo[conteo > 0]
+
+    def por(self, dimension: str, nombre: Optional[str] = None) -> pd.DataFrame:
+        """
+        Tabla de métricas por una dimensión, con las mismas columnas que el
+        groupby(...).agg(...) que usaban las pestañas del dashboard.
+
+        Args:
+            dimension: 'Región', 'Cluster_KM' o 'Nivel_Riesgo'
+            nombre: Nombre de la columna de la dimensión en la tabla (por defecto la dimensión)
+
+        Returns:
+            DataFrame con Num_Sucursales y las columnas de COLUMNAS_TABLA
+        """
+        grupos = self.celdas.groupby(level=dimension, dropna=True).sum()
+        grupos = grupos[grupos['n'] > 0]
+
+        tabla = pd.DataFrame({nombre or dimension: grupos.index.to_numpy()})
+        tabla['Num_Sucursales'] = grupos['n'].to_numpy()
+        for columna, metrica, agregacion in COLUMNAS_TABLA:
+            suma = grupos[f'{metrica}_suma'].to_numpy(dtype=np.float64)
+            if agregacion == 'suma':
+                tabla[columna] = suma
+            else:
+                tabla[columna] = _promedio(suma, grupos[f'{metrica}_n'].to_numpy())
+        return tabla
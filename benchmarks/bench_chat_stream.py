@@ -0,0 +1,76 @@
+"""
+Benchmark del chat de DigiBot con y sin streaming contra un servidor local
+que imita a Gemini: la primera parte de la respuesta tarda --latencia
+segundos y el resto se genera en --fragmentos pedazos separados por
+--retardo segundos.
+
+Mide el tiempo hasta el primer texto visible (TTFT) y el tiempo total de
+chat_with_digibot (bloqueante) contra chat_with_digibot_stream, y verifica
+que ambos devuelven el mismo texto.
+
+Uso:
+    python benchmarks/bench_chat_stream.py [--latencia 0.4] [--fragmentos 20] [--retardo 0.1]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Al final de sys.path para no ocultar el módulo types de la biblioteca estándar
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from servidor_gemini import ServidorGemini, respuesta_texto  # noqa: E402
+
+RESPUESTA = ("La sucursal presenta un ICV por encima del promedio regional y una tendencia "
+             "creciente en FPD durante los últimos seis periodos. Se recomienda revisar la "
+             "originación reciente y reforzar la cobranza temprana. ") * 3
+
+HISTORIAL = [
+    {'role': 'user', 'parts': [{'text': '¿Cómo va la sucursal?'}]},
+    {'role': 'model', 'parts': [{'text': 'Tiene riesgo alto.'}]},
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latencia", type=float, default=0.4, help="Segundos hasta el primer fragmento")
+    parser.add_argument("--fragmentos", type=int, default=20)
+    parser.add_argument("--retardo", type=float, default=0.1, help="Segundos entre fragmentos")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    with ServidorGemini(latencia=args.latencia, responder=lambda ruta, cuerpo: respuesta_texto(RESPUESTA),
+                        fragmentos=args.fragmentos, retardo_fragmento=args.retardo) as servidor:
+        os.environ["GEMINI_BASE_URL"] = servidor.url
+        os.environ["GEMINI_API_KEY"] = "clave-de-prueba"
+        from geminiPrueba import chat_with_digibot, chat_with_digibot_stream
+
+        resultados = {"bloqueante": ([], []), "stream": ([], [])}
+        for _ in range(args.repeticiones):
+            inicio = time.perf_counter()
+            texto = chat_with_digibot(HISTORIAL, "¿Qué hago?", "contexto")
+            total = time.perf_counter() - inicio
+            assert texto == RESPUESTA
+            resultados["bloqueante"][0].append(total)
+            resultados["bloqueante"][1].append(total)
+
+            inicio = time.perf_counter()
+            primero = None
+            partes = []
+            for fragmento in chat_with_digibot_stream(HISTORIAL, "¿Qué hago?", "contexto"):
+                if primero is None:
+                    primero = time.perf_counter() - inicio
+                partes.append(fragmento)
+            total = time.perf_counter() - inicio
+            assert "".join(partes) == RESPUESTA
+            resultados["stream"][0].append(primero)
+            resultados["stream"][1].append(total)
+
+        print(f"{'modo':>11} {'primer texto s':>15} {'total s':>8}")
+        for modo, (ttft, total) in resultados.items():
+            print(f"{modo:>11} {statistics.median(ttft):>15.2f} {statistics.median(total):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark del cliente de Gemini compartido (cliente_gemini.py) contra crear
+un genai.Client nuevo en cada llamada, como hacía geminiPrueba.
+
+Ambos modos llaman a generate_content contra un servidor local que imita la
+API (benchmarks/servidor_gemini.py), así que lo que se mide es solo el costo
+del lado del cliente: resolver la key, construir el cliente y abrir la
+conexión (con --tls, incluido el handshake). También cuenta cuántas
+conexiones recibe el servidor en cada modo.
+
+Uso:
+    python benchmarks/bench_cliente_gemini.py [--llamadas 200] [--hilos 1 8] [--tls]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from dotenv import load_dotenv
+from google import genai
+
+# Al final de sys.path para no ocultar el módulo types de la biblioteca estándar
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cliente_gemini import ProveedorGemini  # noqa: E402
+from servidor_gemini import ServidorGemini  # noqa: E402
+
+MODELO = "gemini-2.5-flash"
+
+
+def resolver_key_original():
+    """Lo que hacía get_gemini_key() en cada llamada (sin st.secrets, que requiere la app)"""
+    load_dotenv()
+    import streamlit  # noqa: F401
+    return os.getenv("GEMINI_API_KEY")
+
+
+def llamada_por_cliente_nuevo(base_url):
+    cliente = genai.Client(api_key=resolver_key_original(), http_options={"base_url": base_url})
+    return cliente.models.generate_content(model=MODELO, contents="hola").text
+
+
+def llamada_compartida(proveedor):
+    return proveedor.cliente().models.generate_content(model=MODELO, contents="hola").text
+
+
+def medir(funcion, llamadas, hilos):
+    """Tiempos por llamada (ms) y tiempo total (s)"""
+    def cronometrar(_):
+        inicio = time.perf_counter()
+        funcion()
+        return (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        tiempos = list(pool.map(cronometrar, range(llamadas)))
+    return tiempos, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--llamadas", type=int, default=200)
+    parser.add_argument("--hilos", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--tls", action="store_true", help="Servir por HTTPS (requiere openssl)")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GEMINI_API_KEY", "clave-de-prueba")
+    with ServidorGemini(tls=args.tls) as servidor:
+        if servidor.certificado:
+            # Confía en el certificado autofirmado: Session.send (cliente nuevo) usa
+            # el bundle por defecto de requests y Session.request (compartido) el
+            # de REQUESTS_CA_BUNDLE si está definido
+            requests.adapters.DEFAULT_CA_BUNDLE_PATH = servidor.certificado
+            os.environ["REQUESTS_CA_BUNDLE"] = servidor.certificado
+        proveedor = ProveedorGemini(resolver_key_original, base_url=servidor.url)
+        modos = {
+            "cliente nuevo": lambda: llamada_por_cliente_nuevo(servidor.url),
+            "compartido": lambda: llamada_compartida(proveedor),
+        }
+
+        # Calentamiento: imports, primera resolución de la key y creación del cliente
+        for funcion in modos.values():
+            funcion()
+
+        print(f"{'modo':>14} {'hilos':>6} {'p50 ms':>8} {'p95 ms':>8} {'llamadas/s':>11} {'conexiones':>11}")
+        for hilos in args.hilos:
+            por_segundo = {}
+            for nombre, funcion in modos.items():
+                servidor.reiniciar_contadores()
+                tiempos, total = medir(funcion, args.llamadas, hilos)
+                p95 = statistics.quantiles(tiempos, n=20)[-1]
+                por_segundo[nombre] = args.llamadas / total
+                print(f"{nombre:>14} {hilos:>6} {statistics.median(tiempos):>8.2f} {p95:>8.2f} "
+                      f"{por_segundo[nombre]:>11.0f} {servidor.conexiones:>11}")
+            # Costo de cliente por llamada = diferencia de tiempo total por llamada
+            ahorro = (1 / por_segundo["cliente nuevo"] - 1 / por_segundo["compartido"]) * 1000
+            print(f"{'':>14} {'':>6} ahorro por llamada: {ahorro:.2f} ms "
+                  f"({por_segundo['compartido'] / por_segundo['cliente nuevo']:.1f}x llamadas/s)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compara el índice espacial (espacial.py) contra recorrer todas las
+sucursales para las consultas de k vecinos y de radio, con coordenadas
+sintéticas repartidas como en load_data (±1° alrededor de cada región).
+
+Uso:
+    python benchmarks/bench_espacial.py [--sucursales 200 10000 100000] [--consultas 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Al final de sys.path para no ocultar el módulo types de la biblioteca estándar
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from espacial import IndiceEspacial, distancia_km  # noqa: E402
+
+CENTROS = np.array([(28.6353, -106.0889), (16.7569, -93.1292), (19.0414, -98.2063),
+                    (20.5888, -100.3899), (20.6597, -103.3496), (21.1619, -86.8515)])
+
+
+def coordenadas(n: int, rng):
+    centro = CENTROS[rng.integers(len(CENTROS), size=n)]
+    return centro[:, 0] + rng.uniform(-1, 1, n), centro[:, 1] + rng.uniform(-1, 1, n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sucursales", type=int, nargs="+", default=[200, 10000, 100000])
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--radio", type=float, default=100.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"{'sucursales':>10} {'índice ms':>10} {'knn idx µs':>11} {'knn scan µs':>12} "
+          f"{'radio idx µs':>13} {'radio scan µs':>14}")
+    for n in args.sucursales:
+        lat, lon = coordenadas(n, rng)
+        inicio = time.perf_counter()
+        indice = IndiceEspacial(lat, lon)
+        construccion = (time.perf_counter() - inicio) * 1000
+        consultas = rng.integers(n, size=args.consultas)
+
+        tiempos = {}
+        inicio = time.perf_counter()
+        for i in consultas:
+            indice.vecinos(lat[i], lon[i], args.k, excluir=i)
+        tiempos['knn_idx'] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for i in consultas:
+            d = distancia_km(lat[i], lon[i], lat, lon)
+            d[i] = np.inf
+            cercanas = np.argpartition(d, args.k)[:args.k]
+            cercanas[np.argsort(d[cercanas])]
+        tiempos['knn_scan'] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for i in consultas:
+            indice.en_radio(lat[i], lon[i], args.radio, excluir=i)
+        tiempos['radio_idx'] = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for i in consultas:
+            d = distancia_km(lat[i], lon[i], lat, lon)
+            d[i] = np.inf
+            dentro = np.flatnonzero(d <= args.radio)
+            dentro[np.argsort(d[dentro])]
+        tiempos['radio_scan'] = time.perf_counter() - inicio
+
+        por_consulta = {k: v / args.consultas * 1e6 for k, v in tiempos.items()}
+        print(f"{n:>10,} {construccion:>10.1f} {por_consulta['knn_idx']:>11.0f} {por_consulta['knn_scan']:>12.0f} "
+              f"{por_consulta['radio_idx']:>13.0f} {por_consulta['radio_scan']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
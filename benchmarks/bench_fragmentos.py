@@ -0,0 +1,90 @@
+"""
+Tiempo de rerun de las interacciones locales del dashboard antes y después
+de convertir sus secciones en fragmentos (st.fragment).
+
+Cada interacción se ejecuta con streamlit.testing (AppTest), que siempre
+vuelve a correr el script completo: ese tiempo es el rerun de antes. El
+tiempo de la sección que anota tiempos.cronometrar() es lo que cuesta el
+rerun del fragmento en el navegador, donde solo se ejecuta esa función.
+
+Uso:
+    python benchmarks/bench_fragmentos.py [--repeticiones 5] [--sucursal "Aguas Central"]
+"""
+import argparse
+import os
+import statistics
+import sys
+
+# Al final de sys.path para no ocultar el módulo types de la biblioteca estándar
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from ranking import METRICAS_RANKING  # noqa: E402
+from tiempos import SCRIPT_COMPLETO  # noqa: E402
+
+
+def tiempos(at):
+    return {seccion: registro['ms'] for seccion, registro in at.session_state['tiempos_rerun'].items()}
+
+
+def interacciones_principal(at, i):
+    """(nombre, sección que debería volver a ejecutarse, acción sobre AppTest)"""
+    metricas = list(METRICAS_RANKING)
+    familias = at.selectbox(key='tendencia_familia').options
+    sucursales = at.selectbox(key='vecindario_sucursal').options
+    return [
+        ("Página del ranking", "Ranking",
+         lambda: at.number_input(key='ranking_pagina').set_value(1 + i % 2)),
+        ("Métrica del ranking", "Ranking",
+         lambda: at.selectbox(key='ranking_metrica').set_value(metricas[(i + 1) % len(metricas)])),
+        ("Vecindario en el mapa", "Mapa",
+         lambda: at.selectbox(key='vecindario_sucursal').set_value(sucursales[i % len(sucursales)])),
+        ("Radio del vecindario", "Mapa",
+         lambda: at.slider(key='vecindario_radio').set_value(100 + 10 * (i % 5))),
+        ("Indicador de deterioro", "Deterioro",
+         lambda: at.selectbox(key='tendencia_familia').set_value(familias[(i + 1) % len(familias)])),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--sucursal", default="Aguas Central", help="Sucursal del detalle")
+    args = parser.parse_args()
+
+    os.chdir(RAIZ)
+    at = AppTest.from_file(os.path.join(RAIZ, "reto.py"), default_timeout=120)
+    at.run()
+    medidas = {}
+    for i in range(args.repeticiones):
+        for nombre, seccion, accion in interacciones_principal(at, i):
+            accion()
+            at.run()
+            medida = tiempos(at)
+            medidas.setdefault(nombre, (seccion, [], []))
+            medidas[nombre][1].append(medida[SCRIPT_COMPLETO])
+            medidas[nombre][2].append(medida[seccion])
+
+    # Página de detalle: el radio de "Sucursales Cercanas"
+    at.session_state['selected_sucursal'] = args.sucursal
+    at.session_state['page'] = 'detail'
+    at.run()
+    for i in range(args.repeticiones):
+        at.slider(key='radio_vecinos').set_value(50 + 10 * (i % 5)).run()
+        medida = tiempos(at)
+        medidas.setdefault("Radio de vecinos (detalle)", ("Sucursales cercanas", [], []))
+        medidas["Radio de vecinos (detalle)"][1].append(medida[SCRIPT_COMPLETO])
+        medidas["Radio de vecinos (detalle)"][2].append(medida["Sucursales cercanas"])
+
+    if at.exception:
+        print("Excepciones:", [e.value for e in at.exception])
+    print(f"Mediana de {args.repeticiones} reruns por interacción")
+    print(f"{'interacción':<30} {'sección':<20} {'script ms':>10} {'fragmento ms':>13} {'x':>6}")
+    for nombre, (seccion, completo, fragmento) in medidas.items():
+        antes, despues = statistics.median(completo), statistics.median(fragmento)
+        print(f"{nombre:<30} {seccion:<20} {antes:>10.1f} {despues:>13.1f} {antes / max(despues, 1e-3):>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
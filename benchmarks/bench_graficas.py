@@ -0,0 +1,133 @@
+"""
+Rerun de las páginas con las gráficas de Altair convertidas en cada rerun
+(st.altair_chart) contra las especificaciones memorizadas de graficas.py, y
+bytes de gráficas que viajan por el websocket en cada rerun.
+
+Las páginas se ejecutan con streamlit.testing (AppTest). Los bytes se
+estiman con la regla de la caché de mensajes de Streamlit: un elemento
+idéntico a uno ya enviado viaja como referencia (~50 bytes) solo si pesa al
+menos global.minCachedMessageSize; se comparan el valor por omisión (10 KB)
+y el de .streamlit/config.toml.
+
+Uso:
+    python benchmarks/bench_graficas.py [--repeticiones 10] [--sucursal "Aguas Central"]
+"""
+import argparse
+import hashlib
+import os
+import statistics
+import sys
+import time
+
+# Al final de sys.path para no ocultar el módulo types de la biblioteca estándar
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+from streamlit import config  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import graficas  # noqa: E402
+
+BYTES_REFERENCIA = 50
+MINIMO_POR_OMISION = 10_000
+
+
+class CanalSimulado:
+    """Bytes de gráficas enviados por rerun con la caché de mensajes de Streamlit"""
+
+    def __init__(self, minimo: int):
+        self.minimo = minimo
+        self.vistos = set()
+
+    def enviar(self, protos) -> int:
+        total = 0
+        for proto in protos:
+            datos = proto.SerializeToString(deterministic=True)
+            huella = hashlib.md5(datos).hexdigest()
+            if len(datos) >= self.minimo and huella in self.vistos:
+                total += BYTES_REFERENCIA
+            else:
+                total += len(datos)
+            self.vistos.add(huella)
+        return total
+
+
+def graficas_de(at):
+    return [elemento.proto for elemento in at.get('arrow_vega_lite_chart')]
+
+
+def medir(memorizar: bool, args, minimo_config: int):
+    """Mediana del rerun completo y bytes de gráficas por rerun, página principal y detalle"""
+    anterior = graficas.GRAFICAS.memorizar
+    # Sin memorizar, CacheGraficas.dibujar usa st.altair_chart como antes
+    graficas.GRAFICAS.memorizar = memorizar
+    graficas.GRAFICAS.limpiar()
+    try:
+        at = AppTest.from_file(os.path.join(RAIZ, "reto.py"), default_timeout=120)
+        at.run()
+        canales = {m: CanalSimulado(m) for m in (MINIMO_POR_OMISION, minimo_config)}
+        for canal in canales.values():
+            canal.enviar(graficas_de(at))
+        regiones = at.selectbox(key='region_filter_reto').options[:2]
+        resultados = {}
+        escenarios = [
+            ("Principal, mismos datos", lambda i: None),
+            ("Principal, alterna región", lambda i: at.selectbox(key='region_filter_reto')
+             .set_value(regiones[i % 2])),
+        ]
+        for nombre, accion in escenarios:
+            tiempos, bytes_ = [], {m: [] for m in canales}
+            for i in range(args.repeticiones):
+                accion(i)
+                inicio = time.perf_counter()
+                at.run()
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                for m, canal in canales.items():
+                    bytes_[m].append(canal.enviar(graficas_de(at)))
+            resultados[nombre] = (tiempos, bytes_)
+
+        at.session_state['selected_sucursal'] = args.sucursal
+        at.session_state['page'] = 'detail'
+        at.run()
+        for canal in canales.values():
+            canal.enviar(graficas_de(at))
+        tiempos, bytes_ = [], {m: [] for m in canales}
+        for _ in range(args.repeticiones):
+            inicio = time.perf_counter()
+            at.run()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            for m, canal in canales.items():
+                bytes_[m].append(canal.enviar(graficas_de(at)))
+        resultados["Detalle, mismos datos"] = (tiempos, bytes_)
+        if at.exception:
+            print("Excepciones:", [e.value for e in at.exception])
+        return resultados, graficas.GRAFICAS
+    finally:
+        graficas.GRAFICAS.memorizar = anterior
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--sucursal", default="Aguas Central", help="Sucursal del detalle")
+    args = parser.parse_args()
+
+    os.chdir(RAIZ)
+    config.get_config_options(force_reparse=True)
+    minimo_config = int(config.get_option("global.minCachedMessageSize"))
+
+    print(f"Mediana de {args.repeticiones} reruns; bytes de gráficas con minCachedMessageSize "
+          f"{MINIMO_POR_OMISION:,} (por omisión) y {minimo_config:,} (config.toml)")
+    print(f"{'modo':<14} {'escenario':<28} {'rerun ms':>9} {'bytes 10KB':>11} {'bytes config':>13}")
+    for memorizar in (False, True):
+        resultados, cache = medir(memorizar, args, minimo_config)
+        modo = "memorizada" if memorizar else "altair_chart"
+        for nombre, (tiempos, bytes_) in resultados.items():
+            print(f"{modo:<14} {nombre:<28} {statistics.median(tiempos):>9.1f} "
+                  f"{statistics.median(bytes_[MINIMO_POR_OMISION]):>11,.0f} "
+                  f"{statistics.median(bytes_[minimo_config]):>13,.0f}")
+        if memorizar:
+            print(f"caché: {cache.aciertos} aciertos, {cache.fallos} conversiones")
+
+
+if __name__ == "__main__":
+    main()
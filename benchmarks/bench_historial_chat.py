@@ -0,0 +1,45 @@
+"""
+Simula una conversación larga con DigiBot y compara, turno por turno, el
+tamaño estimado del prompt con el historial acotado (historial_chat.py)
+contra reenviar el historial completo. No hace llamadas a Gemini.
+
+Uso:
+    python benchmarks/bench_historial_chat.py [--turnos 30] [--presupuesto 1500]
+"""
+import argparse
+import os
+import sys
+
+# Al final de sys.path para no ocultar el módulo types de la biblioteca estándar
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from historial_chat import HistorialChat, estimar_tokens  # noqa: E402
+
+INSTRUCCION = "Rol del Agente: DigiBot. " * 40
+RESPUESTA = ("La sucursal muestra un ICV de 7.8% con tendencia creciente en los últimos "
+             "seis periodos; el FPD se mantiene por arriba del promedio regional. ") * 6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turnos", type=int, default=30)
+    parser.add_argument("--presupuesto", type=int, default=1500)
+    args = parser.parse_args()
+
+    historial = HistorialChat(presupuesto_tokens=args.presupuesto)
+    print(f"{'turno':>5} {'prompt':>8} {'completo':>9} {'ahorro':>7} {'resumidos':>10}")
+    for i in range(1, args.turnos + 1):
+        pregunta = f"Pregunta {i}: ¿cómo se compara la sucursal {i} con su región en FPD e ICV?"
+        metrica = historial.registrar_prompt(INSTRUCCION, pregunta)
+        # Lo que realmente se envía debe coincidir con la estimación registrada
+        enviado = (estimar_tokens(INSTRUCCION) + estimar_tokens(pregunta)
+                   + sum(estimar_tokens(p['text']) for m in historial.mensajes() for p in m['parts']))
+        assert enviado == metrica['tokens_prompt']
+        historial.agregar(pregunta, RESPUESTA)
+        ahorro = 1 - metrica['tokens_prompt'] / metrica['tokens_sin_compactar']
+        if i == 1 or i % 5 == 0:
+            print(f"{i:>5} {metrica['tokens_prompt']:>8,} {metrica['tokens_sin_compactar']:>9,} "
+                  f"{ahorro:>7.0%} {historial.turnos_compactados:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Compara el mapa original (px.scatter_mapbox con hover_data) contra
+mapa.figura_mapa para distintos números de sucursales sintéticas: tiempo de
+construir la figura, tiempo de serializarla como lo hace st.plotly_chart y
+bytes del JSON que recibe el navegador.
+
+Uso:
+    python benchmarks/bench_mapa.py [--sucursales 200 5000 50000] [--repeticiones 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+import plotly.tools
+
+# Al final de sys.path para no ocultar el módulo types de la biblioteca estándar
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mapa import UMBRAL_PUNTOS, figura_mapa  # noqa: E402
+
+REGIONES = {
+    'Norte': (28.6353, -106.0889), 'Sur': (16.7569, -93.1292), 'Centro 1': (19.0414, -98.2063),
+    'Centro 2': (20.5888, -100.3899), 'Occidente': (20.6597, -103.3496), 'Perla': (21.1619, -86.8515),
+}
+
+
+def sucursales_sinteticas(n: int, semilla: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    region = rng.choice(list(REGIONES), n)
+    centro = np.array([REGIONES[r] for r in region])
+    return pd.DataFrame({
+        'Sucursal': [f"Sucursal {i}" for i in range(n)],
+        'Región': region,
+        'Cluster_KM': rng.integers(0, 3, n),
+        'FPD_Actual': rng.gamma(2.0, 0.5, n),
+        'ICV_Actual': rng.gamma(4.0, 2.0, n),
+        'Tasa_Morosidad': rng.gamma(4.0, 2.0, n),
+        'Score_Riesgo': rng.uniform(5, 60, n),
+        'Nivel_Riesgo': rng.choice(['Bajo', 'Medio', 'Alto'], n, p=[0.35, 0.5, 0.15]),
+        'lat': centro[:, 0] + rng.uniform(-1, 1, n),
+        'lon': centro[:, 1] + rng.uniform(-1, 1, n),
+    })
+
+
+def figura_original(df: pd.DataFrame):
+    """El mapa como lo armaba reto.py antes de mapa.py"""
+    fig = px.scatter_mapbox(
+        df, lat="lat", lon="lon", color="Nivel_Riesgo", size="Score_Riesgo", hover_name="Sucursal",
+        hover_data={"Región": True, "Cluster_KM": True, "FPD_Actual": ":.2f", "ICV_Actual": ":.2f",
+                    "Tasa_Morosidad": ":.2f", "lat": False, "lon": False, "Score_Riesgo": ":.2f"},
+        color_discrete_map={'Bajo': '#2e7d32', 'Medio': '#ef6c00', 'Alto': '#c62828'},
+        zoom=4, height=500, title=f"Sucursales Filtradas: {len(df)}",
+    )
+    fig.update_layout(mapbox_style="carto-positron", mapbox_center={"lat": 23.6345, "lon": -102.5528},
+                      margin={"r": 0, "t": 40, "l": 0, "b": 0})
+    return fig
+
+
+def serializar(fig) -> str:
+    """Lo que hace st.plotly_chart con la figura en cada rerun"""
+    return pio.to_json(plotly.tools.return_figure_from_figure_or_data(fig, validate_figure=True),
+                       validate=False)
+
+
+def medir(construir, df: pd.DataFrame, repeticiones: int):
+    construccion, serializacion = [], []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        fig = construir(df)
+        construccion.append(time.perf_counter() - inicio)
+        inicio = time.perf_counter()
+        spec = serializar(fig)
+        serializacion.append(time.perf_counter() - inicio)
+    return min(construccion) * 1000, min(serializacion) * 1000, len(spec.encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sucursales", type=int, nargs="+", default=[200, 5000, 50000])
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Umbral de agregación: {UMBRAL_PUNTOS:,} sucursales")
+    print(f"{'sucursales':>10} {'versión':>9} {'figura ms':>10} {'json ms':>8} {'payload KB':>11}")
+    for n in args.sucursales:
+        df = sucursales_sinteticas(n)
+        for nombre, construir in (("original", figura_original), ("nueva", figura_mapa)):
+            figura_ms, json_ms, bytes_spec = medir(construir, df, args.repeticiones)
+            print(f"{n:>10,} {nombre:>9} {figura_ms:>10.1f} {json_ms:>8.1f} {bytes_spec / 1024:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark del pre-análisis en lote (preanalisis.py) contra un servidor local
+que imita a Gemini con latencia y errores 429 simulados.
+
+Compara el tiempo de analizar N sucursales en serie (max_concurrentes=1)
+contra el lote concurrente, verifica que todas quedan en la caché (usa una
+caché temporal, no la del dashboard) y que un segundo lote no hace ninguna
+petición.
+
+Uso:
+    python benchmarks/bench_preanalisis.py [--sucursales 40] [--latencia 0.2]
+        [--concurrentes 1 8] [--error-cada 7] [--rpm 0]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+# Al final de sys.path para no ocultar el módulo types de la biblioteca estándar
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from servidor_gemini import ServidorGemini, respuesta_texto  # noqa: E402
+
+ANALISIS = {"causes": ["c1", "c2", "c3", "c4", "c5"],
+            "suggestions": ["s1", "s2", "s3", "s4", "s5", "s6"],
+            "riskFactor": "ICV"}
+
+
+def sucursales_sinteticas(n, semilla):
+    return [{'Sucursal': f'Sucursal {semilla}-{i}', 'Cluster_KM': 'Riesgo', 'Región': 'Norte',
+             'FPD_Neto_Actual': 10.0 + i, 'ICV_Actual': 8.0, 'Tasa_Morosidad': 12.0,
+             'Score_Riesgo': 70.0} for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sucursales", type=int, default=40)
+    parser.add_argument("--latencia", type=float, default=0.2, help="Segundos por petición")
+    parser.add_argument("--concurrentes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--error-cada", type=int, default=7, help="429 cada N peticiones")
+    parser.add_argument("--rpm", type=int, default=0, help="Peticiones por minuto (0 = sin límite)")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix="preanalisis_")
+    responder = lambda ruta, cuerpo: respuesta_texto(json.dumps(ANALISIS))  # noqa: E731
+    with ServidorGemini(latencia=args.latencia, responder=responder,
+                        error_cada=args.error_cada) as servidor:
+        # Antes de importar: el proveedor y la caché leen su configuración al cargarse
+        os.environ["GEMINI_BASE_URL"] = servidor.url
+        os.environ["GEMINI_API_KEY"] = "clave-de-prueba"
+        os.environ["DIGIBOT_CACHE_PATH"] = os.path.join(directorio, "digibot.sqlite3")
+        from geminiPrueba import cache_analisis, clave_sucursal
+        from preanalisis import preanalizar_en_lote
+
+        print(f"{'concurrentes':>12} {'segundos':>9} {'analizadas':>11} {'reintentos':>11} "
+              f"{'fallidas':>9} {'peticiones':>11}")
+        for semilla, concurrentes in enumerate(args.concurrentes):
+            sucursales = sucursales_sinteticas(args.sucursales, semilla)
+            servidor.reiniciar_contadores()
+            resumen = preanalizar_en_lote(sucursales, max_concurrentes=concurrentes,
+                                          por_minuto=args.rpm, espera_base=0.05)
+            print(f"{concurrentes:>12} {resumen['segundos']:>9.2f} {resumen['analizadas']:>11} "
+                  f"{resumen['reintentos']:>11} {len(resumen['fallidas']):>9} {servidor.peticiones:>11}")
+
+            guardadas = cache_analisis.existentes(clave_sucursal(s) for s in sucursales)
+            assert len(guardadas) == args.sucursales - len(resumen['fallidas']), "faltan análisis en la caché"
+
+            # Segundo lote: todo sale de la caché, sin peticiones
+            servidor.reiniciar_contadores()
+            repetido = preanalizar_en_lote(sucursales, max_concurrentes=concurrentes)
+            assert repetido['en_cache'] == len(guardadas) and servidor.peticiones == 0
+        print("\nOK: los análisis quedaron en la caché y un segundo lote no hizo peticiones")
+
+
+if __name__ == "__main__":
+    main()
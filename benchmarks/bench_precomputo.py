@@ -0,0 +1,73 @@
+"""
+Arranque en frío de los datos del dashboard: tablas derivadas calculadas en
+el proceso (como hacía load_data) contra la lectura del artefacto de
+precomputo.py.
+
+Ambos caminos parten del snapshot Parquet ya construido; en cada repetición
+se vacían las memorias de lectura para medir un proceso recién iniciado.
+
+Uso:
+    python benchmarks/bench_precomputo.py [--repeticiones 20] [--excel libro.xlsx]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# Al final de sys.path para no ocultar el módulo types de la biblioteca estándar
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+import historico  # noqa: E402
+import precomputo  # noqa: E402
+from agregados import CuboAgregado  # noqa: E402
+from historico import FAMILIAS_PANEL, HistoricoLazy, PanelHistorico  # noqa: E402
+from preparacion import preparar_sucursales  # noqa: E402
+from snapshot import leer_hoja  # noqa: E402
+from tendencias import TablaTendencias  # noqa: E402
+
+
+def en_proceso(excel: str):
+    historico._columnas_hoja.cache_clear()
+    historico._leer_proyeccion.cache_clear()
+    df = preparar_sucursales(leer_hoja(excel, 'Clusters_S6'))
+    cubo = CuboAgregado.desde_filas(df)
+    lazy = HistoricoLazy(excel)
+    panel = PanelHistorico.desde_ancho(lazy.cargar(familias=FAMILIAS_PANEL),
+                                       {f: lazy.columnas_familia(f) for f in FAMILIAS_PANEL})
+    return df, cubo, panel, TablaTendencias.desde_panel(panel)
+
+
+def desde_artefacto(excel: str, directorio: str):
+    for lectura in (precomputo._leer_sucursales, precomputo._leer_cubo,
+                    precomputo._leer_panel, precomputo._leer_tendencias):
+        lectura.cache_clear()
+    artefacto = precomputo.asegurar_artefacto(excel, directorio)
+    return artefacto.sucursales(), artefacto.cubo(), artefacto.panel(), artefacto.tendencias()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--excel", default="analisis_completo_sucursales_20251127_031525.xlsx")
+    args = parser.parse_args()
+
+    os.chdir(RAIZ)
+    directorio = tempfile.mkdtemp(prefix="artefacto-")
+    inicio = time.perf_counter()
+    artefacto = precomputo.construir_artefacto(args.excel, directorio)
+    print(f"Pipeline: {(time.perf_counter() - inicio) * 1000:.1f} ms (artefacto {artefacto.version})")
+
+    for nombre, funcion in [("Cálculo en el proceso", lambda: en_proceso(args.excel)),
+                            ("Lectura del artefacto", lambda: desde_artefacto(args.excel, directorio))]:
+        tiempos = []
+        for _ in range(args.repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        print(f"{nombre:<24} mediana {statistics.median(tiempos):7.1f} ms   mín {min(tiempos):7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
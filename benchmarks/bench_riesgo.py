@@ -0,0 +1,115 @@
+"""
+Benchmark de la clasificación de riesgo vectorizada (riesgo.py) contra la
+función fila por fila que usaba load_data.
+
+Verifica que ambas producen exactamente las mismas etiquetas (incluyendo
+valores en los umbrales, NaN e infinitos) y mide el tiempo de cada una al
+crecer el número de sucursales.
+
+Uso:
+    python benchmarks/bench_riesgo.py [--tamanos 1000 10000 100000 250000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Al final de sys.path para no ocultar el módulo types de la biblioteca estándar
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from riesgo import clasificar_riesgo  # noqa: E402
+
+
+def clasificar_riesgo_fila(row):
+    """Implementación original (df.apply(..., axis=1)), conservada como referencia"""
+    score = 0
+
+    # FPD
+    if row['FPD_Actual'] > 15:
+        score += 3
+    elif row['FPD_Actual'] > 8:
+        score += 2
+    elif row['FPD_Actual'] > 5:
+        score += 1
+
+    # ICV
+    if row['ICV_Actual'] > 10:
+        score += 3
+    elif row['ICV_Actual'] > 6:
+        score += 2
+    elif row['ICV_Actual'] > 3:
+        score += 1
+
+    # Morosidad
+    if row['Tasa_Morosidad'] > 10:
+        score += 3
+    elif row['Tasa_Morosidad'] > 5:
+        score += 2
+    elif row['Tasa_Morosidad'] > 2:
+        score += 1
+
+    if score >= 6:
+        return 'Alto'
+    elif score >= 3:
+        return 'Medio'
+    else:
+        return 'Bajo'
+
+
+def generar_sucursales(n, seed=0):
+    """Genera indicadores sintéticos con valores en los umbrales, NaN e infinitos"""
+    rng = np.random.default_rng(seed)
+    umbrales = np.array([0, 2, 3, 5, 6, 8, 10, 15], dtype=float)
+    df = pd.DataFrame({
+        'FPD_Actual': rng.gamma(2.0, 4.0, n),
+        'ICV_Actual': rng.gamma(2.0, 3.0, n),
+        'Tasa_Morosidad': rng.gamma(1.5, 3.0, n),
+    })
+    for col in df.columns:
+        valores = df[col].to_numpy()
+        # ~5% exactamente en un umbral, ~1% NaN, algunos infinitos
+        en_umbral = rng.random(n) < 0.05
+        valores[en_umbral] = rng.choice(umbrales, en_umbral.sum())
+        valores[rng.random(n) < 0.01] = np.nan
+        valores[rng.random(n) < 0.001] = np.inf
+    return df
+
+
+def medir(fn, *args, repeticiones=3):
+    mejor = float('inf')
+    resultado = None
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = fn(*args)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tamanos', type=int, nargs='+', default=[1_000, 10_000, 100_000, 250_000])
+    parser.add_argument('--sin-referencia-desde', type=int, default=500_000,
+                        help='No correr la versión fila por fila a partir de este tamaño')
+    args = parser.parse_args()
+
+    print(f"{'sucursales':>12} {'fila (s)':>10} {'vectorizado (s)':>16} {'aceleración':>12}  etiquetas")
+    for n in args.tamanos:
+        df = generar_sucursales(n)
+        t_vec, nuevo = medir(clasificar_riesgo, df)
+
+        if n < args.sin_referencia_desde:
+            t_fila, viejo = medir(lambda d: d.apply(clasificar_riesgo_fila, axis=1), df, repeticiones=1)
+            identicas = bool((viejo.to_numpy() == nuevo.to_numpy()).all())
+            if not identicas:
+                difs = (viejo != nuevo).sum()
+                print(f"❌ {difs} etiquetas distintas con n={n}")
+                sys.exit(1)
+            print(f"{n:>12,} {t_fila:>10.3f} {t_vec:>16.4f} {t_fila / t_vec:>11.0f}x  idénticas")
+        else:
+            print(f"{n:>12,} {'-':>10} {t_vec:>16.4f} {'-':>12}  (sin referencia)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""
+Suite de benchmarks de los cálculos del dashboard con libros sintéticos.
+
+Genera (y guarda para las siguientes corridas) libros con el esquema de
+Datos_Completos / Clusters_S6 (benchmarks/sinteticos.py) para cada
+escenario sucursales × periodos y mide, sin Streamlit ni navegador, cada
+etapa de cálculo: lectura de la hoja, preparación de load_data, motor de
+filtros y cadena de filtros de la barra lateral, cubo y agregados por región
+y cluster, índice de ranking / top 10 (y nlargest como referencia), panel
+histórico, tendencias y calcular_datos_gráficas. De cada etapa se guarda la
+mediana del tiempo y el pico de memoria de Python (tracemalloc).
+
+Con --base compara contra una línea base guardada con --guardar-base y
+termina con código 1 si alguna etapa se pasa de la tolerancia.
+
+El libro de Excel solo se escribe y se convierte a snapshot (etapa
+excel_snapshot) en los escenarios con menos de --max-celdas-excel celdas:
+openpyxl tarda ~1 minuto por millón de celdas y con 100k sucursales × 120
+periodos serían ~100 millones. Las demás etapas parten de las hojas en
+Parquet, que es lo que lee el dashboard después del primer arranque.
+
+Uso:
+    python benchmarks/bench_suite.py [--escenarios 1000x13 10000x120 ...] [--repeticiones 3]
+        [--base benchmarks/base_suite.json] [--guardar-base benchmarks/base_suite.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pyarrow.parquet as pq
+
+# Al final de sys.path para no ocultar el módulo types de la biblioteca estándar
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import snapshot  # noqa: E402
+from agregados import CuboAgregado  # noqa: E402
+from detail import calcular_datos_gráficas  # noqa: E402
+from filtros import MotorFiltros  # noqa: E402
+from historico import FAMILIAS_PANEL, PanelHistorico, prefijo_familia  # noqa: E402
+from preparacion import preparar_sucursales  # noqa: E402
+from ranking import IndiceRanking  # noqa: E402
+from sinteticos import escribir_libro, escribir_parquet, etiquetas_periodo, generar_hojas  # noqa: E402
+from tendencias import TablaTendencias  # noqa: E402
+
+ESCENARIOS = ['1000x13', '10000x13', '100000x13', '1000x120', '10000x120']
+# Sucursales para las que se calculan las gráficas del detalle en cada repetición
+SUCURSALES_DETALLE = 20
+# Holgura absoluta para no marcar como regresión el ruido de etapas muy cortas
+HOLGURA_MS = 2.0
+HOLGURA_MB = 1.0
+
+
+class HistoricoEnMemoria:
+    """Panel y tendencias ya construidos, con la interfaz de HistoricoLazy que usa el detalle"""
+
+    def __init__(self, panel: PanelHistorico, tendencias: TablaTendencias):
+        self._panel = panel
+        self._tendencias = tendencias
+
+    def panel(self, familias=FAMILIAS_PANEL) -> PanelHistorico:
+        return self._panel
+
+    def tendencias(self, familias=FAMILIAS_PANEL) -> TablaTendencias:
+        return self._tendencias
+
+
+def medir(funcion, repeticiones: int):
+    """(mediana en ms, pico de memoria en MB, resultado) de funcion()"""
+    tiempos = []
+    for _ in range(repeticiones):
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    gc.collect()
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(tiempos), pico / 2**20, resultado
+
+
+def preparar_datos(sucursales: int, periodos: int, semilla: int, directorio: str, con_excel: bool):
+    """Genera las hojas del escenario si no están en el directorio; devuelve las rutas"""
+    rutas = {hoja: os.path.join(directorio, f"{hoja}.parquet") for hoja in ('Datos_Completos', 'Clusters_S6')}
+    excel = os.path.join(directorio, "libro.xlsx")
+    falta_excel = con_excel and not os.path.exists(excel)
+    if falta_excel or not all(os.path.exists(r) for r in rutas.values()):
+        print(f"  generando {sucursales:,} sucursales × {periodos} periodos en {directorio}")
+        hojas = generar_hojas(sucursales, periodos, semilla)
+        escribir_parquet(hojas, directorio)
+        if con_excel:
+            escribir_libro(hojas, excel)
+    return rutas, excel if con_excel else None
+
+
+def correr_escenario(sucursales: int, periodos: int, args) -> dict:
+    directorio = os.path.join(args.datos, f"{sucursales}x{periodos}_s{args.semilla}")
+    columnas_libro = 2 + 9 * periodos + 11
+    con_excel = sucursales * columnas_libro <= args.max_celdas_excel
+    rutas, excel = preparar_datos(sucursales, periodos, args.semilla, directorio, con_excel)
+    r = args.repeticiones
+    etapas = {}
+
+    def etapa(nombre, funcion, repeticiones=r):
+        ms, mb, resultado = medir(funcion, repeticiones)
+        etapas[nombre] = {'ms': round(ms, 3), 'mb': round(mb, 3)}
+        return resultado
+
+    if excel:
+        def excel_snapshot():
+            # Snapshot en un directorio nuevo: siempre se parsea el libro
+            snapshot.SNAPSHOT_DIR = tempfile.mkdtemp(prefix="snapshot-", dir=directorio)
+            return snapshot.asegurar_snapshot(excel)
+        etapa('excel_snapshot', excel_snapshot, repeticiones=1)
+
+    hoja = etapa('lectura_clusters',
+                 lambda: pq.read_table(rutas['Clusters_S6'], memory_map=True).to_pandas())
+    df = etapa('preparar_sucursales', lambda: preparar_sucursales(hoja))
+    motor = etapa('motor_filtros', lambda: MotorFiltros(df))
+
+    # Cadena de filtros de la barra lateral: región, cluster, niveles y los tres sliders recortados
+    region, cluster = motor.categorias('Región')[0], motor.categorias('Cluster_KM')[0]
+    categorias = {'Región': [region], 'Cluster_KM': [cluster], 'Nivel_Riesgo': ['Alto', 'Medio']}
+    rangos = {col: (0.0, motor.maximo(col) * 0.8) for col in ('FPD_Actual', 'ICV_Actual', 'Tasa_Morosidad')}
+    mascara = etapa('cadena_filtros', lambda: motor.mascara(categorias=categorias, rangos=rangos))
+    df_filtrado = etapa('filtrar', lambda: motor.filtrar(mascara))
+
+    cubo = etapa('cubo', lambda: CuboAgregado.desde_filas(df))
+    etapa('agregados_cubo', lambda: (cubo.seleccionar([region], [cluster], ['Alto', 'Medio']).por('Región'),
+                                     cubo.seleccionar([region], [cluster], ['Alto', 'Medio'])
+                                     .por('Cluster_KM', nombre='Cluster')))
+    etapa('agregados_filas', lambda: (lambda c: (c.por('Región'), c.por('Cluster_KM', nombre='Cluster')))(
+        CuboAgregado.desde_filas(df_filtrado)))
+
+    ranking = etapa('indice_ranking', lambda: IndiceRanking(df))
+    etapa('top10_indice', lambda: ranking.top('Score_Riesgo', 10, mascara))
+    etapa('top10_nlargest', lambda: df_filtrado.nlargest(10, 'Score_Riesgo'))
+
+    columnas = {f: [f"{prefijo_familia(f)}_{p}" for p in etiquetas_periodo(periodos)] for f in FAMILIAS_PANEL}
+    proyeccion = ['Región', 'Sucursal'] + [c for cols in columnas.values() for c in cols]
+    ancho = etapa('lectura_historico',
+                  lambda: pq.read_table(rutas['Datos_Completos'], columns=proyeccion, memory_map=True).to_pandas())
+    panel = etapa('panel', lambda: PanelHistorico.desde_ancho(ancho, columnas))
+    del ancho
+    tendencias = etapa('tendencias', lambda: TablaTendencias.desde_panel(panel))
+    etapa('ranking_tendencias', lambda: tendencias.ranking('ICV', k=10, sucursales=df_filtrado['Sucursal']))
+
+    historico = HistoricoEnMemoria(panel, tendencias)
+    elegidas = np.random.default_rng(args.semilla).choice(panel.sucursales, SUCURSALES_DETALLE)
+    etapa('datos_graficas_x20',
+          lambda: [calcular_datos_gráficas(historico, suc, FAMILIAS_PANEL) for suc in elegidas])
+    return etapas
+
+
+def comparar(nombre: str, etapas: dict, base: dict, args) -> list:
+    """Imprime el escenario contra la base y devuelve las regresiones"""
+    regresiones = []
+    print(f"{'etapa':<22} {'ms':>10} {'MB pico':>9} {'base ms':>10} {'Δ tiempo':>9} {'base MB':>9}")
+    for etapa, medida in etapas.items():
+        previa = base.get(nombre, {}).get(etapa)
+        linea = f"{etapa:<22} {medida['ms']:>10.2f} {medida['mb']:>9.2f}"
+        if previa:
+            delta = (medida['ms'] - previa['ms']) / max(previa['ms'], 1e-9) * 100
+            linea += f" {previa['ms']:>10.2f} {delta:>+8.0f}% {previa['mb']:>9.2f}"
+            if medida['ms'] > previa['ms'] * (1 + args.tolerancia_tiempo) + HOLGURA_MS:
+                regresiones.append(f"{nombre}/{etapa}: {previa['ms']:.2f} -> {medida['ms']:.2f} ms")
+            if medida['mb'] > previa['mb'] * (1 + args.tolerancia_memoria) + HOLGURA_MB:
+                regresiones.append(f"{nombre}/{etapa}: {previa['mb']:.2f} -> {medida['mb']:.2f} MB")
+        print(linea)
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--escenarios", nargs="+", default=ESCENARIOS, help="sucursalesxperiodos")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--datos", default=os.path.join(tempfile.gettempdir(), "reto_suite"),
+                        help="Directorio donde se guardan los libros generados")
+    parser.add_argument("--max-celdas-excel", type=int, default=200_000)
+    parser.add_argument("--base", help="JSON con la línea base para detectar regresiones")
+    parser.add_argument("--guardar-base", help="Escribe los resultados como nueva línea base")
+    parser.add_argument("--tolerancia-tiempo", type=float, default=0.5, help="0.5 = 50%% más lento")
+    parser.add_argument("--tolerancia-memoria", type=float, default=0.2)
+    args = parser.parse_args()
+
+    base = {}
+    if args.base:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)['escenarios']
+
+    resultados, regresiones = {}, []
+    for escenario in args.escenarios:
+        sucursales, periodos = (int(x) for x in escenario.split('x'))
+        print(f"\n== {sucursales:,} sucursales × {periodos} periodos ==")
+        resultados[escenario] = correr_escenario(sucursales, periodos, args)
+        regresiones += comparar(escenario, resultados[escenario], base, args)
+
+    if args.guardar_base:
+        with open(args.guardar_base, "w", encoding="utf-8") as f:
+            json.dump({'maquina': f"{platform.machine()} {platform.python_version()} {os.cpu_count()} cpu",
+                       'repeticiones': args.repeticiones, 'escenarios': resultados},
+                      f, ensure_ascii=False, indent=1)
+        print(f"\nLínea base guardada en {args.guardar_base}")
+
+    if regresiones:
+        print("\nRegresiones:")
+        for regresion in regresiones:
+            print(f"  {regresion}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Servidor local que imita la API de Gemini (generateContent y
+streamGenerateContent por SSE) para benchmarks.
+
+Responde en HTTP/1.1 con keep-alive, así que permite medir cuántas
+conexiones abre cada cliente. Opcionalmente sirve por TLS con un
+certificado autofirmado (para incluir el costo del handshake), simula
+latencia y responde 429 a una fracción de las peticiones.
+
+Uso como módulo:
+    with ServidorGemini(tls=True) as servidor:
+        requests.adapters.DEFAULT_CA_BUNDLE_PATH = servidor.certificado
+        os.environ["REQUESTS_CA_BUNDLE"] = servidor.certificado
+        ... genai.Client(api_key="x", http_options={"base_url": servidor.url}) ...
+"""
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def respuesta_texto(texto: str) -> dict:
+    """Cuerpo de una respuesta de generateContent con un solo candidato"""
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": texto}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {"promptTokenCount": 10, "candidatesTokenCount": 5, "totalTokenCount": 15},
+    }
+
+
+def respuesta_llamada(nombre: str, argumentos: dict) -> dict:
+    """Cuerpo de una respuesta en la que el modelo pide ejecutar una función"""
+    respuesta = respuesta_texto("")
+    respuesta["candidates"][0]["content"]["parts"] = [
+        {"functionCall": {"name": nombre, "args": argumentos}}
+    ]
+    return respuesta
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Encabezados y cuerpo van en escrituras separadas; sin esto el ACK
+    # retardado de TCP añade ~40 ms a cada petición sobre una conexión reutilizada
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.conexiones += 1
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_POST(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        cuerpo = json.loads(self.rfile.read(largo) or b"{}")
+        with self.server.lock:
+            self.server.peticiones += 1
+            numero = self.server.peticiones
+        if self.server.latencia:
+            time.sleep(self.server.latencia)
+
+        if self.server.error_cada and numero % self.server.error_cada == 0:
+            estado = 429
+            respuesta = {"error": {"code": 429, "message": "Resource exhausted",
+                                   "status": "RESOURCE_EXHAUSTED"}}
+        else:
+            estado = 200
+            respuesta = self.server.responder(self.path, cuerpo)
+            if "streamGenerateContent" in self.path:
+                self._enviar_sse(respuesta)
+                return
+            # Sin stream la respuesta llega cuando se terminó de generar todo el texto
+            time.sleep(self.server.retardo_fragmento * (max(1, self.server.fragmentos) - 1))
+
+        datos = json.dumps(respuesta).encode("utf-8")
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _enviar_sse(self, respuesta: dict):
+        """
+        Divide el texto de la respuesta en fragmentos y los envía como eventos
+        SSE; las respuestas sin texto (llamadas a funciones) van en un solo evento
+        """
+        parte = respuesta["candidates"][0]["content"]["parts"][0]
+        if "text" in parte:
+            texto = parte["text"]
+            n = max(1, self.server.fragmentos)
+            paso = -(-len(texto) // n) or 1
+            eventos = [respuesta_texto(texto[i:i + paso]) for i in range(0, max(len(texto), 1), paso)]
+        else:
+            eventos = [respuesta]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, cuerpo in enumerate(eventos):
+            if i and self.server.retardo_fragmento:
+                time.sleep(self.server.retardo_fragmento)
+            evento = f"data: {json.dumps(cuerpo)}\r\n\r\n".encode("utf-8")
+            self.wfile.write(f"{len(evento):X}\r\n".encode("ascii") + evento + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def _certificado_autofirmado(directorio: str):
+    """Genera cert.pem / key.pem para 127.0.0.1 con el binario openssl"""
+    cert = os.path.join(directorio, "cert.pem")
+    llave = os.path.join(directorio, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", llave, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, llave
+
+
+class ServidorGemini:
+    """
+    Servidor de prueba en un hilo de fondo.
+
+    Args:
+        tls: Servir por HTTPS con un certificado autofirmado (requiere openssl)
+        latencia: Segundos de espera simulada por petición
+        responder: Función (ruta, cuerpo) -> dict con la respuesta JSON
+        error_cada: Responder 429 (cuota agotada) a una de cada N peticiones (0 = nunca)
+        fragmentos: En streamGenerateContent, número de eventos en que se divide el texto
+        retardo_fragmento: Segundos entre eventos del stream (la latencia aplica antes del primero)
+    """
+
+    def __init__(self, tls: bool = False, latencia: float = 0.0, responder=None,
+                 error_cada: int = 0, fragmentos: int = 1, retardo_fragmento: float = 0.0):
+        self.tls = tls
+        self.latencia = latencia
+        self.error_cada = error_cada
+        self.fragmentos = fragmentos
+        self.retardo_fragmento = retardo_fragmento
+        self.responder = responder or (lambda ruta, cuerpo: respuesta_texto('{"ok": true}'))
+        self.certificado = None
+        self._directorio = None
+        self._servidor = None
+        self._hilo = None
+
+    @property
+    def url(self) -> str:
+        host, puerto = self._servidor.server_address[:2]
+        return f"{'https' if self.tls else 'http'}://{host}:{puerto}/"
+
+    @property
+    def conexiones(self) -> int:
+        return self._servidor.conexiones
+
+    @property
+    def peticiones(self) -> int:
+        return self._servidor.peticiones
+
+    def reiniciar_contadores(self):
+        with self._servidor.lock:
+            self._servidor.conexiones = 0
+            self._servidor.peticiones = 0
+
+    def __enter__(self) -> 'ServidorGemini':
+        servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Manejador)
+        servidor.daemon_threads = True
+        servidor.lock = threading.Lock()
+        servidor.conexiones = 0
+        servidor.peticiones = 0
+        servidor.latencia = self.latencia
+        servidor.responder = self.responder
+        servidor.error_cada = self.error_cada
+        servidor.fragmentos = self.fragmentos
+        servidor.retardo_fragmento = self.retardo_fragmento
+        if self.tls:
+            self._directorio = tempfile.mkdtemp(prefix="gemini_stub_")
+            self.certificado, llave = _certificado_autofirmado(self._directorio)
+            contexto = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            contexto.load_cert_chain(self.certificado, llave)
+            servidor.socket = contexto.wrap_socket(servidor.socket, server_side=True)
+        self._servidor = servidor
+        self._hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        if self._directorio:
+            shutil.rmtree(self._directorio, ignore_errors=True)
@@ -0,0 +1,155 @@
+"""
+Generador de libros sintéticos con el esquema del libro de sucursales.
+
+Escribe las hojas Datos_Completos (una columna por familia y periodo:
+<familia>_T-NN … <familia>_Actual, más las columnas sueltas) y Clusters_S6
+(valores actuales, cluster y métricas por cliente) para cualquier número de
+sucursales y de periodos. Los valores de Clusters_S6 coinciden con el
+periodo Actual de Datos_Completos, como en el libro real, y se incluyen
+algunas sucursales duplicadas y sin región para recorrer la limpieza de
+load_data.
+
+Uso:
+    python benchmarks/sinteticos.py --sucursales 10000 --periodos 13 --salida libro.xlsx
+"""
+import argparse
+import os
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+REGIONES = ['Norte', 'Sur', 'Centro 1', 'Centro 2', 'Occidente', 'Perla']
+
+# Familias de Datos_Completos en el orden del libro (prefijo de columna)
+FAMILIAS = ['Capital_Dispersado', 'Saldo_Insoluto_Total', 'Saldo_Insoluto_Vencido', 'Saldo_30_89',
+            'FPD_Neto', 'FPD', 'Castigos', 'Quitas', 'ICV']
+
+# Fracción de filas duplicadas y sin región
+FRACCION_DUPLICADAS = 0.01
+FRACCION_SIN_REGION = 0.005
+
+
+def etiquetas_periodo(periodos: int) -> List[str]:
+    """['T-12', …, 'T-01', 'Actual'] para 13 periodos; con 100 o más, T-119 … T-001"""
+    ancho = max(2, len(str(periodos - 1)))
+    return [f"T-{t:0{ancho}d}" for t in range(periodos - 1, 0, -1)] + ['Actual']
+
+
+def _series(rng, nivel: np.ndarray, periodos: int, tendencia: float, ruido: float) -> np.ndarray:
+    """Caminata con tendencia por sucursal: forma (sucursales, periodos), sin negativos"""
+    pendiente = rng.normal(tendencia, abs(tendencia) + 0.01, size=(len(nivel), 1))
+    pasos = rng.normal(0, ruido, size=(len(nivel), periodos))
+    factor = 1 + pendiente * np.arange(periodos) / periodos + np.cumsum(pasos, axis=1) / np.sqrt(periodos)
+    return np.maximum(nivel[:, None] * factor, 0.0)
+
+
+def generar_hojas(sucursales: int, periodos: int = 13, semilla: int = 42) -> Dict[str, pd.DataFrame]:
+    """
+    Hojas Datos_Completos y Clusters_S6 sintéticas.
+
+    Args:
+        sucursales: Número de sucursales distintas
+        periodos: Periodos por familia (13 = T-12 … Actual)
+        semilla: Semilla del generador aleatorio
+
+    Returns:
+        {'Datos_Completos': DataFrame, 'Clusters_S6': DataFrame}
+    """
+    rng = np.random.default_rng(semilla)
+    nombres = np.array([f"Sucursal {i:06d}" for i in range(sucursales)], dtype=object)
+    region = rng.choice(REGIONES, sucursales).astype(object)
+
+    capital = rng.lognormal(np.log(2e6), 0.8, sucursales)
+    saldo = capital * rng.uniform(8, 20, sucursales)
+    tasa_vencido = rng.gamma(2.0, 0.03, sucursales)
+    familias = {
+        'Capital_Dispersado': _series(rng, capital, periodos, 0.05, 0.10),
+        'Saldo_Insoluto_Total': _series(rng, saldo, periodos, 0.05, 0.05),
+        'Saldo_Insoluto_Vencido': _series(rng, saldo * tasa_vencido, periodos, 0.10, 0.10),
+        'Saldo_30_89': _series(rng, saldo * tasa_vencido * 0.7, periodos, 0.10, 0.15),
+        'FPD_Neto': _series(rng, rng.gamma(2.0, 0.4, sucursales), periodos, 0.05, 0.20),
+        'FPD': _series(rng, rng.gamma(2.0, 0.5, sucursales), periodos, 0.05, 0.20),
+        'Castigos': _series(rng, saldo * rng.gamma(2.0, 0.003, sucursales), periodos, 0.10, 0.20),
+        'Quitas': _series(rng, saldo * rng.gamma(2.0, 0.0003, sucursales), periodos, 0.0, 0.20),
+        'ICV': _series(rng, rng.gamma(4.0, 2.0, sucursales), periodos, 0.05, 0.10),
+    }
+
+    etiquetas = etiquetas_periodo(periodos)
+    columnas = {'Región': region, 'Sucursal': nombres}
+    for familia in FAMILIAS:
+        for t, etiqueta in enumerate(etiquetas):
+            columnas[f"{familia}_{etiqueta}"] = familias[familia][:, t]
+    clientes = rng.lognormal(np.log(1500), 0.6, sucursales)
+    columnas.update({
+        'Porcentaje_CD_Actual': capital / capital.sum() * 100,
+        'Porcentaje_SI_Actual': saldo / saldo.sum() * 100,
+        'Clientes T-12 a T-10': clientes * rng.uniform(0.8, 1.2, sucursales),
+        'Clientes T-09 a T-07': clientes * rng.uniform(0.8, 1.2, sucursales),
+        'Clientes T-06 a T-04': clientes * rng.uniform(0.8, 1.2, sucursales),
+        'Clientes T-03 a Actual': clientes,
+        'Tasa de recompra U3M (clientes)': rng.uniform(0, 60, sucursales),
+        'Meses_antiguedad': rng.integers(3, 240, sucursales).astype(np.float64),
+        'Promedio_Clientes': clientes,
+        'CD_por_Cliente': capital / clientes,
+        'Cartera_Vencida_por_Cliente': saldo * tasa_vencido / clientes,
+    })
+    datos = pd.DataFrame(columnas)
+
+    actual = {f"{familia}_Actual": familias[familia][:, -1]
+              for familia in ['Capital_Dispersado', 'ICV', 'Saldo_Insoluto_Total', 'Saldo_Insoluto_Vencido',
+                              'Saldo_30_89', 'FPD', 'Castigos', 'Quitas']}
+    clusters = pd.DataFrame({
+        'Región': region,
+        'Sucursal': nombres,
+        'Cluster_KM': rng.integers(0, 3, sucursales),
+        **actual,
+        'CD_por_Cliente': capital / clientes,
+        'Promedio_Clientes': clientes,
+        'Ratio_CD_SI_Actual': capital / saldo * 100,
+    })
+
+    # Filas duplicadas (se quedan las primeras) y sin región (se descartan)
+    duplicadas = rng.choice(sucursales, int(sucursales * FRACCION_DUPLICADAS), replace=False)
+    clusters = pd.concat([clusters, clusters.iloc[duplicadas]], ignore_index=True)
+    sin_region = rng.choice(len(clusters), int(len(clusters) * FRACCION_SIN_REGION), replace=False)
+    clusters.loc[sin_region, 'Región'] = np.nan
+    return {'Datos_Completos': datos, 'Clusters_S6': clusters}
+
+
+def escribir_libro(hojas: Dict[str, pd.DataFrame], ruta: str):
+    """Escribe las hojas en un libro de Excel (lento: ~1 minuto por millón de celdas)"""
+    with pd.ExcelWriter(ruta, engine='openpyxl') as escritor:
+        for hoja, df in hojas.items():
+            df.to_excel(escritor, sheet_name=hoja, index=False)
+
+
+def escribir_parquet(hojas: Dict[str, pd.DataFrame], directorio: str) -> Dict[str, str]:
+    """Escribe cada hoja como Parquet, como el snapshot del libro (snapshot.py); devuelve las rutas"""
+    os.makedirs(directorio, exist_ok=True)
+    rutas = {}
+    for hoja, df in hojas.items():
+        rutas[hoja] = os.path.join(directorio, f"{hoja}.parquet")
+        df.to_parquet(rutas[hoja], index=False)
+    return rutas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sucursales", type=int, default=1000)
+    parser.add_argument("--periodos", type=int, default=13)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", required=True, help="Libro .xlsx o directorio para Parquet")
+    args = parser.parse_args()
+
+    hojas = generar_hojas(args.sucursales, args.periodos, args.semilla)
+    if args.salida.endswith(".xlsx"):
+        escribir_libro(hojas, args.salida)
+    else:
+        escribir_parquet(hojas, args.salida)
+    for hoja, df in hojas.items():
+        print(f"{hoja}: {df.shape[0]:,} filas × {df.shape[1]:,} columnas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Índice de búsqueda de sucursales por nombre.
+
+Los nombres se normalizan (sin acentos, en minúsculas) una sola vez al crear
+el índice, y se indexan todas sus subcadenas de 1 a 3 caracteres. Una búsqueda
+por subcadena se resuelve intersectando listas de ids en lugar de recorrer el
+DataFrame completo, y las búsquedas sin coincidencias exactas pueden sugerir
+nombres parecidos por similitud de trigramas.
+"""
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Iterable, List
+
+import numpy as np
+
+# Longitud máxima de n-grama indexado
+_N = 3
+
+
+def normalize(text) -> str:
+    """Quita acentos y pasa a minúsculas; valores que no son texto quedan vacíos"""
+    if not isinstance(text, str):
+        return ""
+    text = unicodedata.normalize('NFKD', text)
+    text = text.encode('ascii', 'ignore').decode("utf-8")
+    return text.lower()
+
+
+def normalizar_consulta(texto: str) -> str:
+    """Normaliza el texto escrito por el usuario (solo letras y espacios)"""
+    return re.sub(r"[^a-z\s]", "", normalize(texto))
+
+
+def _ngramas(texto: str, n: int) -> set:
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido de n-gramas (1 a 3 caracteres) sobre los nombres de sucursal.
+
+    Args:
+        nombres: Nombres de sucursal en el orden original del DataFrame
+    """
+
+    def __init__(self, nombres: Iterable[str]):
+        self.nombres = list(nombres)
+        self.normalizados = [normalize(n) for n in self.nombres]
+        # Copias en arreglos para ordenar candidatos sin bucles de Python
+        self._textos = np.array(self.normalizados, dtype=str)
+        self._longitudes = np.array([len(t) for t in self.normalizados], dtype=np.int32)
+
+        # Subcadenas, inicios de palabra e inicios de nombre, de 1 a _N caracteres
+        postings = defaultdict(list)
+        palabras = defaultdict(list)
+        prefijos = defaultdict(list)
+        for i, texto in enumerate(self.normalizados):
+            for n in range(1, _N + 1):
+                for gram in _ngramas(texto, n):
+                    postings[gram].append(i)
+                for gram in {p[:n] for p in texto.split(' ') if len(p) >= n}:
+                    palabras[gram].append(i)
+                if len(texto) >= n:
+                    prefijos[texto[:n]].append(i)
+        self._postings = {g: np.asarray(ids, dtype=np.int32) for g, ids in postings.items()}
+        self._palabras = {g: np.asarray(ids, dtype=np.int32) for g, ids in palabras.items()}
+        self._prefijos = {g: np.asarray(ids, dtype=np.int32) for g, ids in prefijos.items()}
+
+        # Número de trigramas por nombre (para la similitud de Jaccard)
+        self._num_trigramas = np.array(
+            [max(len(_ngramas(t, _N)), 1) for t in self.normalizados], dtype=np.float64
+        )
+        self._vacio = np.empty(0, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def _candidatos(self, termino: str) -> np.ndarray:
+        """Ids de los nombres que contienen el término como subcadena"""
+        if len(termino) <= _N:
+            return self._postings.get(termino, self._vacio)
+
+        # Intersectar las listas de trigramas, empezando por la más corta
+        listas = sorted((self._postings.get(g, self._vacio) for g in _ngramas(termino, _N)), key=len)
+        ids = listas[0]
+        for lista in listas[1:]:
+            if len(ids) == 0:
+                break
+            ids = np.intersect1d(ids, lista, assume_unique=True)
+        # Los trigramas no garantizan el orden: verificar la subcadena completa
+        return ids[np.char.find(self._textos[ids], termino) >= 0]
+
+    def _ordenar(self, ids: np.ndarray, termino: str) -> np.ndarray:
+        """Exacta, prefijo del nombre, inicio de palabra, cualquier posición; luego más corto"""
+        # Todos los ids contienen el término, así que igual longitud implica coincidencia exacta
+        exacta = self._longitudes[ids] == len(termino)
+        if len(termino) <= _N:
+            prefijo = np.isin(ids, self._prefijos.get(termino, self._vacio), assume_unique=True)
+            palabra = np.isin(ids, self._palabras.get(termino, self._vacio), assume_unique=True)
+        else:
+            textos = self._textos[ids]
+            prefijo = np.char.startswith(textos, termino)
+            palabra = prefijo | (np.char.find(textos, ' ' + termino) >= 0)
+        orden = np.lexsort((ids, self._longitudes[ids], ~palabra, ~prefijo, ~exacta))
+        return ids[orden]
+
+    def buscar(self, consulta: str, limite: int = None) -> List[str]:
+        """
+        Sucursales cuyo nombre normalizado contiene la consulta, ordenadas por relevancia.
+
+        Args:
+            consulta: Texto escrito por el usuario
+            limite: Número máximo de resultados (None = todos)
+
+        Returns:
+            Lista de nombres de sucursal originales
+        """
+        termino = normalizar_consulta(consulta)
+        if not termino:
+            # Consulta sin letras ("123", "-"): como str.contains(""), coinciden
+            # todas las sucursales, en el orden original
+            return self.nombres[:limite]
+        ids = self._ordenar(self._candidatos(termino), termino)
+        if limite is not None:
+            ids = ids[:limite]
+        return [self.nombres[i] for i in ids]
+
+    def sugerir(self, consulta: str, limite: int = 5, similitud_minima: float = 0.3) -> List[str]:
+        """
+        Sugerencias aproximadas por similitud de trigramas (tolera errores de escritura).
+
+        Args:
+            consulta: Texto escrito por el usuario
+            limite: Número máximo de sugerencias
+            similitud_minima: Similitud de Jaccard mínima (0-1) para sugerir un nombre
+
+        Returns:
+            Lista de nombres de sucursal, de más a menos parecido
+        """
+        termino = normalizar_consulta(consulta)
+        trigramas = _ngramas(termino, _N)
+        if not trigramas:
+            return []
+
+        listas = [self._postings[g] for g in trigramas if g in self._postings]
+        if not listas:
+            return []
+        compartidos = np.bincount(np.concatenate(listas), minlength=len(self.nombres))
+        candidatos = np.flatnonzero(compartidos)
+        jaccard = compartidos[candidatos] / (len(trigramas) + self._num_trigramas[candidatos]
+                                             - compartidos[candidatos])
+
+        orden = np.argsort(-jaccard, kind='stable')[:limite]
+        return [self.nombres[candidatos[j]] for j in orden if jaccard[j] >= similitud_minima]
@@ -0,0 +1,179 @@
+"""
+Caché persistente de los análisis de DigiBot por sucursal.
+
+Los resultados de analyze_branch_with_gemini se guardan en SQLite en disco,
+identificados por el hash de los KPIs enviados en el prompt más la versión del
+prompt y del modelo. Así una sucursal ya analizada se muestra al instante para
+cualquier usuario y después de reiniciar el servidor. Las entradas expiran por
+TTL y el número total está acotado con desalojo LRU.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+CACHE_PATH = os.getenv("DIGIBOT_CACHE_PATH", os.path.join(".cache", "digibot.sqlite3"))
+CACHE_TTL_SEGUNDOS = int(os.getenv("DIGIBOT_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRADAS = int(os.getenv("DIGIBOT_CACHE_MAX", "5000"))
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS analisis (
+    clave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL,
+    creado REAL NOT NULL,
+    ultimo_acceso REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analisis_acceso ON analisis (ultimo_acceso);
+CREATE TABLE IF NOT EXISTS estadisticas (
+    nombre TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO estadisticas VALUES ('hits', 0), ('misses', 0), ('desalojos', 0);
+"""
+
+
+def clave_analisis(payload: Dict, version: str) -> str:
+    """Hash estable del payload de KPIs y la versión de prompt/modelo"""
+    texto = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{version}\n{texto}".encode("utf-8")).hexdigest()
+
+
+class CacheAnalisis:
+    """
+    Caché clave → JSON en SQLite, compartida entre sesiones y procesos.
+
+    Args:
+        ruta: Archivo SQLite (se crea al primer uso)
+        ttl_segundos: Antigüedad máxima de una entrada
+        max_entradas: Número máximo de entradas; las menos usadas se desalojan
+    """
+
+    def __init__(self, ruta: str = CACHE_PATH, ttl_segundos: int = CACHE_TTL_SEGUNDOS,
+                 max_entradas: int = CACHE_MAX_ENTRADAS):
+        self.ruta = ruta
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._inicializada = False
+        # Contadores de este proceso (los persistentes viven en la tabla estadisticas)
+        self.hits = 0
+        self.misses = 0
+        # Aumenta con cada escritura de este proceso (para invalidar conteos derivados)
+        self.version = 0
+
+    @contextmanager
+    def _conectar(self) -> Iterator[sqlite3.Connection]:
+        """Conexión de corta duración; todo lo que se ejecute dentro es una transacción"""
+        if not self._inicializada:
+            with self._lock:
+                if not self._inicializada:
+                    os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+                    con = sqlite3.connect(self.ruta, timeout=10)
+                    try:
+                        con.execute("PRAGMA journal_mode=WAL")
+                        con.executescript(_ESQUEMA)
+                    finally:
+                        con.close()
+                    self._inicializada = True
+
+        con = sqlite3.connect(self.ruta, timeout=10)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def _sumar(self, contador: str):
+        """Incrementa un contador del proceso (la instancia se comparte entre hilos)"""
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def _contar(self, con: sqlite3.Connection, nombre: str, n: int = 1):
+        con.execute("UPDATE estadisticas SET valor = valor + ? WHERE nombre = ?", (n, nombre))
+
+    def obtener(self, clave: str) -> Optional[Dict]:
+        """Devuelve el valor guardado o None si no existe o ya expiró"""
+        ahora = time.time()
+        try:
+            with self._conectar() as con:
+                fila = con.execute(
+                    "SELECT valor FROM analisis WHERE clave = ? AND creado >= ?",
+                    (clave, ahora - self.ttl_segundos)
+                ).fetchone()
+                if fila is None:
+                    self._sumar('misses')
+                    self._contar(con, 'misses')
+                    return None
+                con.execute("UPDATE analisis SET ultimo_acceso = ? WHERE clave = ?", (ahora, clave))
+                self._sumar('hits')
+                self._contar(con, 'hits')
+                return json.loads(fila[0])
+        except (sqlite3.Error, OSError, ValueError) as e:
+            # La caché nunca debe romper el análisis: se trata como fallo
+            print(f"⚠️ Caché de DigiBot no disponible: {e}")
+            self._sumar('misses')
+            return None
+
+    def existentes(self, claves: Iterable[str]) -> Set[str]:
+        """Claves vigentes entre las dadas (no cuenta aciertos ni actualiza el acceso)"""
+        claves = list(claves)
+        if not claves:
+            return set()
+        limite = time.time() - self.ttl_segundos
+        encontradas = set()
+        try:
+            with self._conectar() as con:
+                # Por bloques: SQLite limita el número de parámetros por consulta
+                for i in range(0, len(claves), 500):
+                    bloque = claves[i:i + 500]
+                    marcas = ",".join("?" * len(bloque))
+                    encontradas.update(fila[0] for fila in con.execute(
+                        f"SELECT clave FROM analisis WHERE creado >= ? AND clave IN ({marcas})",
+                        (limite, *bloque)
+                    ))
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Caché de DigiBot no disponible: {e}")
+        return encontradas
+
+    def guardar(self, clave: str, valor: Dict):
+        """Guarda un valor, purga expirados y desaloja los menos usados si se excede el límite"""
+        ahora = time.time()
+        try:
+            with self._conectar() as con:
+                con.execute(
+                    "INSERT OR REPLACE INTO analisis VALUES (?, ?, ?, ?)",
+                    (clave, json.dumps(valor, ensure_ascii=False), ahora, ahora)
+                )
+                con.execute("DELETE FROM analisis WHERE creado < ?", (ahora - self.ttl_segundos,))
+                exceso = con.execute("SELECT COUNT(*) FROM analisis").fetchone()[0] - self.max_entradas
+                if exceso > 0:
+                    con.execute(
+                        "DELETE FROM analisis WHERE clave IN "
+                        "(SELECT clave FROM analisis ORDER BY ultimo_acceso ASC LIMIT ?)",
+                        (exceso,)
+                    )
+                    self._contar(con, 'desalojos', exceso)
+            self._sumar('version')
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ No se pudo guardar en la caché de DigiBot: {e}")
+
+    def estadisticas(self) -> Dict:
+        """Contadores de aciertos/fallos del proceso y acumulados en disco"""
+        resultado = {'hits_proceso': self.hits, 'misses_proceso': self.misses}
+        try:
+            with self._conectar() as con:
+                resultado.update(dict(con.execute("SELECT nombre, valor FROM estadisticas")))
+                resultado['entradas'] = con.execute("SELECT COUNT(*) FROM analisis").fetchone()[0]
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Caché de DigiBot no disponible: {e}")
+        return resultado
+
+    def limpiar(self):
+        """Elimina todas las entradas (los contadores se conservan)"""
+        with self._conectar() as con:
+            con.execute("DELETE FROM analisis")
+        self._sumar('version')
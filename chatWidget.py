@@ -2,17 +2,26 @@
 Widget de chat flotante con DigiBot - Asistente inteligente de riesgo
 """
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import datetime
-from typing import Optional, Dict
-from geminiPrueba import chat_with_digibot
+from typing import Optional, Mapping
+from geminiPrueba import chat_with_digibot_stream, config_chat
+from historial_chat import HistorialChat
+from herramientas_chat import HerramientasDatos
+from tiempos import cronometrar
 
 
-def render_chat_widget(current_context: Optional[Dict] = None):
+def render_chat_widget(current_context: Optional[Mapping] = None,
+                       herramientas: Optional[HerramientasDatos] = None):
     """
     Renderiza el widget de chat flotante con DigiBot
     
     Args:
-        current_context: Diccionario con información de la sucursal actual y dataset completo
+        current_context: Información de la sucursal actual y del dataset (un
+            diccionario o un contexto_chat.ContextoChat, que solo se evalúa al
+            enviar un mensaje)
+        herramientas: Consultas locales que DigiBot puede invocar (rankings,
+            filtros, comparaciones y tendencias); None = solo el contexto
     """
     # Inicializar estado del chat si no existe
     if 'chat_open' not in st.session_state:
@@ -21,8 +30,9 @@ def render_chat_widget(current_context: Optional[Dict] = None):
     if 'chat_messages' not in st.session_state:
         st.session_state.chat_messages = []
     
-    if 'chat_history' not in st.session_state:
-        st.session_state.chat_history = []
+    # Historial acotado por tokens (las sesiones anteriores guardaban una lista)
+    if not isinstance(st.session_state.get('chat_history'), HistorialChat):
+        st.session_state.chat_history = HistorialChat()
     
     if 'pending_message' not in st.session_state:
         st.session_state.pending_message = None
@@ -37,47 +47,78 @@ def render_chat_widget(current_context: Optional[Dict] = None):
     </style>
     , unsafe_allow_html=True)
     """
-    # Renderizar chat como sidebar flotante
+    # Renderizar chat como sidebar flotante (fragmento: conversar no vuelve a
+    # ejecutar la página que lo contiene)
     if st.session_state.chat_open:
-        # Crear contenedor flotante
         with st.sidebar:
-            st.markdown("### 🤖 DigiBot")
-            
-            # Botón cerrar
-            if st.button("✖ Cerrar", key="close_chat", use_container_width=True):
-                st.session_state.chat_open = False
-                st.rerun()
-            
-            st.markdown("---")
-            
-            # Contenedor de mensajes
-            chat_container = st.container(height=400)
-            
-            with chat_container:
-                if len(st.session_state.chat_messages) == 0:
-                    st.info("👋 Hola! Pregúntame sobre las sucursales, riesgos o comparaciones.")
-                else:
-                    for msg in st.session_state.chat_messages:
-                        with st.chat_message(msg['role']):
-                            st.write(msg['text'])
-            
-            # Input de usuario
-            user_input = st.chat_input("Escribe tu pregunta...")
-            
-            # Procesar mensaje SOLO si hay uno nuevo
-            if user_input and user_input != st.session_state.pending_message:
-                st.session_state.pending_message = user_input
-                
-                # Agregar mensaje del usuario
-                st.session_state.chat_messages.append({
-                    'role': 'user',
-                    'text': user_input
-                })
-                
-                # Preparar contexto con info del dataset
-                if current_context:
-                    sucursal_actual = current_context.get('sucursal_actual', {})
-                    context_string = f"""
+            _panel_chat(current_context, herramientas)
+    
+    # Botón flotante para abrir chat (siempre visible en esquina)
+    if not st.session_state.chat_open:
+        # Usar columnas para posicionar en esquina
+        if st.button("💬", key="open_chat", help="Abrir DigiBot", use_container_width=True):
+            st.session_state.chat_open = True
+            st.rerun()
+
+
+def _rerun_panel():
+    """Vuelve a dibujar solo el panel si se está ejecutando como fragmento"""
+    ctx = get_script_run_ctx()
+    if ctx is not None and ctx.fragment_ids_this_run:
+        st.rerun(scope="fragment")
+    st.rerun()
+
+
+@st.fragment
+def _panel_chat(current_context: Optional[Mapping], herramientas: Optional[HerramientasDatos]):
+    """Panel del chat en la barra lateral; enviar mensajes o limpiar solo lo vuelve a ejecutar"""
+    with cronometrar("Chat"):
+        st.markdown("### 🤖 DigiBot")
+    
+        # Botón cerrar
+        if st.button("✖ Cerrar", key="close_chat", use_container_width=True):
+            st.session_state.chat_open = False
+            st.rerun()
+    
+        st.markdown("---")
+    
+        # Contenedor de mensajes
+        chat_container = st.container(height=400)
+    
+        with chat_container:
+            if len(st.session_state.chat_messages) == 0:
+                st.info("👋 Hola! Pregúntame sobre las sucursales, riesgos o comparaciones.")
+            else:
+                for msg in st.session_state.chat_messages:
+                    with st.chat_message(msg['role']):
+                        st.write(msg['text'])
+
+        # Tamaño del último prompt enviado, para vigilar el efecto del resumen
+        metrica = st.session_state.chat_history.ultima_metrica()
+        if metrica:
+            st.caption(
+                f"📏 Último prompt: ~{metrica['tokens_prompt']:,} tokens "
+                f"(sin compactar: ~{metrica['tokens_sin_compactar']:,}) · "
+                f"{st.session_state.chat_history.turnos_compactados} turnos resumidos"
+            )
+    
+        # Input de usuario
+        user_input = st.chat_input("Escribe tu pregunta...")
+    
+        # Procesar mensaje SOLO si hay uno nuevo
+        if user_input and user_input != st.session_state.pending_message:
+            st.session_state.pending_message = user_input
+        
+            # Agregar mensaje del usuario
+            st.session_state.chat_messages.append({
+                'role': 'user',
+                'text': user_input
+            })
+        
+            # Preparar contexto con info del dataset
+            if current_context:
+                sucursal_actual = current_context.get('sucursal_actual', {})
+                context_string = f"""
 Información de la sucursal actual:
 - Sucursal: {sucursal_actual.get('Sucursal', 'N/A')}
 - Cluster: {sucursal_actual.get('Cluster_KM', 'N/A')}
@@ -92,54 +133,48 @@ Información general del dataset:
 - Promedio FPD: {current_context.get('promedio_fpd', 0):.2f}%
 - Promedio ICV: {current_context.get('promedio_icv', 0):.2f}%
 
-Tienes acceso a información de todas las sucursales. El usuario puede preguntarte por comparaciones o información de otras sucursales.
 """
-                else:
-                    context_string = "El usuario está en el dashboard general."
-                
-                # Obtener respuesta de DigiBot
-                with st.spinner("Pensando..."):
-                    response_text = chat_with_digibot(
-                        st.session_state.chat_history,
+                if herramientas is not None:
+                    context_string += "\nPara otras sucursales, rankings o comparaciones consulta las herramientas de datos.\n"
+            else:
+                context_string = "El usuario está en el dashboard general."
+        
+            historial = st.session_state.chat_history
+            historial.registrar_prompt(config_chat(context_string, herramientas)['system_instruction'], user_input)
+
+            # Mostrar la pregunta y la respuesta de DigiBot conforme llega
+            with chat_container:
+                with st.chat_message('user'):
+                    st.write(user_input)
+                with st.chat_message('assistant'), cronometrar("Chat: respuesta", mostrar=False):
+                    response_text = st.write_stream(chat_with_digibot_stream(
+                        historial.mensajes(),
                         user_input,
-                        context_string
-                    )
-                
-                # Agregar respuesta del bot
-                st.session_state.chat_messages.append({
-                    'role': 'assistant',
-                    'text': response_text
-                })
-                
-                # Actualizar historial
-                st.session_state.chat_history.append({
-                    'role': 'user',
-                    'parts': [{'text': user_input}]
-                })
-                st.session_state.chat_history.append({
-                    'role': 'model',
-                    'parts': [{'text': response_text}]
-                })
-                
-                st.rerun()
-            
-            # Botón limpiar
-            if st.button("🗑️ Limpiar chat", use_container_width=True):
-                st.session_state.chat_messages = []
-                st.session_state.chat_history = []
-                st.session_state.pending_message = None
-                st.rerun()
+                        context_string,
+                        herramientas
+                    ))
+        
+            # Agregar respuesta del bot
+            st.session_state.chat_messages.append({
+                'role': 'assistant',
+                'text': response_text
+            })
+        
+            # Actualizar historial (compacta los turnos antiguos si se pasa del presupuesto)
+            historial.agregar(user_input, response_text)
+        
+            _rerun_panel()
     
-    # Botón flotante para abrir chat (siempre visible en esquina)
-    if not st.session_state.chat_open:
-        # Usar columnas para posicionar en esquina
-        if st.button("💬", key="open_chat", help="Abrir DigiBot", use_container_width=True):
-            st.session_state.chat_open = True
-            st.rerun()
+        # Botón limpiar
+        if st.button("🗑️ Limpiar chat", use_container_width=True):
+            st.session_state.chat_messages = []
+            st.session_state.chat_history = HistorialChat()
+            st.session_state.pending_message = None
+            _rerun_panel()
 
 
 def reset_chat():
     """Reinicia el chat eliminando todos los mensajes"""
     st.session_state.chat_messages = []
-    st.session_state.chat_history = []
+    st.session_state.chat_history = HistorialChat()
     st.session_state.pending_message = None
\ No newline at end of file
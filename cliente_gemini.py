@@ -0,0 +1,172 @@
+"""
+Cliente de Gemini compartido por todo el proceso.
+
+Antes cada llamada a DigiBot volvía a leer el .env / st.secrets y creaba un
+genai.Client nuevo, y el SDK (google-genai 0.2.x) además abre una
+requests.Session por petición, así que cada pregunta pagaba de nuevo la
+conexión TCP y el handshake TLS. ProveedorGemini resuelve la API key una sola
+vez, crea un único cliente y hace que sus peticiones salgan por sesiones HTTP
+con pool de conexiones keep-alive (una por hilo: requests no garantiza que
+una Session sea segura entre hilos). reiniciar() descarta el cliente para
+rotar la key.
+
+El SDK 0.2.2 no ofrece una forma pública de pasarle la sesión HTTP, así que
+el envío se sustituye en ApiClient._request_unauthorized, que es privado. Solo
+se hace con las versiones verificadas en VERSIONES_POOL y si el método tiene
+la firma esperada; con cualquier otra versión se avisa y el cliente queda
+tal como lo crea el SDK (sin pool, pero con las peticiones correctas).
+"""
+import inspect
+import json
+import os
+import threading
+import warnings
+from importlib.metadata import PackageNotFoundError, version
+from typing import Callable, Optional
+
+import requests
+from google import genai
+from google.genai import errors
+
+# URL base alternativa (p. ej. un servidor local de pruebas); vacío = API de Google
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "")
+# Conexiones keep-alive que se conservan por host
+GEMINI_POOL_CONEXIONES = int(os.getenv("GEMINI_POOL_CONEXIONES", "16"))
+
+# Versiones de google-genai cuyo _request_unauthorized se revisó y se replica abajo
+VERSIONES_POOL = ("0.2.2",)
+
+
+def _version_sdk() -> str:
+    try:
+        return version("google-genai")
+    except PackageNotFoundError:
+        return "desconocida"
+
+
+def _internos_sdk():
+    """
+    (HttpResponse, RequestJsonEncoder) del SDK si esta versión admite el pool,
+    o None después de avisar por qué no.
+    """
+    version_sdk = _version_sdk()
+    motivo = None
+    if version_sdk not in VERSIONES_POOL:
+        motivo = f"google-genai {version_sdk} no está en las versiones verificadas {VERSIONES_POOL}"
+    else:
+        try:
+            from google.genai._api_client import ApiClient, HttpResponse, RequestJsonEncoder
+            parametros = list(inspect.signature(ApiClient._request_unauthorized).parameters)
+            if parametros != ["self", "http_request", "stream"]:
+                motivo = f"ApiClient._request_unauthorized cambió de firma: {parametros}"
+        except (ImportError, AttributeError) as e:
+            motivo = f"faltan internos del SDK ({e})"
+    if motivo:
+        warnings.warn(f"Pool de conexiones de Gemini desactivado: {motivo}. "
+                      f"Revise cliente_gemini.py antes de actualizar el SDK.", RuntimeWarning, stacklevel=2)
+        print(f"⚠️ Pool de conexiones de Gemini desactivado: {motivo}")
+        return None
+    return HttpResponse, RequestJsonEncoder
+
+
+def crear_sesion_http(max_conexiones: int = GEMINI_POOL_CONEXIONES) -> requests.Session:
+    """Sesión de requests con pool de conexiones reutilizables"""
+    sesion = requests.Session()
+    adaptador = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max_conexiones)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    return sesion
+
+
+class SesionesPorHilo(threading.local):
+    """Una sesión HTTP con pool por hilo (los hilos del lote no comparten la Session)"""
+
+    def __init__(self, max_conexiones: int = GEMINI_POOL_CONEXIONES):
+        self.sesion = crear_sesion_http(max_conexiones)
+
+
+def _enviar_con_sesion(sesiones: SesionesPorHilo, http_response, json_encoder):
+    """
+    Reemplazo de ApiClient._request_unauthorized (google-genai 0.2.2) que usa
+    la sesión del hilo en lugar de crear una requests.Session en cada petición.
+    """
+    def _request_unauthorized(http_request, stream: bool = False):
+        data = None
+        if http_request.data:
+            if not isinstance(http_request.data, bytes):
+                data = json.dumps(http_request.data, cls=json_encoder)
+            else:
+                data = http_request.data
+
+        response = sesiones.sesion.request(
+            method=http_request.method,
+            url=http_request.url,
+            headers=http_request.headers,
+            data=data,
+            stream=stream,
+        )
+        errors.APIError.raise_for_response(response)
+        return http_response(response.headers, response if stream else [response.text])
+
+    return _request_unauthorized
+
+
+class ProveedorGemini:
+    """
+    Cliente genai.Client perezoso, único por proceso y seguro entre hilos.
+
+    Args:
+        resolver_api_key: Función que obtiene la API key (se llama una vez,
+            o de nuevo después de reiniciar()); si lanza excepción no se
+            memoriza nada y se reintenta en la siguiente llamada
+        base_url: URL base alternativa de la API (vacío = la de Google)
+        max_conexiones: Tamaño del pool de conexiones HTTP
+    """
+
+    def __init__(self, resolver_api_key: Callable[[], str], base_url: str = GEMINI_BASE_URL,
+                 max_conexiones: int = GEMINI_POOL_CONEXIONES):
+        self.resolver_api_key = resolver_api_key
+        self.base_url = base_url
+        self.max_conexiones = max_conexiones
+        self._lock = threading.Lock()
+        self._cliente: Optional[genai.Client] = None
+        self._sesiones: Optional[SesionesPorHilo] = None
+        self._api_key: Optional[str] = None
+
+    def _crear(self, api_key: str) -> genai.Client:
+        http_options = {"base_url": self.base_url} if self.base_url else None
+        cliente = genai.Client(api_key=api_key, http_options=http_options)
+        internos = _internos_sdk()
+        if internos is not None:
+            self._sesiones = SesionesPorHilo(self.max_conexiones)
+            # Modelos, chats y archivos comparten este ApiClient, así que basta con
+            # sustituir el envío en la instancia
+            cliente._api_client._request_unauthorized = _enviar_con_sesion(self._sesiones, *internos)
+        return cliente
+
+    def cliente(self) -> genai.Client:
+        """Devuelve el cliente compartido, creándolo en la primera llamada"""
+        cliente = self._cliente
+        if cliente is not None:
+            return cliente
+        with self._lock:
+            if self._cliente is None:
+                api_key = self._api_key or self.resolver_api_key()
+                self._cliente = self._crear(api_key)
+                self._api_key = api_key
+                print("✅ Cliente de Gemini inicializado correctamente")
+            return self._cliente
+
+    def reiniciar(self, api_key: Optional[str] = None):
+        """
+        Descarta el cliente y la key actuales (rotación de credenciales).
+
+        Args:
+            api_key: Nueva key a usar; None = volver a resolverla en la siguiente llamada
+        """
+        with self._lock:
+            # Las sesiones anteriores no se cierran aquí: puede haber peticiones
+            # en curso en otros hilos; se liberan cuando dejan de usarse
+            self._cliente = None
+            self._sesiones = None
+            self._api_key = api_key
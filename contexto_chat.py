@@ -0,0 +1,85 @@
+"""
+Contexto del chat de DigiBot para la página de detalle.
+
+Antes detail.render armaba en cada rerun un diccionario con
+df_clusters.to_dict('records') (una copia de todas las sucursales) aunque el
+widget de chat solo lee la fila de la sucursal y cuatro agregados.
+ContextoChat expone las mismas claves, pero cada valor se calcula al leerlo
+y se memoriza por versión del snapshot (y sucursal): el resumen del dataset
+se calcula una vez y los registros completos solo si alguien los pide.
+"""
+from collections.abc import Mapping
+from typing import Dict, Iterator, List
+
+import pandas as pd
+import streamlit as st
+
+from herramientas_chat import HerramientasDatos
+from indices import indice_busqueda, motor_filtros
+
+CLAVES_RESUMEN = ('total_sucursales', 'sucursales_alto_riesgo', 'promedio_fpd', 'promedio_icv')
+
+
+# Los parámetros con _ no se hashean: la versión del snapshot identifica al DataFrame
+@st.cache_resource(max_entries=4)
+def resumen_dataset(version: str, _df: pd.DataFrame) -> Dict:
+    """Agregados del dataset que el chat incluye en su contexto"""
+    return {
+        'total_sucursales': len(_df),
+        'sucursales_alto_riesgo': int((_df['Nivel_Riesgo'] == 'Alto').sum()),
+        'promedio_fpd': float(_df['FPD_Actual'].mean()),
+        'promedio_icv': float(_df['ICV_Actual'].mean()),
+    }
+
+
+@st.cache_resource(max_entries=256)
+def registro_sucursal(version: str, sucursal: str, _df: pd.DataFrame) -> Dict:
+    """Fila de una sucursal como diccionario (compartido: no modificar)"""
+    return _df[_df['Sucursal'] == sucursal].iloc[0].to_dict()
+
+
+@st.cache_resource(max_entries=2)
+def registros_dataset(version: str, _df: pd.DataFrame) -> List[Dict]:
+    """Todas las sucursales como lista de diccionarios (compartida: no modificar)"""
+    return _df.to_dict('records')
+
+
+@st.cache_resource(max_entries=2)
+def herramientas_datos(version: str, _df: pd.DataFrame, _historico) -> HerramientasDatos:
+    """Herramientas de consulta de DigiBot sobre el snapshot (compartidas entre sesiones)"""
+    return HerramientasDatos(_df, _historico.tendencias(), motor=motor_filtros(version, _df),
+                             indice=indice_busqueda(version, _df))
+
+
+class ContextoChat(Mapping):
+    """
+    Contexto perezoso del chat con las claves del antiguo diccionario:
+    sucursal_actual, dataset_completo y CLAVES_RESUMEN.
+
+    Args:
+        df: DataFrame de sucursales de load_data
+        version: Versión del snapshot del libro (clave de las cachés)
+        sucursal: Sucursal seleccionada
+    """
+
+    CLAVES = ('sucursal_actual', 'dataset_completo') + CLAVES_RESUMEN
+
+    def __init__(self, df: pd.DataFrame, version: str, sucursal: str):
+        self.df = df
+        self.version = version
+        self.sucursal = sucursal
+
+    def __getitem__(self, clave: str):
+        if clave == 'sucursal_actual':
+            return registro_sucursal(self.version, self.sucursal, self.df)
+        if clave == 'dataset_completo':
+            return registros_dataset(self.version, self.df)
+        if clave in CLAVES_RESUMEN:
+            return resumen_dataset(self.version, self.df)[clave]
+        raise KeyError(clave)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.CLAVES)
+
+    def __len__(self) -> int:
+        return len(self.CLAVES)
@@ -4,10 +4,91 @@ import altair as alt
 import numpy as np
 from geminiPrueba import analyze_branch_with_gemini
 import chatWidget
+from contexto_chat import ContextoChat, herramientas_datos
+from indices import vecindario_sucursales
+from tiempos import cronometrar
+from graficas import GRAFICAS
+
+# Vecinos que se listan en la sección "Sucursales Cercanas"
+NUM_VECINOS = 10
+
+
+def calcular_datos_gráficas(historico, suc, nombre_columnas):
+    # Series de la sucursal desde el panel precalculado (sin buscar columnas)
+    panel = historico.panel(nombre_columnas)
+    tendencias = historico.tendencias(nombre_columnas)
+    orden = panel.periodos
+    datos = {}
+    for col in nombre_columnas:
+        df_long = pd.DataFrame({
+            'Periodo': pd.Categorical(orden, categories=orden, ordered=True),
+            col: panel.serie(suc, col).astype(np.float64),
+        })
+        # Pendiente y recta de tendencia precalculadas para todas las sucursales
+        pendiente, _, r2 = tendencias.de(suc, col)
+        df_long['tendencia'] = tendencias.linea(suc, col)
+        datos[col] = (df_long, pendiente, r2, orden)
+        
+    return datos
+
+
+def grafica_tendencia(df_long, col_name, y_label, orden):
+    # Serie de la sucursal con su recta de tendencia (ambas capas usan el mismo dataset)
+    line_chart = (
+        alt.Chart(df_long)
+        .mark_line(point=True, strokeWidth=3)
+        .encode(
+            x=alt.X('Periodo:N', sort=orden, title='Periodo'),
+            y=alt.Y(f'{col_name}:Q', title=y_label),
+            tooltip=['Periodo:N', alt.Tooltip(f'{col_name}:Q', format=',.2f')]
+        )
+    )
     
+    trend = (
+        alt.Chart(df_long)
+        .mark_line(strokeDash=[5,5], color='red', strokeWidth=2) 
+        .encode(
+            x=alt.X('Periodo:N', sort=orden),
+            y=alt.Y('tendencia:Q')
+        )
+    )
+    
+    return line_chart + trend
+
+
+@st.fragment
+def seccion_vecinos(version, df_clusters, suc):
+    # Cambiar el radio solo vuelve a ejecutar esta sección (no DigiBot ni las gráficas)
+    with cronometrar("Sucursales cercanas"):
+        vecindario = vecindario_sucursales(version, df_clusters)
+        radio_km = st.slider("Radio de búsqueda (km)", min_value=10, max_value=500, value=100, step=10,
+                             key='radio_vecinos')
+        cercanas = vecindario.vecinos_de(suc, radio_km=radio_km)
+        if len(cercanas) > 0:
+            alto_cercanas = int((cercanas['Nivel_Riesgo'] == 'Alto').sum())
+            st.caption(f"{len(cercanas)} sucursales a menos de {radio_km} km · {alto_cercanas} en riesgo alto")
+        else:
+            # Sin vecinos en el radio: las más cercanas aunque estén más lejos
+            cercanas = vecindario.vecinos_de(suc, k=NUM_VECINOS)
+            st.caption(f"Ninguna sucursal a menos de {radio_km} km; se muestran las {len(cercanas)} más cercanas")
+        st.dataframe(
+            cercanas.head(NUM_VECINOS).drop(columns=['lat', 'lon']),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                'Distancia_km': st.column_config.NumberColumn("Distancia (km)", format="%.1f"),
+                'Score_Riesgo': st.column_config.NumberColumn(format="%.2f"),
+                'FPD_Actual': st.column_config.NumberColumn("FPD (%)", format="%.2f"),
+                'ICV_Actual': st.column_config.NumberColumn("ICV (%)", format="%.2f"),
+            },
+        )
+
+
 def render(return_main, load_data):
     # Cargar datos
-    df_clusters, df_completos = load_data()
+    with cronometrar("Carga de datos", mostrar=False):
+        # Con load_data en caché esto es la deserialización de st.cache_data
+        df_clusters, historico = load_data()
     
     # Mostrar detalles de la sucursal seleccionada
     suc = st.session_state.selected_sucursal
@@ -25,16 +106,12 @@ def render(return_main, load_data):
         # ========================================
         # WIDGET DE CHAT
         # ========================================
-        # Preparar contexto completo para el chat con info del dataset
-        chat_context = {
-            'sucursal_actual': df_filtered_cluster.iloc[0].to_dict(),
-            'dataset_completo': df_clusters.to_dict('records'),
-            'total_sucursales': len(df_clusters),
-            'sucursales_alto_riesgo': len(df_clusters[df_clusters['Nivel_Riesgo'] == 'Alto']),
-            'promedio_fpd': df_clusters['FPD_Actual'].mean(),
-            'promedio_icv': df_clusters['ICV_Actual'].mean()
-        }
-        chatWidget.render_chat_widget(chat_context)
+        # Contexto para el chat: se calcula solo al leerse y se memoriza por
+        # versión del snapshot y sucursal
+        chat_context = ContextoChat(df_clusters, historico.version, suc)
+        chatWidget.render_chat_widget(
+            chat_context, herramientas_datos(historico.version, df_clusters, historico)
+        )
     with col3:
         if st.button("Regresar"):
             return_main()
@@ -74,7 +151,8 @@ def render(return_main, load_data):
     if suc not in st.session_state.ai_analysis:
         with st.spinner("DigiBot está analizando la sucursal..."):
             sucursal_data = df_filtered_cluster.iloc[0].to_dict()
-            st.session_state.ai_analysis[suc] = analyze_branch_with_gemini(sucursal_data)
+            with cronometrar("DigiBot: análisis", mostrar=False):
+                st.session_state.ai_analysis[suc] = analyze_branch_with_gemini(sucursal_data)
     
     # Mostrar análisis
     analysis = st.session_state.ai_analysis[suc]
@@ -179,66 +257,31 @@ def render(return_main, load_data):
 
     st.markdown("---")
     
+    # ========================================
+    # SUCURSALES CERCANAS
+    # ========================================
+    st.header("Sucursales Cercanas")
+
+    seccion_vecinos(historico.version, df_clusters, suc)
+
+    st.markdown("---")
+    
     # ========================================
     # ANÁLISIS TEMPORAL
     # ========================================
     st.header("Análisis Temporal de Indicadores")
-    
-    def calcular_datos_gráficas(nombre_columnas):
-        datos = {}
-        for col in nombre_columnas:
-            formatted_col = col.replace(" ", "_").replace("-", "_")
-            df_cols = df_completos[df_completos['Sucursal'] == suc].filter(like=formatted_col)
-            # Eliminar columnas de FPD_NETO
-            if col == "FPD":
-                regex = rf'^{formatted_col}_(T.*|[Aa]ctual.*)$'
-                df_cols = (df_completos[df_completos['Sucursal'] == suc].filter(regex=regex)) 
-            
-            df_cols = df_cols.copy()
-            df_cols.columns = [c.rsplit("_", 1)[-1] for c in df_cols.columns]
-        
-            # Pasar a formato largo
-            df_long = df_cols.melt(
-                var_name='Periodo',
-                value_name=col
-            )
-            
-            orden = df_cols.columns.tolist()
-
-            # Ordenar los periodos según el orden original del df
-            df_long['Periodo'] = pd.Categorical(df_long['Periodo'], categories=orden, ordered=True)
-            df_long = df_long.sort_values('Periodo').reset_index(drop=True)
-            df_long['t'] = range(len(df_long))
-            
-            # Calcular regresión lineal simple manualmente
-            x = df_long['t']
-            y = df_long[col]
-            
-            # Fórmula de regresión lineal simple
-            n = len(x)
-            sum_x = x.sum()
-            sum_y = y.sum()
-            sum_xy = (x * y).sum()
-            sum_x2 = (x ** 2).sum()
-            
-            pendiente = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x ** 2)
-            intercepto = (sum_y - pendiente * sum_x) / n
-            
-            df_long['tendencia'] = intercepto + pendiente * df_long['t']
-            datos[col] = (df_long, pendiente, orden)
-            
-        return datos
 
     columnas_historicas = ["ICV", "Capital Dispersado", "Saldo Insoluto Total", "Saldo Insoluto Vencido", 
                           "Saldo 30-89", "FPD", "Castigos", "Quitas"]
     tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs(columnas_historicas)
     
-    datos_graficas = calcular_datos_gráficas(columnas_historicas)
+    with cronometrar("Análisis temporal: datos", mostrar=False):
+        datos_graficas = calcular_datos_gráficas(historico, suc, columnas_historicas)
     
     for idx, tab in enumerate([tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8]):
         with tab:
             col_name = columnas_historicas[idx]
-            df_long, pendiente, orden = datos_graficas[col_name]
+            df_long, pendiente, r2, orden = datos_graficas[col_name]
             
             if col_name == "ICV" or col_name == "FPD":
                 y_label = f'{col_name} (%)'
@@ -246,27 +289,6 @@ def render(return_main, load_data):
             else:
                 y_label = f'{col_name} ($MXN)'
                 pendiente_label = '$MXN'
-            # Crear la gráfica
-            line_chart = (
-                alt.Chart(df_long)
-                .mark_line(point=True, strokeWidth=3)
-                .encode(
-                    x=alt.X('Periodo:N', sort=orden, title='Periodo'),
-                    y=alt.Y(f'{col_name}:Q', title=y_label),
-                    tooltip=['Periodo:N', alt.Tooltip(f'{col_name}:Q', format=',.2f')]
-                )
-            )
-            
-            trend = (
-                alt.Chart(df_long)
-                .mark_line(strokeDash=[5,5], color='red', strokeWidth=2) 
-                .encode(
-                    x=alt.X('Periodo:N', sort=orden),
-                    y=alt.Y('tendencia:Q')
-                )
-            )
-            
-            final_chart = line_chart + trend
             
             col1, col2 = st.columns([7, 3])
             with col1:
@@ -278,6 +300,7 @@ def render(return_main, load_data):
                         <p style='margin: 0; color: #c62828; font-weight: bold;'>
                             📈 Tendencia al alza<br/>+{pendiente:,.2f} {pendiente_label}
                         </p>
+                        <small style='color: #666;'>Ajuste R²: {r2:.2f}</small>
                     </div>
                     """, unsafe_allow_html=True)
                 else:
@@ -286,7 +309,11 @@ def render(return_main, load_data):
                         <p style='margin: 0; color: #2e7d32; font-weight: bold;'>
                             📉 Tendencia a la baja<br/>{pendiente:,.2f} {pendiente_label}
                         </p>
+                        <small style='color: #666;'>Ajuste R²: {r2:.2f}</small>
                     </div>
                     """, unsafe_allow_html=True)
             
-            st.altair_chart(final_chart, use_container_width=True)
+            # Especificación memorizada por huella de la serie: las pestañas que no
+            # cambian no se vuelven a convertir ni a serializar
+            GRAFICAS.dibujar(('tendencia', col_name), df_long,
+                             lambda datos: grafica_tendencia(datos, col_name, y_label, orden))
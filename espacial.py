@@ -0,0 +1,208 @@
+"""
+Índice espacial de sucursales por coordenadas.
+
+Las sucursales se reparten en una malla regular de celdas lat/lon y se
+ordenan por celda, así cada fila de celdas de una consulta es un solo rango
+contiguo del arreglo ordenado (dos searchsorted). Las consultas por radio,
+caja y k vecinos más cercanos solo miden la distancia de las sucursales de
+las celdas que tocan, en lugar de recorrer todo el DataFrame.
+
+Las posiciones que devuelve el índice son posiciones de fila (iloc) del
+DataFrame con el que se construyó.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = np.pi * RADIO_TIERRA_KM / 180
+# Lado de las celdas de la malla, en grados
+TAMANO_CELDA_GRADOS = 0.5
+
+
+def distancia_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Distancia de gran círculo (haversine), vectorizada"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class IndiceEspacial:
+    """
+    Malla de celdas sobre las coordenadas de las sucursales.
+
+    Args:
+        lat, lon: Coordenadas en grados; las filas con NaN no se indexan
+        tamano_celda: Lado de cada celda en grados
+    """
+
+    def __init__(self, lat, lon, tamano_celda: float = TAMANO_CELDA_GRADOS):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        self.n = len(self.lat)
+        self.tamano_celda = tamano_celda
+
+        validas = np.flatnonzero(~(np.isnan(self.lat) | np.isnan(self.lon)))
+        self.num_indexadas = len(validas)
+        if len(validas):
+            self.lat_min = self.lat[validas].min()
+            self.lon_min = self.lon[validas].min()
+            self.filas = int((self.lat[validas].max() - self.lat_min) // tamano_celda) + 1
+            self.columnas = int((self.lon[validas].max() - self.lon_min) // tamano_celda) + 1
+        else:
+            self.lat_min = self.lon_min = 0.0
+            self.filas = self.columnas = 1
+
+        claves = self._fila(self.lat[validas]) * self.columnas + self._columna(self.lon[validas])
+        orden = np.argsort(claves, kind='stable')
+        self._claves = claves[orden]
+        self._posiciones = validas[orden]
+
+    @classmethod
+    def desde_df(cls, df: pd.DataFrame, tamano_celda: float = TAMANO_CELDA_GRADOS) -> 'IndiceEspacial':
+        return cls(df['lat'].to_numpy(), df['lon'].to_numpy(), tamano_celda)
+
+    def __len__(self):
+        return self.num_indexadas
+
+    def _fila(self, lat) -> np.ndarray:
+        return np.clip(np.floor((lat - self.lat_min) / self.tamano_celda), 0, self.filas - 1).astype(np.int64)
+
+    def _columna(self, lon) -> np.ndarray:
+        return np.clip(np.floor((lon - self.lon_min) / self.tamano_celda), 0, self.columnas - 1).astype(np.int64)
+
+    def _candidatos(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> np.ndarray:
+        """Posiciones de las sucursales en las celdas que cruzan la caja"""
+        f0, f1 = self._fila(np.array([lat_min, lat_max]))
+        c0, c1 = self._columna(np.array([lon_min, lon_max]))
+        filas = np.arange(f0, f1 + 1) * self.columnas
+        inicios = np.searchsorted(self._claves, filas + c0, side='left')
+        finales = np.searchsorted(self._claves, filas + c1, side='right')
+        if len(filas) == 1:
+            return self._posiciones[inicios[0]:finales[0]]
+        return np.concatenate([self._posiciones[i:f] for i, f in zip(inicios, finales)])
+
+    def en_caja(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> np.ndarray:
+        """Posiciones de las sucursales dentro de la caja (bordes incluidos), en orden de fila"""
+        if not self.num_indexadas or lat_min > lat_max or lon_min > lon_max:
+            return np.empty(0, dtype=np.int64)
+        candidatos = self._candidatos(lat_min, lat_max, lon_min, lon_max)
+        lat, lon = self.lat[candidatos], self.lon[candidatos]
+        dentro = (lat >= lat_min) & (lat <= lat_max) & (lon >= lon_min) & (lon <= lon_max)
+        return np.sort(candidatos[dentro])
+
+    def _caja_radio(self, lat: float, lon: float, radio_km: float) -> Tuple[float, float, float, float]:
+        dlat = radio_km / KM_POR_GRADO
+        # Cerca de los polos la caja en longitud abarca todo
+        coseno = max(np.cos(np.radians(min(abs(lat) + dlat, 90.0))), 1e-6)
+        dlon = radio_km / (KM_POR_GRADO * coseno)
+        return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+    def en_radio(self, lat: float, lon: float, radio_km: float,
+                 excluir: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sucursales a menos de radio_km de un punto.
+
+        Args:
+            lat, lon: Centro de la búsqueda
+            radio_km: Radio en kilómetros
+            excluir: Posición a omitir (p. ej. la propia sucursal)
+
+        Returns:
+            (posiciones, distancias_km) ordenadas de la más cercana a la más lejana
+        """
+        if not self.num_indexadas or radio_km < 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        candidatos = self._candidatos(*self._caja_radio(lat, lon, radio_km))
+        if excluir is not None:
+            candidatos = candidatos[candidatos != excluir]
+        distancias = distancia_km(lat, lon, self.lat[candidatos], self.lon[candidatos])
+        dentro = distancias <= radio_km
+        candidatos, distancias = candidatos[dentro], distancias[dentro]
+        orden = np.argsort(distancias, kind='stable')
+        return candidatos[orden], distancias[orden]
+
+    def vecinos(self, lat: float, lon: float, k: int,
+                excluir: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Las k sucursales más cercanas a un punto.
+
+        Empieza con un radio estimado por la densidad de la celda y lo duplica
+        hasta que hay k sucursales dentro; como la búsqueda por radio es
+        exacta, las k más cercanas dentro del radio son las k más cercanas de todas.
+
+        Returns:
+            (posiciones, distancias_km) ordenadas de la más cercana a la más lejana
+        """
+        excluida = excluir is not None and not (np.isnan(self.lat[excluir]) or np.isnan(self.lon[excluir]))
+        k = min(k, self.num_indexadas - excluida)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        # Radio inicial según la densidad de la celda del punto: el círculo que
+        # contendría ~k sucursales (con margen); si no alcanzan, se duplica
+        lado_km = self.tamano_celda * KM_POR_GRADO
+        clave = self._fila(np.array([lat]))[0] * self.columnas + self._columna(np.array([lon]))[0]
+        en_celda = np.searchsorted(self._claves, clave, side='right') - np.searchsorted(self._claves, clave)
+        radio = lado_km * np.sqrt((k + 1) / (np.pi * en_celda)) * 1.5 if en_celda > k else lado_km
+        while True:
+            posiciones, distancias = self.en_radio(lat, lon, radio, excluir)
+            # Medio meridiano terrestre: ningún punto queda fuera de ese radio
+            if len(posiciones) >= k or radio > np.pi * RADIO_TIERRA_KM:
+                return posiciones[:k], distancias[:k]
+            radio *= 2
+
+
+# Columnas de la tabla de vecinos (además de Sucursal y Distancia_km)
+COLUMNAS_VECINOS = ['Región', 'Cluster_KM', 'Nivel_Riesgo', 'Score_Riesgo', 'FPD_Actual', 'ICV_Actual']
+
+
+class VecindarioSucursales:
+    """
+    Índice espacial más la búsqueda de la posición de cada sucursal por
+    nombre, para consultar vecinos sin recorrer el DataFrame.
+
+    Args:
+        df: DataFrame de sucursales con Sucursal, lat, lon y COLUMNAS_VECINOS (no se modifica)
+    """
+
+    def __init__(self, df: pd.DataFrame, tamano_celda: float = TAMANO_CELDA_GRADOS):
+        self.df = df
+        self.indice = IndiceEspacial.desde_df(df, tamano_celda)
+        self._posicion = {s: i for i, s in enumerate(df['Sucursal'])}
+
+    def posicion(self, sucursal: str) -> int:
+        return self._posicion[sucursal]
+
+    def coordenadas(self, sucursal: str) -> Tuple[float, float]:
+        i = self._posicion[sucursal]
+        return self.indice.lat[i], self.indice.lon[i]
+
+    def _tabla(self, posiciones: np.ndarray, distancias: np.ndarray) -> pd.DataFrame:
+        tabla = self.df.iloc[posiciones][['Sucursal', 'lat', 'lon'] + COLUMNAS_VECINOS].reset_index(drop=True)
+        tabla.insert(1, 'Distancia_km', distancias)
+        return tabla
+
+    def vecinos_de(self, sucursal: str, k: Optional[int] = None,
+                   radio_km: Optional[float] = None) -> pd.DataFrame:
+        """
+        Sucursales cercanas a una sucursal (sin incluirla), de la más cercana a la más lejana.
+
+        Args:
+            sucursal: Nombre de la sucursal
+            k: Máximo de vecinos a devolver (None = sin límite; requiere radio_km)
+            radio_km: Distancia máxima (None = las k más cercanas sin importar la distancia)
+
+        Returns:
+            DataFrame con Sucursal, Distancia_km, lat, lon y COLUMNAS_VECINOS
+        """
+        i = self._posicion[sucursal]
+        lat, lon = self.indice.lat[i], self.indice.lon[i]
+        if np.isnan(lat) or np.isnan(lon):
+            posiciones, distancias = np.empty(0, dtype=np.int64), np.empty(0)
+        elif radio_km is None:
+            posiciones, distancias = self.indice.vecinos(lat, lon, k or 0, excluir=i)
+        else:
+            posiciones, distancias = self.indice.en_radio(lat, lon, radio_km, excluir=i)
+            posiciones, distancias = posiciones[:k], distancias[:k]
+        return self._tabla(posiciones, distancias)
@@ -0,0 +1,114 @@
+"""
+Motor de filtros de la barra lateral.
+
+Al crearse precalcula los códigos categóricos (Región, Cluster, Nivel de
+Riesgo, Sucursal) y los arreglos ordenados de cada métrica filtrable. Un
+estado de filtros se convierte en una sola máscara booleana: las categorías
+se resuelven con una tabla de búsqueda sobre los códigos y los rangos con
+searchsorted, sin copiar el DataFrame base en cada paso.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+COLUMNAS_CATEGORICAS = ['Región', 'Cluster_KM', 'Nivel_Riesgo', 'Sucursal']
+COLUMNAS_RANGO = ['FPD_Actual', 'ICV_Actual', 'Tasa_Morosidad']
+
+
+class MotorFiltros:
+    """
+    Índices precalculados sobre el DataFrame de sucursales.
+
+    Args:
+        df: DataFrame de sucursales (no se modifica ni se copia)
+        categoricas: Columnas que se filtran por igualdad / pertenencia
+        rangos: Columnas numéricas que se filtran por rango cerrado [min, max]
+    """
+
+    def __init__(self, df: pd.DataFrame, categoricas: List[str] = COLUMNAS_CATEGORICAS,
+                 rangos: List[str] = COLUMNAS_RANGO):
+        self.df = df
+        self.n = len(df)
+
+        self._codigos: Dict[str, np.ndarray] = {}
+        self._categorias: Dict[str, Dict] = {}
+        for col in categoricas:
+            codigos, categorias = pd.factorize(df[col])
+            self._codigos[col] = codigos
+            self._categorias[col] = {valor: i for i, valor in enumerate(categorias.tolist())}
+
+        self._orden: Dict[str, np.ndarray] = {}
+        self._ordenados: Dict[str, np.ndarray] = {}
+        for col in rangos:
+            valores = df[col].to_numpy(dtype=np.float64)
+            # argsort deja los NaN al final, fuera de cualquier rango finito
+            orden = np.argsort(valores, kind='stable')
+            self._orden[col] = orden
+            self._ordenados[col] = valores[orden]
+
+    def categorias(self, col: str) -> list:
+        """Valores distintos de una columna categórica, ordenados"""
+        return sorted(self._categorias[col])
+
+    def maximo(self, col: str) -> float:
+        """Máximo de una métrica ignorando NaN (equivale a df[col].max())"""
+        ordenados = self._ordenados[col]
+        validos = ordenados[~np.isnan(ordenados)]
+        return float(validos[-1]) if len(validos) else float('nan')
+
+    def rango_completo(self, col: str, minimo: float, maximo: float) -> bool:
+        """True si el rango [minimo, maximo] incluye todas las filas (el filtro no descarta nada)"""
+        ordenados = self._ordenados[col]
+        return (np.searchsorted(ordenados, minimo, side='left') == 0
+                and np.searchsorted(ordenados, maximo, side='right') == self.n)
+
+    def _mascara_categorica(self, col: str, valores: Iterable) -> np.ndarray:
+        lookup = np.zeros(len(self._categorias[col]) + 1, dtype=bool)
+        for valor in valores:
+            codigo = self._categorias[col].get(valor)
+            if codigo is not None:
+                lookup[codigo] = True
+        # Los códigos -1 (valores faltantes) caen en la última posición, siempre False
+        return lookup[self._codigos[col]]
+
+    def _mascara_rango(self, col: str, minimo: float, maximo: float) -> Optional[np.ndarray]:
+        ordenados = self._ordenados[col]
+        inicio = np.searchsorted(ordenados, minimo, side='left')
+        fin = np.searchsorted(ordenados, maximo, side='right')
+        if inicio == 0 and fin == self.n:
+            return None  # el rango incluye todas las filas
+        mascara = np.zeros(self.n, dtype=bool)
+        mascara[self._orden[col][inicio:fin]] = True
+        return mascara
+
+    def mascara(self, categorias: Optional[Dict[str, Optional[Iterable]]] = None,
+                rangos: Optional[Dict[str, Tuple[float, float]]] = None) -> np.ndarray:
+        """
+        Combina todos los filtros en una máscara de filas.
+
+        Args:
+            categorias: {columna: valores permitidos}; None o vacío no filtra esa columna
+            rangos: {columna: (mínimo, máximo)} inclusivos
+
+        Returns:
+            Arreglo booleano de longitud n, alineado a las filas de df
+        """
+        mascara = np.ones(self.n, dtype=bool)
+        for col, valores in (categorias or {}).items():
+            if valores:
+                mascara &= self._mascara_categorica(col, valores)
+        for col, (minimo, maximo) in (rangos or {}).items():
+            parcial = self._mascara_rango(col, minimo, maximo)
+            if parcial is not None:
+                mascara &= parcial
+        return mascara
+
+    def filtrar(self, mascara: np.ndarray) -> pd.DataFrame:
+        """
+        DataFrame con las filas de la máscara. Si pasan todas las filas se
+        devuelve el DataFrame base sin copiar, así que no debe modificarse.
+        """
+        if mascara.all():
+            return self.df
+        return self.df[mascara]
@@ -1,7 +1,11 @@
-from google import genai
 from dotenv import load_dotenv
 import os
 import json
+import time
+from google.genai import types
+from cache_analisis import CacheAnalisis, clave_analisis
+from cliente_gemini import ProveedorGemini
+from metricas import METRICAS, medir
 # import streamlit as st
 
 # st.write("La API key existe:", "GEMINI_API_KEY" in st.secrets)
@@ -10,7 +14,12 @@ def get_gemini_key():
     load_dotenv()
     import streamlit as st
 
-    api_key = st.secrets.get("GEMINI_API_KEY") or os.getenv("GEMINI_API_KEY")
+    try:
+        api_key = st.secrets.get("GEMINI_API_KEY")
+    except FileNotFoundError:
+        # Sin secrets.toml (p. ej. fuera de la app): solo .env / variables de entorno
+        api_key = None
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
 
     if not api_key:
         raise ValueError("❌ GEMINI_API_KEY no está configurada en st.secrets ni en el .env")
@@ -35,15 +44,30 @@ Clusters:
 - Premium: Alto desempeño.
 - Riesgo: Deterioro, alta probabilidad de pérdidas.
 """
+
+MODELO_GEMINI = "gemini-2.5-flash"
+
+# Cambiar si se modifica el prompt de análisis: invalida la caché persistente
+VERSION_PROMPT_ANALISIS = "analisis-v1"
+
+# Campos de la sucursal que entran al prompt (y por lo tanto a la clave de caché)
+CAMPOS_ANALISIS = ['Sucursal', 'Cluster_KM', 'Región', 'FPD_Neto_Actual', 'ICV_Actual',
+                   'Tasa_Morosidad', 'Score_Riesgo']
+
+# Caché compartida entre sesiones y reinicios del servidor
+cache_analisis = CacheAnalisis()
+
+# Un solo cliente (y pool de conexiones HTTP) para todo el proceso; la key se
+# resuelve en la primera llamada. Usar proveedor_gemini.reiniciar() al rotarla.
+proveedor_gemini = ProveedorGemini(get_gemini_key)
+
+
 def load_AI_info_sucursal(solicitud):
-    api_key = get_gemini_key()
+    client = proveedor_gemini.cliente()
 
     try:
-        client = genai.Client(api_key=api_key)
-        print("✅ Cliente de Gemini inicializado correctamente")
-
         response = client.models.generate_content(
-            model="gemini-2.5-flash",
+            model=MODELO_GEMINI,
             contents=solicitud
         )
         return response
@@ -53,28 +77,14 @@ def load_AI_info_sucursal(solicitud):
         return e
 
 
-def analyze_branch_with_gemini(sucursal_data):
-    """
-    Analiza una sucursal específica usando Gemini AI
-    
-    Args:
-        sucursal_data: Diccionario con datos de la sucursal
-        
-    Returns:
-        Diccionario con causes, suggestions y riskFactor
-    """
+def clave_sucursal(sucursal_data):
+    """Clave de caché: misma sucursal con los mismos KPIs, prompt y modelo -> mismo análisis"""
+    payload = {campo: sucursal_data.get(campo) for campo in CAMPOS_ANALISIS}
+    return clave_analisis(payload, f"{VERSION_PROMPT_ANALISIS}:{MODELO_GEMINI}")
 
-    # Obtener API Key desde secrets o .env
-    try:
-        api_key = get_gemini_key()
-    except Exception as e:
-        return {
-            "causes": ["API Key no encontrada"],
-            "suggestions": ["Configurar GEMINI_API_KEY en secrets o .env"],
-            "riskFactor": "N/A"
-        }
 
-    prompt = f"""
+def prompt_analisis(sucursal_data):
+    return f"""
     Analiza la sucursal: {sucursal_data.get('Sucursal', 'N/A')}
     Datos:
     Cluster: {sucursal_data.get('Cluster_KM', 'N/A')}
@@ -97,22 +107,54 @@ def analyze_branch_with_gemini(sucursal_data):
     }}
     """
 
+
+CONFIG_ANALISIS = {
+    "system_instruction": DIGIBOT_SYSTEM_INSTRUCTION,
+    "response_mime_type": "application/json",
+    "temperature": 0.4,
+}
+
+
+def analyze_branch_with_gemini(sucursal_data, usar_cache=True):
+    """
+    Analiza una sucursal específica usando Gemini AI
+    
+    Args:
+        sucursal_data: Diccionario con datos de la sucursal
+        usar_cache: Consultar/guardar en la caché persistente de análisis
+        
+    Returns:
+        Diccionario con causes, suggestions y riskFactor
+    """
+    clave = clave_sucursal(sucursal_data)
+    if usar_cache:
+        guardado = cache_analisis.obtener(clave)
+        if guardado is not None:
+            return guardado
+
+    # Cliente compartido (la API Key se obtiene de secrets o .env una sola vez)
     try:
-        # Inicializar cliente Gemini con la API key correcta
-        client = genai.Client(api_key=api_key)
+        client = proveedor_gemini.cliente()
+    except Exception as e:
+        return {
+            "causes": ["API Key no encontrada"],
+            "suggestions": ["Configurar GEMINI_API_KEY en secrets o .env"],
+            "riskFactor": "N/A"
+        }
 
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-            config={
-                "system_instruction": DIGIBOT_SYSTEM_INSTRUCTION,
-                "response_mime_type": "application/json",
-                "temperature": 0.4,
-            }
-        )
+    try:
+        with medir("Gemini: análisis"):
+            response = client.models.generate_content(
+                model=MODELO_GEMINI,
+                contents=prompt_analisis(sucursal_data),
+                config=CONFIG_ANALISIS
+            )
 
         # Convertir respuesta a JSON real
-        return json.loads(response.text)
+        resultado = json.loads(response.text)
+        if usar_cache:
+            cache_analisis.guardar(clave, resultado)
+        return resultado
 
     except Exception as e:
         print(f"❌ Error al analizar sucursal: {e}")
@@ -123,30 +165,153 @@ def analyze_branch_with_gemini(sucursal_data):
         }
 
 
+async def analyze_branch_async(sucursal_data):
+    """
+    Versión asíncrona para lotes (ver preanalisis.py). A diferencia de
+    analyze_branch_with_gemini no oculta los errores: el que llama decide si
+    reintentar. El resultado se guarda en la caché persistente.
 
-def chat_with_digibot(history, new_message, context_data=""):
-    api_key = get_gemini_key()
+    Args:
+        sucursal_data: Diccionario con datos de la sucursal
 
+    Returns:
+        Diccionario con causes, suggestions y riskFactor
+    """
+    client = proveedor_gemini.cliente()
+    with medir("Gemini: análisis (lote)"):
+        response = await client.aio.models.generate_content(
+            model=MODELO_GEMINI,
+            contents=prompt_analisis(sucursal_data),
+            config=CONFIG_ANALISIS
+        )
+    resultado = json.loads(response.text)
+    cache_analisis.guardar(clave_sucursal(sucursal_data), resultado)
+    return resultado
+
+
+
+MENSAJE_ERROR_CHAT = "Lo siento, tuve un problema al procesar tu solicitud. Por favor verifica tu conexión o API Key."
+
+
+# Rondas de llamadas a herramientas por pregunta antes de exigir respuesta en texto
+MAX_RONDAS_HERRAMIENTAS = 4
+
+
+def config_chat(context_data="", herramientas=None):
     system_instruction = DIGIBOT_SYSTEM_INSTRUCTION
     if context_data:
         system_instruction += f"\n\nContexto actual de datos en pantalla:\n{context_data}"
+    config = {
+        "system_instruction": system_instruction,
+        "temperature": 0.7,
+    }
+    if herramientas is not None:
+        config["system_instruction"] += (
+            "\n\nPara rankings, filtros, comparaciones entre sucursales y tendencias usa las "
+            "herramientas de consulta: devuelven los valores exactos del dataset. No inventes cifras."
+        )
+        config["tools"] = herramientas.declaraciones()
+    return config
 
-    try:
-        client = genai.Client(api_key=api_key)
 
+def _partes(respuesta):
+    """Partes del primer candidato de una respuesta (o fragmento) de Gemini"""
+    if not respuesta.candidates or not respuesta.candidates[0].content:
+        return []
+    return respuesta.candidates[0].content.parts or []
+
+
+def _responder_llamadas(herramientas, llamadas):
+    """Ejecuta localmente las llamadas a funciones y arma las partes function_response"""
+    respuestas = []
+    for llamada in llamadas:
+        resultado = herramientas.ejecutar(llamada.name, llamada.args)
+        respuestas.append(types.Part(
+            function_response=types.FunctionResponse(name=llamada.name, response=resultado)
+        ))
+    return respuestas
+
+
+def chat_with_digibot(history, new_message, context_data="", herramientas=None):
+    client = proveedor_gemini.cliente()
+
+    try:
+        # Copia: la sesión de chat del SDK agrega los turnos a la lista que recibe
         chat = client.chats.create(
-            model="gemini-2.5-flash",
-            config={
-                "system_instruction": system_instruction,
-                "temperature": 0.7,
-            },
-            history=history
+            model=MODELO_GEMINI,
+            config=config_chat(context_data, herramientas),
+            history=list(history)
         )
 
-        result = chat.send_message(message=new_message)
-        return result.text
+        with medir("Gemini: chat"):
+            result = chat.send_message(message=new_message)
+            for _ in range(MAX_RONDAS_HERRAMIENTAS):
+                llamadas = [p.function_call for p in _partes(result) if p.function_call]
+                if not llamadas or herramientas is None:
+                    break
+                result = chat.send_message(message=_responder_llamadas(herramientas, llamadas))
+
+        return "".join(p.text for p in _partes(result) if p.text)
 
     except Exception as e:
         print(f"❌ Error en chat: {e}")
-        return "Lo siento, tuve un problema al procesar tu solicitud. Por favor verifica tu conexión o API Key."
-    
+        return MENSAJE_ERROR_CHAT
+
+
+def chat_with_digibot_stream(history, new_message, context_data="", herramientas=None):
+    """
+    Igual que chat_with_digibot pero entrega la respuesta por fragmentos
+    conforme Gemini los genera (streamGenerateContent), para mostrarla sin
+    esperar a que termine.
+
+    Si se pasan herramientas, las llamadas a funciones que pida el modelo se
+    ejecutan localmente y se le devuelven los resultados en otra petición,
+    hasta MAX_RONDAS_HERRAMIENTAS; la última ronda va sin herramientas para
+    que el modelo conteste en texto.
+
+    Args:
+        history: Turnos anteriores [{'role': 'user'|'model', 'parts': [{'text': ...}]}]
+        new_message: Pregunta del usuario
+        context_data: Texto de contexto que se agrega a las instrucciones del sistema
+        herramientas: HerramientasDatos con las consultas locales (None = sin herramientas)
+
+    Yields:
+        Fragmentos de texto de la respuesta (o el mensaje de error si falla)
+    """
+    contents = list(history) + [{'role': 'user', 'parts': [{'text': new_message}]}]
+    config = config_chat(context_data, herramientas)
+    hubo_texto = False
+    # Tiempo hasta el primer texto (lo que espera el usuario) y hasta el final del stream
+    inicio = time.perf_counter()
+    try:
+        client = proveedor_gemini.cliente()
+        for ronda in range(MAX_RONDAS_HERRAMIENTAS + 1):
+            if ronda == MAX_RONDAS_HERRAMIENTAS:
+                config = config_chat(context_data)
+            llamadas = []
+            for chunk in client.models.generate_content_stream(
+                model=MODELO_GEMINI,
+                contents=contents,
+                config=config
+            ):
+                for parte in _partes(chunk):
+                    if parte.function_call:
+                        llamadas.append(parte.function_call)
+                    elif parte.text:
+                        if not hubo_texto:
+                            METRICAS.registrar("Gemini: chat primer texto", (time.perf_counter() - inicio) * 1000)
+                        hubo_texto = True
+                        yield parte.text
+
+            if not llamadas or herramientas is None:
+                return
+            contents.append(types.Content(
+                role='model', parts=[types.Part(function_call=c) for c in llamadas]
+            ))
+            contents.append(types.Content(role='user', parts=_responder_llamadas(herramientas, llamadas)))
+
+    except Exception as e:
+        print(f"❌ Error en chat: {e}")
+        yield ("\n\n" if hubo_texto else "") + MENSAJE_ERROR_CHAT
+    finally:
+        METRICAS.registrar("Gemini: chat stream", (time.perf_counter() - inicio) * 1000)
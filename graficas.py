@@ -0,0 +1,153 @@
+"""
+Gráficas de Altair con la especificación Vega-Lite memorizada.
+
+st.altair_chart convierte el Chart a Vega-Lite en cada rerun: valida el
+esquema completo, serializa cada DataFrame a Arrow y calcula su md5 para
+nombrar el dataset. Con los datos sin cambios ese trabajo da el mismo
+resultado cada vez. CacheGraficas guarda la especificación ya convertida
+(con los datasets con nombre en bytes Arrow) bajo la clave de la gráfica y
+la huella de sus datos, y la dibuja con st.vega_lite_chart; el Chart solo se
+construye cuando cambian los datos.
+
+La especificación que sale de la caché es idéntica a la que generaría
+st.altair_chart, así que el mensaje al navegador también lo es: con
+global.minCachedMessageSize bajo (.streamlit/config.toml) Streamlit envía
+solo una referencia a las gráficas que el navegador ya tiene.
+
+La conversión es la función privada de Streamlit que usa st.altair_chart, así
+que solo se memoriza con las versiones verificadas en VERSIONES_STREAMLIT
+(requirements.txt fija streamlit==1.51.0). Con otra versión, o si la
+conversión o st.vega_lite_chart fallan, se avisa y se dibuja con
+st.altair_chart como antes.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional, Sequence, Union
+
+import pandas as pd
+import streamlit as st
+
+from tiempos import cronometrar
+
+# Versiones de Streamlit cuya conversión interna se revisó
+VERSIONES_STREAMLIT = ("1.51.0",)
+
+try:
+    # La misma conversión que usa st.altair_chart: deja los datos en
+    # "datasets" con nombre = md5 de sus bytes Arrow
+    from streamlit.elements.vega_charts import _convert_altair_to_vega_lite_spec
+except ImportError:  # otra versión de Streamlit: se dibuja sin memorizar
+    _convert_altair_to_vega_lite_spec = None
+
+
+def conversion_disponible() -> bool:
+    """True si la conversión interna de Streamlit existe y la versión está verificada"""
+    if _convert_altair_to_vega_lite_spec is None:
+        print("⚠️ Gráficas sin memorizar: esta versión de Streamlit no tiene la conversión de Altair")
+        return False
+    if st.__version__ not in VERSIONES_STREAMLIT:
+        print(f"⚠️ Gráficas sin memorizar: streamlit {st.__version__} no está en las versiones "
+              f"verificadas {VERSIONES_STREAMLIT}")
+        return False
+    return True
+
+# Especificaciones memorizadas (12 gráficas por página: 4 generales y 8 del detalle)
+MAX_ESPECIFICACIONES = 256
+
+Datos = Union[pd.DataFrame, Sequence[pd.DataFrame]]
+
+
+def huella_datos(datos: Datos) -> str:
+    """Hash del contenido de uno o varios DataFrames (columnas, tipos, categorías y valores)"""
+    h = hashlib.blake2b(digest_size=16)
+    for df in ([datos] if isinstance(datos, pd.DataFrame) else datos):
+        h.update(repr((list(df.columns), [str(t) for t in df.dtypes])).encode())
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype):
+                h.update(repr(list(df[col].cat.categories)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class CacheGraficas:
+    """
+    Especificaciones Vega-Lite por (clave de la gráfica, huella de los datos), LRU.
+
+    Args:
+        max_entradas: Especificaciones que se conservan (las menos usadas se descartan)
+        memorizar: False = dibujar siempre con st.altair_chart (None = según la versión de Streamlit)
+    """
+
+    def __init__(self, max_entradas: int = MAX_ESPECIFICACIONES, memorizar: Optional[bool] = None):
+        self.max_entradas = max_entradas
+        self.memorizar = conversion_disponible() if memorizar is None else memorizar
+        self._especificaciones: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def especificacion(self, clave: Hashable, datos: Datos, construir: Callable) -> Dict:
+        """
+        Especificación Vega-Lite de la gráfica.
+
+        Args:
+            clave: Identifica la gráfica y todo lo que use construir aparte de
+                los datos (columna, título, escala...)
+            datos: DataFrame(s) de los que sale la gráfica
+            construir: construir(datos) -> alt.Chart; solo se llama si la
+                especificación no está memorizada
+
+        Returns:
+            Diccionario Vega-Lite con "datasets"; se comparte, no debe modificarse.
+            None si la conversión de Streamlit falló (la memorización se desactiva)
+        """
+        llave = (clave, huella_datos(datos))
+        with self._lock:
+            especificacion = self._especificaciones.get(llave)
+            if especificacion is not None:
+                self._especificaciones.move_to_end(llave)
+                self.aciertos += 1
+                return especificacion
+        grafica = construir(datos)
+        try:
+            especificacion = _convert_altair_to_vega_lite_spec(grafica)
+        except Exception as e:
+            self._sin_memorizar(e)
+            return None
+        with self._lock:
+            self.fallos += 1
+            self._especificaciones[llave] = especificacion
+            while len(self._especificaciones) > self.max_entradas:
+                self._especificaciones.popitem(last=False)
+        return especificacion
+
+    def _sin_memorizar(self, error: Exception):
+        """Desactiva la memorización cuando los internos de Streamlit fallan"""
+        if self.memorizar:
+            self.memorizar = False
+            print(f"⚠️ Gráficas sin memorizar, se usa st.altair_chart: {type(error).__name__}: {error}")
+
+    def limpiar(self):
+        """Descarta todas las especificaciones y reinicia los contadores"""
+        with self._lock:
+            self._especificaciones.clear()
+            self.aciertos = self.fallos = 0
+
+    def dibujar(self, clave: Hashable, datos: Datos, construir: Callable,
+                use_container_width: Optional[bool] = True):
+        """Dibuja la gráfica desde la especificación memorizada (como st.altair_chart)"""
+        nombre = " ".join(map(str, clave)) if isinstance(clave, tuple) else str(clave)
+        with cronometrar(f"Gráfica {nombre}", mostrar=False):
+            if self.memorizar:
+                especificacion = self.especificacion(clave, datos, construir)
+                if especificacion is not None:
+                    try:
+                        return st.vega_lite_chart(especificacion, use_container_width=use_container_width)
+                    except Exception as e:
+                        self._sin_memorizar(e)
+            return st.altair_chart(construir(datos), use_container_width=use_container_width)
+
+
+# Caché compartida por las sesiones del proceso
+GRAFICAS = CacheGraficas()
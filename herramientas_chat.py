@@ -0,0 +1,234 @@
+"""
+Herramientas locales de consulta para DigiBot (function calling).
+
+En lugar de meter el dataset completo en el prompt, el modelo recibe la
+declaración de unas cuantas funciones y las invoca cuando necesita datos:
+ranking por métrica, filtro por región/cluster/riesgo, comparación de dos
+sucursales y tendencia histórica de una sucursal. Se resuelven sobre el
+DataFrame ya cargado (con el motor de filtros y el índice de búsqueda) y la
+tabla de tendencias, y devuelven resultados compactos y exactos.
+"""
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from google.genai import types
+
+from busqueda import IndiceBusqueda, normalize, normalizar_consulta
+from filtros import MotorFiltros
+
+# Nombre que ve el modelo -> columna de df_clusters
+METRICAS = {
+    'FPD': 'FPD_Actual',
+    'ICV': 'ICV_Actual',
+    'Morosidad': 'Tasa_Morosidad',
+    'Tasa_Castigos': 'Tasa_Castigos',
+    'Score_Riesgo': 'Score_Riesgo',
+    'Capital_Dispersado': 'Capital_Dispersado_Actual',
+    'Saldo_Insoluto': 'Saldo_Insoluto_Total_Actual',
+    'Saldo_Vencido': 'Saldo_Insoluto_Vencido_Actual',
+    'Saldo_30_89': 'Saldo_30_89_Actual',
+    'Castigos': 'Castigos_Actual',
+    'Quitas': 'Quitas_Actual',
+}
+
+MAX_RESULTADOS = 20
+# Candidatos que se listan cuando un nombre de sucursal es ambiguo
+MAX_CANDIDATOS = 5
+
+
+def _valor(x):
+    """Valor JSON compacto: floats a 2 decimales, NaN a None, tipos numpy a Python"""
+    if isinstance(x, (np.integer,)):
+        return int(x)
+    if isinstance(x, (float, np.floating)):
+        return None if math.isnan(x) else round(float(x), 2)
+    return x
+
+
+def _esquema(propiedades: Dict[str, types.Schema], requeridos: List[str] = ()) -> types.Schema:
+    return types.Schema(type='OBJECT', properties=propiedades, required=list(requeridos))
+
+
+class HerramientasDatos:
+    """
+    Funciones de consulta sobre las sucursales cargadas.
+
+    Args:
+        df: DataFrame de sucursales de load_data (no se modifica)
+        tendencias: TablaTendencias del panel histórico (None = sin herramienta de tendencia)
+        motor: MotorFiltros ya construido sobre df (None = construir uno)
+        indice: IndiceBusqueda ya construido sobre df['Sucursal'] (None = construir uno)
+    """
+
+    def __init__(self, df: pd.DataFrame, tendencias=None, motor: Optional[MotorFiltros] = None,
+                 indice: Optional[IndiceBusqueda] = None):
+        self.df = df
+        self.tendencias = tendencias
+        self.motor = motor if motor is not None else MotorFiltros(df)
+        self.indice = indice if indice is not None else IndiceBusqueda(df['Sucursal'])
+        self._posicion = {s: i for i, s in enumerate(df['Sucursal'])}
+
+    # -------------------------------------------------------------
+    # Declaraciones para Gemini
+    # -------------------------------------------------------------
+    def declaraciones(self) -> List[types.Tool]:
+        metrica = types.Schema(type='STRING', enum=list(METRICAS),
+                               description="Métrica actual de la sucursal")
+        region = types.Schema(type='STRING', enum=self.motor.categorias('Región'),
+                              description="Región (omitir para todas)")
+        cluster = types.Schema(type='INTEGER', description="Cluster_KM (omitir para todos)")
+        nivel = types.Schema(type='STRING', enum=self.motor.categorias('Nivel_Riesgo'),
+                             description="Nivel de riesgo (omitir para todos)")
+        sucursal = types.Schema(type='STRING', description="Nombre de la sucursal")
+
+        funciones = [
+            types.FunctionDeclaration(
+                name='top_sucursales',
+                description="Ranking de sucursales por una métrica, opcionalmente dentro de una región, cluster o nivel de riesgo.",
+                parameters=_esquema({
+                    'metrica': metrica,
+                    'k': types.Schema(type='INTEGER', description=f"Número de sucursales (máx. {MAX_RESULTADOS})"),
+                    'ascendente': types.Schema(type='BOOLEAN', description="true = las de menor valor"),
+                    'region': region, 'cluster': cluster, 'nivel_riesgo': nivel,
+                }, ['metrica']),
+            ),
+            types.FunctionDeclaration(
+                name='filtrar_sucursales',
+                description="Sucursales de una región, cluster y/o nivel de riesgo, con el promedio de sus métricas principales.",
+                parameters=_esquema({'region': region, 'cluster': cluster, 'nivel_riesgo': nivel}),
+            ),
+            types.FunctionDeclaration(
+                name='comparar_sucursales',
+                description="Compara todas las métricas actuales de dos sucursales.",
+                parameters=_esquema({'sucursal_a': sucursal, 'sucursal_b': sucursal},
+                                    ['sucursal_a', 'sucursal_b']),
+            ),
+        ]
+        if self.tendencias is not None:
+            funciones.append(types.FunctionDeclaration(
+                name='tendencia_sucursal',
+                description="Tendencia lineal histórica (pendiente por periodo y R²) de una métrica de una sucursal.",
+                parameters=_esquema({
+                    'sucursal': sucursal,
+                    'metrica': types.Schema(type='STRING', enum=list(self.tendencias.familias)),
+                }, ['sucursal', 'metrica']),
+            ))
+        return [types.Tool(function_declarations=funciones)]
+
+    def ejecutar(self, nombre: str, argumentos: Optional[Dict]) -> Dict:
+        """Ejecuta una herramienta por nombre; los errores se devuelven al modelo como {'error': ...}"""
+        funciones = {
+            'top_sucursales': self.top_sucursales,
+            'filtrar_sucursales': self.filtrar_sucursales,
+            'comparar_sucursales': self.comparar_sucursales,
+            'tendencia_sucursal': self.tendencia_sucursal,
+        }
+        if nombre not in funciones:
+            return {'error': f"Herramienta desconocida: {nombre}"}
+        try:
+            return funciones[nombre](**(argumentos or {}))
+        except (KeyError, ValueError, TypeError) as e:
+            return {'error': e.args[0] if e.args else type(e).__name__}
+
+    # -------------------------------------------------------------
+    # Herramientas
+    # -------------------------------------------------------------
+    def _mascara(self, region=None, cluster=None, nivel_riesgo=None) -> np.ndarray:
+        return self.motor.mascara(categorias={
+            'Región': [region] if region else None,
+            'Cluster_KM': [int(cluster)] if cluster is not None else None,
+            'Nivel_Riesgo': [nivel_riesgo] if nivel_riesgo else None,
+        })
+
+    def resolver_sucursal(self, nombre: str) -> str:
+        """
+        Nombre exacto de una sucursal a partir de lo que escribió el usuario o el modelo.
+
+        Se acepta el nombre exacto (sin importar acentos ni mayúsculas) o una
+        subcadena que coincida con una sola sucursal; si no, KeyError con los
+        candidatos o sugerencias para que el modelo precise el nombre.
+        """
+        if nombre in self._posicion:
+            return nombre
+        termino = normalizar_consulta(nombre)
+        if not termino:
+            raise KeyError(f"Nombre de sucursal vacío o sin letras: '{nombre}'")
+        encontradas = self.indice.buscar(nombre, limite=MAX_CANDIDATOS + 1)
+        if len(encontradas) == 1 or (encontradas and normalize(encontradas[0]) == termino):
+            return encontradas[0]
+        if encontradas:
+            candidatos = ', '.join(encontradas[:MAX_CANDIDATOS])
+            raise KeyError(f"'{nombre}' coincide con varias sucursales ({candidatos}"
+                           f"{', ...' if len(encontradas) > MAX_CANDIDATOS else ''}); indica el nombre exacto")
+        sugerencias = self.indice.sugerir(nombre, limite=3)
+        raise KeyError(f"No existe la sucursal '{nombre}'" +
+                       (f"; ¿quisiste decir {', '.join(sugerencias)}?" if sugerencias else ""))
+
+    def _fila(self, sucursal: str) -> pd.Series:
+        return self.df.iloc[self._posicion[self.resolver_sucursal(sucursal)]]
+
+    def top_sucursales(self, metrica: str, k: int = 5, ascendente: bool = False,
+                       region=None, cluster=None, nivel_riesgo=None) -> Dict:
+        if metrica not in METRICAS:
+            raise ValueError(f"Métrica desconocida: {metrica}; usa una de {', '.join(METRICAS)}")
+        columna = METRICAS[metrica]
+        k = max(1, min(int(k), MAX_RESULTADOS))
+        df = self.motor.filtrar(self._mascara(region, cluster, nivel_riesgo))
+        top = df.nsmallest(k, columna) if ascendente else df.nlargest(k, columna)
+        return {
+            'metrica': metrica,
+            'universo': len(df),
+            'sucursales': [
+                {'sucursal': s, 'region': r, 'valor': _valor(v)}
+                for s, r, v in zip(top['Sucursal'], top['Región'], top[columna])
+            ],
+        }
+
+    def filtrar_sucursales(self, region=None, cluster=None, nivel_riesgo=None) -> Dict:
+        df = self.motor.filtrar(self._mascara(region, cluster, nivel_riesgo))
+        return {
+            'num_sucursales': len(df),
+            'promedios': {m: _valor(df[METRICAS[m]].mean())
+                          for m in ('FPD', 'ICV', 'Morosidad', 'Score_Riesgo')},
+            'riesgo': {k: int(v) for k, v in df['Nivel_Riesgo'].value_counts().items()},
+            'sucursales': df['Sucursal'].head(MAX_RESULTADOS).tolist(),
+            'truncado': len(df) > MAX_RESULTADOS,
+        }
+
+    def comparar_sucursales(self, sucursal_a: str, sucursal_b: str) -> Dict:
+        filas = [self._fila(sucursal_a), self._fila(sucursal_b)]
+        resultado = {}
+        for etiqueta, fila in zip(('a', 'b'), filas):
+            resultado[etiqueta] = {
+                'sucursal': fila['Sucursal'],
+                'region': fila['Región'],
+                'cluster': _valor(fila['Cluster_KM']),
+                'nivel_riesgo': fila['Nivel_Riesgo'],
+                **{m: _valor(fila[c]) for m, c in METRICAS.items()},
+            }
+        resultado['diferencia_a_menos_b'] = {
+            m: _valor(filas[0][c] - filas[1][c]) for m, c in METRICAS.items()
+        }
+        return resultado
+
+    def tendencia_sucursal(self, sucursal: str, metrica: str) -> Dict:
+        if self.tendencias is None:
+            raise ValueError("No hay histórico cargado")
+        if metrica not in self.tendencias.familias:
+            raise ValueError(f"Métrica desconocida: {metrica}; usa una de {', '.join(self.tendencias.familias)}")
+        nombre = self.resolver_sucursal(sucursal)
+        pendiente, intercepto, r2 = self.tendencias.de(nombre, metrica)
+        nivel = self.tendencias.nivel[self.tendencias.sucursales.get_loc(nombre),
+                                      self.tendencias.familias.index(metrica)]
+        return {
+            'sucursal': nombre,
+            'metrica': metrica,
+            'periodos': self.tendencias.periodos,
+            'pendiente_por_periodo': _valor(pendiente),
+            'pendiente_pct_del_promedio': _valor(pendiente / abs(nivel) * 100 if nivel else float('nan')),
+            'r2': _valor(r2),
+            'valor_inicial_ajustado': _valor(intercepto),
+            'valor_final_ajustado': _valor(intercepto + pendiente * (self.tendencias.periodos - 1)),
+        }
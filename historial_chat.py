@@ -0,0 +1,128 @@
+"""
+Historial del chat de DigiBot con presupuesto de tokens.
+
+Cada pregunta al chat reenvía el historial completo, así que sin límite el
+tamaño de la petición (y la latencia) crece con cada turno. HistorialChat
+conserva textuales los turnos recientes y, cuando se pasa del presupuesto,
+compacta los más antiguos en un resumen acumulado que se envía como un
+turno inicial. También registra el tamaño estimado del prompt de cada turno
+contra el que tendría con el historial completo.
+"""
+import os
+import re
+from typing import Callable, Dict, List, Optional
+
+# Presupuesto del historial (resumen + turnos textuales), en tokens estimados
+PRESUPUESTO_TOKENS = int(os.getenv("DIGIBOT_HISTORIAL_TOKENS", "1500"))
+# Pares pregunta/respuesta más recientes que nunca se compactan
+TURNOS_RECIENTES_MIN = 2
+# Fracción del presupuesto que puede ocupar el resumen
+FRACCION_RESUMEN = 0.3
+# Caracteres por token (aproximación para español; evita llamar a count_tokens)
+CARACTERES_POR_TOKEN = 4
+MAX_CARACTERES_LINEA_RESUMEN = 160
+
+
+def estimar_tokens(texto: str) -> int:
+    return -(-len(texto) // CARACTERES_POR_TOKEN)
+
+
+def _texto(mensaje: Dict) -> str:
+    return "".join(parte.get('text', '') for parte in mensaje['parts'])
+
+
+def _recortar(texto: str, limite: int = MAX_CARACTERES_LINEA_RESUMEN) -> str:
+    """Primera oración (o los primeros caracteres) del texto, en una línea"""
+    texto = re.sub(r'\s+', ' ', texto).strip()
+    oracion = re.split(r'(?<=[.!?])\s', texto, maxsplit=1)[0]
+    return oracion if len(oracion) <= limite else oracion[:limite - 1].rstrip() + "…"
+
+
+def resumen_extractivo(pregunta: str, respuesta: str) -> str:
+    """Una línea por par pregunta/respuesta, sin llamar al modelo"""
+    return f"- Usuario: {_recortar(pregunta)} → DigiBot: {_recortar(respuesta)}"
+
+
+class HistorialChat:
+    """
+    Turnos del chat en el formato de contents de Gemini, acotados por tokens.
+
+    Args:
+        presupuesto_tokens: Tokens estimados máximos del resumen más los turnos textuales
+        turnos_recientes_min: Pares pregunta/respuesta que siempre se conservan textuales
+        resumir: Función (pregunta, respuesta) -> línea de resumen de un par compactado
+    """
+
+    def __init__(self, presupuesto_tokens: int = PRESUPUESTO_TOKENS,
+                 turnos_recientes_min: int = TURNOS_RECIENTES_MIN,
+                 resumir: Callable[[str, str], str] = resumen_extractivo):
+        self.presupuesto_tokens = presupuesto_tokens
+        self.turnos_recientes_min = turnos_recientes_min
+        self.resumir = resumir
+        self.turnos: List[Dict] = []
+        self.lineas_resumen: List[str] = []
+        self.turnos_compactados = 0
+        # Tokens que tendría el historial si nunca se compactara
+        self.tokens_completos = 0
+        # Un registro por pregunta: tamaño del prompt enviado vs. sin compactar
+        self.metricas: List[Dict] = []
+
+    def __len__(self) -> int:
+        return len(self.turnos)
+
+    @property
+    def resumen(self) -> str:
+        return "\n".join(self.lineas_resumen)
+
+    def tokens_historial(self) -> int:
+        """Tokens estimados de lo que envía mensajes() (resumen incluido)"""
+        return sum(estimar_tokens(_texto(m)) for m in self.mensajes())
+
+    def mensajes(self) -> List[Dict]:
+        """Historial a enviar: el resumen (si hay) como primer intercambio y luego los turnos textuales"""
+        if not self.lineas_resumen:
+            return list(self.turnos)
+        return [
+            {'role': 'user', 'parts': [{'text': f"Resumen de la conversación anterior:\n{self.resumen}"}]},
+            {'role': 'model', 'parts': [{'text': "Entendido, tengo presente lo conversado."}]},
+            *self.turnos,
+        ]
+
+    def registrar_prompt(self, instruccion: str, pregunta: str) -> Dict:
+        """
+        Anota el tamaño estimado del prompt de la pregunta que se va a enviar.
+
+        Returns:
+            Diccionario con turno, tokens_prompt y tokens_sin_compactar
+        """
+        fijos = estimar_tokens(instruccion) + estimar_tokens(pregunta)
+        metrica = {
+            'turno': len(self.metricas) + 1,
+            'tokens_prompt': fijos + self.tokens_historial(),
+            'tokens_sin_compactar': fijos + self.tokens_completos,
+        }
+        self.metricas.append(metrica)
+        return metrica
+
+    def agregar(self, pregunta: str, respuesta: str):
+        """Agrega un par pregunta/respuesta y compacta si se excede el presupuesto"""
+        self.turnos.append({'role': 'user', 'parts': [{'text': pregunta}]})
+        self.turnos.append({'role': 'model', 'parts': [{'text': respuesta}]})
+        self.tokens_completos += estimar_tokens(pregunta) + estimar_tokens(respuesta)
+        self._compactar()
+
+    def _compactar(self):
+        minimo = 2 * self.turnos_recientes_min
+        while self.tokens_historial() > self.presupuesto_tokens and len(self.turnos) > minimo:
+            pregunta, respuesta = self.turnos[0], self.turnos[1]
+            del self.turnos[:2]
+            self.lineas_resumen.append(self.resumir(_texto(pregunta), _texto(respuesta)))
+            self.turnos_compactados += 1
+
+        # El resumen también tiene tope: se olvidan primero las líneas más antiguas
+        tope_resumen = int(self.presupuesto_tokens * FRACCION_RESUMEN)
+        while len(self.lineas_resumen) > 1 and estimar_tokens(self.resumen) > tope_resumen:
+            self.lineas_resumen.pop(0)
+
+    def ultima_metrica(self) -> Optional[Dict]:
+        return self.metricas[-1] if self.metricas else None
@@ -0,0 +1,194 @@
+"""
+Acceso perezoso al panel histórico de sucursales (hoja Datos_Completos).
+
+La hoja tiene ~130 columnas anchas (<métrica>_T-12 … <métrica>_Actual) que la
+página principal nunca usa. En lugar de materializarla completa en load_data,
+se expone un objeto ligero que lee del snapshot Parquet solo las familias de
+métricas y las sucursales que cada página pide.
+
+Para las gráficas temporales, las columnas anchas se reorganizan una sola vez
+en un arreglo sucursal × métrica × periodo (PanelHistorico), de modo que la
+serie de una sucursal es un slice del arreglo y no requiere buscar columnas
+por nombre en cada rerun.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from snapshot import leer_hoja, ruta_hoja, version_snapshot
+from tendencias import TablaTendencias
+
+HOJA_HISTORICO = 'Datos_Completos'
+
+# Familias que se grafican en la página de detalle
+FAMILIAS_PANEL = ["ICV", "Capital Dispersado", "Saldo Insoluto Total", "Saldo Insoluto Vencido",
+                  "Saldo 30-89", "FPD", "Castigos", "Quitas"]
+
+
+def prefijo_familia(familia: str) -> str:
+    """Convierte el nombre mostrado de una métrica ("Saldo 30-89") a su prefijo de columna"""
+    return familia.replace(" ", "_").replace("-", "_")
+
+
+@lru_cache(maxsize=8)
+def _columnas_hoja(ruta_excel: str, hoja: str, version: str) -> Tuple[str, ...]:
+    return tuple(pq.read_schema(ruta_hoja(ruta_excel, hoja)).names)
+
+
+@lru_cache(maxsize=64)
+def _leer_proyeccion(ruta_excel: str, hoja: str, version: str,
+                     columnas: Tuple[str, ...], sucursales: Optional[Tuple[str, ...]]) -> pd.DataFrame:
+    filtros = [('Sucursal', 'in', list(sucursales))] if sucursales is not None else None
+    return leer_hoja(ruta_excel, hoja, columnas=list(columnas), filtros=filtros)
+
+
+def _periodo(columna: str) -> str:
+    """'ICV_T-12' -> 'T-12', 'ICV_Actual' -> 'Actual'"""
+    return columna.rsplit("_", 1)[-1]
+
+
+class PanelHistorico:
+    """
+    Histórico en formato compacto: valores[sucursal, familia, periodo].
+
+    Args:
+        sucursales: Nombres de sucursal (uno por fila del arreglo)
+        familias: Familias de métricas (eje 1)
+        periodos: Etiquetas de periodo en orden cronológico (eje 2)
+        valores: Arreglo de forma (sucursales, familias, periodos)
+    """
+
+    def __init__(self, sucursales: List[str], familias: List[str], periodos: List[str],
+                 valores: np.ndarray):
+        self.sucursales = list(sucursales)
+        self.familias = list(familias)
+        self.periodos = list(periodos)
+        self.valores = valores
+        self._fila: Dict[str, int] = {s: i for i, s in enumerate(self.sucursales)}
+        self._familia: Dict[str, int] = {f: j for j, f in enumerate(self.familias)}
+
+    @classmethod
+    def desde_ancho(cls, df: pd.DataFrame, columnas_por_familia: Dict[str, List[str]],
+                    dtype=np.float32) -> 'PanelHistorico':
+        """
+        Reorganiza un DataFrame ancho (una columna por métrica y periodo) en el panel.
+
+        Las sucursales repetidas conservan su primera fila, igual que df_clusters.
+        """
+        df = df.drop_duplicates(subset=['Sucursal'], keep='first')
+        familias = list(columnas_por_familia)
+
+        periodos = [_periodo(c) for c in columnas_por_familia[familias[0]]]
+        for familia, columnas in columnas_por_familia.items():
+            if [_periodo(c) for c in columnas] != periodos:
+                raise ValueError(f"La familia '{familia}' no tiene los periodos {periodos}")
+
+        valores = np.empty((len(df), len(familias), len(periodos)), dtype=dtype)
+        for j, familia in enumerate(familias):
+            valores[:, j, :] = df[columnas_por_familia[familia]].to_numpy(dtype=dtype)
+        # El panel se comparte entre sesiones: solo lectura
+        valores.setflags(write=False)
+        return cls(df['Sucursal'].tolist(), familias, periodos, valores)
+
+    def __contains__(self, sucursal: str) -> bool:
+        return sucursal in self._fila
+
+    def fila(self, sucursal: str) -> int:
+        return self._fila[sucursal]
+
+    def serie(self, sucursal: str, familia: str) -> np.ndarray:
+        """Serie de una familia para una sucursal (vista sobre el arreglo, sin copia)"""
+        return self.valores[self._fila[sucursal], self._familia[familia]]
+
+    def sucursal(self, sucursal: str) -> np.ndarray:
+        """Todas las familias de una sucursal, forma (familias, periodos), sin copia"""
+        return self.valores[self._fila[sucursal]]
+
+
+@lru_cache(maxsize=4)
+def _construir_panel(ruta_excel: str, hoja: str, version: str,
+                     familias: Tuple[str, ...]) -> PanelHistorico:
+    historico = HistoricoLazy(ruta_excel, hoja)
+    df = historico.cargar(familias=familias)
+    columnas = {f: historico.columnas_familia(f) for f in familias}
+    return PanelHistorico.desde_ancho(df, columnas)
+
+
+@lru_cache(maxsize=4)
+def _construir_tendencias(ruta_excel: str, hoja: str, version: str,
+                          familias: Tuple[str, ...]) -> TablaTendencias:
+    return TablaTendencias.desde_panel(_construir_panel(ruta_excel, hoja, version, familias))
+
+
+class HistoricoLazy:
+    """
+    Panel histórico que se carga bajo demanda, proyectado por familia de
+    métricas (ICV, FPD, Castigos, ...) y por sucursal.
+
+    Solo guarda la ruta del libro, así que es barato de serializar dentro de
+    st.cache_data; las lecturas se memorizan por versión del snapshot.
+    """
+
+    def __init__(self, ruta_excel: str, hoja: str = HOJA_HISTORICO):
+        self.ruta_excel = ruta_excel
+        self.hoja = hoja
+
+    @property
+    def version(self) -> str:
+        return version_snapshot(self.ruta_excel)
+
+    def columnas(self) -> List[str]:
+        """Nombres de todas las columnas de la hoja (solo lee el esquema)"""
+        return list(_columnas_hoja(self.ruta_excel, self.hoja, self.version))
+
+    def columnas_familia(self, familia: str) -> List[str]:
+        """
+        Columnas de una familia de métricas en orden de periodo (T-12 … Actual).
+
+        Solo acepta el sufijo de periodo justo después del prefijo, así "FPD"
+        no incluye las columnas de FPD_Neto.
+        """
+        patron = re.compile(rf'^{re.escape(prefijo_familia(familia))}_(T-\d+|[Aa]ctual)$')
+        return [c for c in self.columnas() if patron.match(c)]
+
+    def cargar(self, familias: Optional[Sequence[str]] = None,
+               sucursales: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Lee el panel proyectado a las familias y sucursales pedidas.
+
+        Args:
+            familias: Familias de métricas a incluir (None = todas las columnas)
+            sucursales: Sucursales a incluir (None = todas)
+
+        Returns:
+            DataFrame con 'Región', 'Sucursal' y las columnas de cada familia
+        """
+        if familias is None:
+            columnas = self.columnas()
+        else:
+            columnas = ['Región', 'Sucursal']
+            for familia in familias:
+                columnas += [c for c in self.columnas_familia(familia) if c not in columnas]
+
+        clave_sucursales = tuple(sucursales) if sucursales is not None else None
+        df = _leer_proyeccion(self.ruta_excel, self.hoja, self.version,
+                              tuple(columnas), clave_sucursales)
+        # Copia para que quien llama no altere el resultado memorizado
+        return df.copy()
+
+    def panel(self, familias: Sequence[str] = FAMILIAS_PANEL) -> PanelHistorico:
+        """
+        Panel sucursal × familia × periodo de todas las sucursales.
+
+        Se construye una vez por versión del snapshot y se comparte entre
+        sesiones; no debe modificarse.
+        """
+        return _construir_panel(self.ruta_excel, self.hoja, self.version, tuple(familias))
+
+    def tendencias(self, familias: Sequence[str] = FAMILIAS_PANEL) -> TablaTendencias:
+        """Pendiente, intercepto y R² de todas las sucursales y familias del panel"""
+        return _construir_tendencias(self.ruta_excel, self.hoja, self.version, tuple(familias))
@@ -0,0 +1,34 @@
+"""
+Índices de sucursales compartidos por las páginas del dashboard.
+
+El motor de filtros, el índice de búsqueda por nombre y el índice espacial se
+construyen una vez por versión de los datos (la del artefacto de
+precomputo.py) y los usan la página principal, la página de detalle y las
+herramientas de DigiBot, en lugar de que cada una arme los suyos sobre las
+mismas sucursales.
+"""
+import pandas as pd
+import streamlit as st
+
+from busqueda import IndiceBusqueda
+from espacial import VecindarioSucursales
+from filtros import MotorFiltros
+
+
+# Los parámetros con _ no se hashean: la versión de los datos identifica al DataFrame
+@st.cache_resource(max_entries=2)
+def motor_filtros(version: str, _df: pd.DataFrame) -> MotorFiltros:
+    """Códigos categóricos y métricas ordenadas para filtrar las sucursales"""
+    return MotorFiltros(_df)
+
+
+@st.cache_resource(max_entries=2)
+def indice_busqueda(version: str, _df: pd.DataFrame) -> IndiceBusqueda:
+    """Índice de nombres de sucursal normalizados"""
+    return IndiceBusqueda(_df['Sucursal'])
+
+
+@st.cache_resource(max_entries=2)
+def vecindario_sucursales(version: str, _df: pd.DataFrame) -> VecindarioSucursales:
+    """Índice espacial sobre las coordenadas de todas las sucursales"""
+    return VecindarioSucursales(_df)
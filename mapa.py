@@ -0,0 +1,245 @@
+"""
+Figura del "Mapa de Sucursales por Nivel de Riesgo".
+
+px.scatter_mapbox arma una traza por nivel de riesgo con 8 campos de hover
+por punto, y tanto el tiempo de construcción como el JSON que recibe el
+navegador crecen con el número de sucursales. Aquí la figura se arma con
+trazas Scattermapbox (WebGL) y valores redondeados mientras haya pocos
+puntos; por encima de UMBRAL_PUNTOS las sucursales se agregan en el servidor
+en una malla de celdas lat/lon y se dibuja un círculo por celda, así el
+tamaño de la figura queda acotado por el número de celdas, no de sucursales.
+
+La figura depende solo de las filas filtradas: firma_mascara() da una clave
+estable para memorizarla (ver cargar_figura_mapa en reto.py).
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from espacial import RADIO_TIERRA_KM
+
+# Sucursales a partir de las cuales el mapa se agrega por celdas
+UMBRAL_PUNTOS = int(os.getenv("MAPA_UMBRAL_PUNTOS", "5000"))
+# Número máximo de celdas por eje del área visible de las sucursales
+CELDAS_POR_EJE = 60
+
+COLORES_RIESGO = {
+    'Bajo': '#2e7d32',
+    'Medio': '#ef6c00',
+    'Alto': '#c62828',
+}
+CENTRO_MEXICO = {"lat": 23.6345, "lon": -102.5528}
+# Diámetro máximo de los marcadores en píxeles (igual que size_max de px)
+TAMANO_MAXIMO = 20
+
+_CAMPOS_HOVER = ['Región', 'Cluster_KM', 'FPD_Actual', 'ICV_Actual', 'Tasa_Morosidad', 'Score_Riesgo']
+_PLANTILLA_PUNTO = (
+    "<b>%{hovertext}</b><br>"
+    "Región=%{customdata[0]}<br>"
+    "Cluster_KM=%{customdata[1]}<br>"
+    "FPD_Actual=%{customdata[2]:.2f}<br>"
+    "ICV_Actual=%{customdata[3]:.2f}<br>"
+    "Tasa_Morosidad=%{customdata[4]:.2f}<br>"
+    "Score_Riesgo=%{customdata[5]:.2f}"
+    "<extra>%{fullData.name}</extra>"
+)
+_PLANTILLA_CELDA = (
+    "<b>%{customdata[0]} sucursales</b><br>"
+    "Alto: %{customdata[1]} · Medio: %{customdata[2]} · Bajo: %{customdata[3]}<br>"
+    "Score promedio: %{customdata[4]:.2f}<br>"
+    "FPD promedio: %{customdata[5]:.2f}"
+    "<extra></extra>"
+)
+
+
+def firma_mascara(mascara: np.ndarray) -> str:
+    """Clave corta y estable de las filas seleccionadas por una máscara booleana"""
+    bits = np.packbits(np.asarray(mascara, dtype=bool))
+    return f"{len(mascara)}:{hashlib.blake2b(bits.tobytes(), digest_size=16).hexdigest()}"
+
+
+def _tamanos(valores: np.ndarray, maximo: float) -> np.ndarray:
+    """Diámetros con área proporcional al valor (como size/size_max de px)"""
+    valores = np.nan_to_num(np.asarray(valores, dtype=np.float64), nan=0.0).clip(min=0)
+    if maximo <= 0:
+        return np.full(len(valores), TAMANO_MAXIMO / 2)
+    return np.sqrt(valores / maximo) * TAMANO_MAXIMO
+
+
+def agregar_celdas(df: pd.DataFrame, celdas_por_eje: int = CELDAS_POR_EJE) -> pd.DataFrame:
+    """
+    Agrupa sucursales en una malla regular lat/lon.
+
+    Args:
+        df: Sucursales con lat, lon, Nivel_Riesgo, Score_Riesgo y FPD_Actual
+        celdas_por_eje: Divisiones del rango lat/lon más amplio de las sucursales
+
+    Returns:
+        Una fila por celda ocupada con lat/lon (centroide de sus sucursales),
+        Sucursales, Alto, Medio, Bajo, Score_Riesgo, FPD_Actual y Pct_Alto
+    """
+    lat = df['lat'].to_numpy(dtype=np.float64)
+    lon = df['lon'].to_numpy(dtype=np.float64)
+    extension = max(np.ptp(lat), np.ptp(lon), 1e-9)
+    paso = extension / celdas_por_eje
+    celda_lat = np.floor((lat - lat.min()) / paso).astype(np.int64)
+    celda_lon = np.floor((lon - lon.min()) / paso).astype(np.int64)
+    clave = celda_lat * (celdas_por_eje + 1) + celda_lon
+
+    nivel = df['Nivel_Riesgo'].to_numpy()
+    agrupado = pd.DataFrame({
+        'celda': clave, 'lat': lat, 'lon': lon,
+        'Alto': nivel == 'Alto', 'Medio': nivel == 'Medio', 'Bajo': nivel == 'Bajo',
+        'Score_Riesgo': df['Score_Riesgo'].to_numpy(), 'FPD_Actual': df['FPD_Actual'].to_numpy(),
+    }).groupby('celda', sort=False)
+    celdas = agrupado.agg(
+        lat=('lat', 'mean'), lon=('lon', 'mean'), Sucursales=('lat', 'size'),
+        Alto=('Alto', 'sum'), Medio=('Medio', 'sum'), Bajo=('Bajo', 'sum'),
+        Score_Riesgo=('Score_Riesgo', 'mean'), FPD_Actual=('FPD_Actual', 'mean'),
+    ).reset_index(drop=True)
+    celdas['Pct_Alto'] = celdas['Alto'] / celdas['Sucursales'] * 100
+    return celdas
+
+
+def _trazas_puntos(df: pd.DataFrame) -> list:
+    """Una traza WebGL por nivel de riesgo, con hover armado desde customdata"""
+    maximo = float(np.nanmax(df['Score_Riesgo'].to_numpy(dtype=np.float64), initial=0.0))
+    trazas = []
+    for nivel, color in COLORES_RIESGO.items():
+        sub = df[df['Nivel_Riesgo'] == nivel]
+        if sub.empty:
+            continue
+        customdata = np.column_stack([
+            sub['Región'].to_numpy(dtype=object),
+            sub['Cluster_KM'].to_numpy(dtype=object),
+            *(sub[c].to_numpy(dtype=np.float64).round(2) for c in _CAMPOS_HOVER[2:]),
+        ])
+        trazas.append(go.Scattermapbox(
+            name=nivel,
+            lat=sub['lat'].to_numpy(dtype=np.float64).round(4),
+            lon=sub['lon'].to_numpy(dtype=np.float64).round(4),
+            mode='markers',
+            marker=dict(color=color, size=_tamanos(sub['Score_Riesgo'], maximo).round(1), sizemode='diameter'),
+            hovertext=sub['Sucursal'].to_numpy(dtype=object),
+            customdata=customdata,
+            hovertemplate=_PLANTILLA_PUNTO,
+        ))
+    return trazas
+
+
+def _traza_celdas(celdas: pd.DataFrame) -> go.Scattermapbox:
+    """Un círculo por celda: área por número de sucursales, color por % en riesgo alto"""
+    maximo = float(celdas['Sucursales'].max())
+    return go.Scattermapbox(
+        name='Celdas',
+        lat=celdas['lat'].to_numpy().round(4),
+        lon=celdas['lon'].to_numpy().round(4),
+        mode='markers',
+        marker=dict(
+            size=np.maximum(_tamanos(celdas['Sucursales'], maximo) * 1.5, 4).round(1),
+            color=celdas['Pct_Alto'].to_numpy().round(1),
+            colorscale=[[0, COLORES_RIESGO['Bajo']], [0.5, COLORES_RIESGO['Medio']], [1, COLORES_RIESGO['Alto']]],
+            cmin=0, cmax=100,
+            colorbar=dict(title="% Alto", thickness=12),
+            opacity=0.8,
+        ),
+        customdata=np.column_stack([
+            celdas['Sucursales'], celdas['Alto'], celdas['Medio'], celdas['Bajo'],
+            celdas['Score_Riesgo'].round(2), celdas['FPD_Actual'].round(2),
+        ]),
+        hovertemplate=_PLANTILLA_CELDA,
+    )
+
+
+def figura_mapa(df: pd.DataFrame, umbral: int = UMBRAL_PUNTOS,
+                celdas_por_eje: int = CELDAS_POR_EJE) -> go.Figure:
+    """
+    Mapa de las sucursales filtradas.
+
+    Args:
+        df: Sucursales filtradas (no se modifica)
+        umbral: Con más sucursales que esto se agregan por celdas
+        celdas_por_eje: Resolución de la malla de agregación
+
+    Returns:
+        Figura de Plotly lista para st.plotly_chart
+    """
+    if len(df) > umbral:
+        celdas = agregar_celdas(df, celdas_por_eje)
+        trazas = [_traza_celdas(celdas)]
+        titulo = f"Sucursales Filtradas: {len(df):,} (agrupadas en {len(celdas):,} zonas)"
+    else:
+        trazas = _trazas_puntos(df)
+        titulo = f"Sucursales Filtradas: {len(df)}"
+
+    fig = go.Figure(trazas)
+    fig.update_layout(
+        title=titulo,
+        height=500,
+        legend_title_text="Nivel_Riesgo",
+        mapbox_style="carto-positron",
+        mapbox_center=CENTRO_MEXICO,
+        mapbox_zoom=4,
+        margin={"r": 0, "t": 40, "l": 0, "b": 0},
+    )
+    return fig
+
+
+def _circulo(lat: float, lon: float, radio_km: float, puntos: int = 64):
+    """Vértices (lat, lon) de un círculo geodésico, para dibujarlo como línea"""
+    angulo = radio_km / RADIO_TIERRA_KM
+    rumbo = np.linspace(0, 2 * np.pi, puntos)
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(angulo) + np.cos(lat1) * np.sin(angulo) * np.cos(rumbo))
+    lon2 = lon1 + np.arctan2(np.sin(rumbo) * np.sin(angulo) * np.cos(lat1),
+                             np.cos(angulo) - np.sin(lat1) * np.sin(lat2))
+    return np.degrees(lat2).round(4), np.degrees(lon2).round(4)
+
+
+def figura_con_vecindario(fig: go.Figure, sucursal: str, lat: float, lon: float,
+                          vecinos: pd.DataFrame, radio_km: float) -> go.Figure:
+    """
+    Copia de la figura del mapa con una sucursal, su radio de búsqueda y sus
+    vecinos resaltados, centrada en la sucursal. La figura original (memorizada)
+    no se modifica.
+
+    Args:
+        fig: Figura de figura_mapa
+        sucursal, lat, lon: Sucursal seleccionada
+        vecinos: Tabla de VecindarioSucursales.vecinos_de
+        radio_km: Radio de la búsqueda
+    """
+    fig = go.Figure(fig)
+    circulo_lat, circulo_lon = _circulo(lat, lon, radio_km)
+    fig.add_trace(go.Scattermapbox(
+        name=f"Radio {radio_km:g} km", lat=circulo_lat, lon=circulo_lon, mode='lines',
+        line=dict(color='#0A3D20', width=2), hoverinfo='skip',
+    ))
+    if len(vecinos):
+        fig.add_trace(go.Scattermapbox(
+            name="Vecinos",
+            lat=vecinos['lat'].to_numpy().round(4),
+            lon=vecinos['lon'].to_numpy().round(4),
+            mode='markers',
+            marker=dict(size=14, opacity=0.9,
+                        color=[COLORES_RIESGO.get(n, '#666') for n in vecinos['Nivel_Riesgo']]),
+            hovertext=vecinos['Sucursal'].to_numpy(dtype=object),
+            customdata=np.column_stack([vecinos['Distancia_km'].round(1), vecinos['Nivel_Riesgo'],
+                                        vecinos['Score_Riesgo'].round(2)]),
+            hovertemplate="<b>%{hovertext}</b><br>%{customdata[0]} km · Riesgo %{customdata[1]}"
+                          "<br>Score_Riesgo=%{customdata[2]}<extra></extra>",
+        ))
+    fig.add_trace(go.Scattermapbox(
+        name=sucursal, lat=[round(lat, 4)], lon=[round(lon, 4)], mode='markers',
+        marker=dict(size=20, color='#0A3D20'), hovertext=[sucursal],
+        hovertemplate="<b>%{hovertext}</b><extra>Seleccionada</extra>",
+    ))
+    # Zoom para que el diámetro del círculo ocupe ~400 de los 500 px de alto
+    # (a zoom 0 un píxel de Mapbox GL mide ~78 km en el ecuador)
+    metros_por_pixel = 2 * max(radio_km, 1) * 1000 / 400
+    zoom = float(np.clip(np.log2(78271.5 * np.cos(np.radians(lat)) / metros_por_pixel), 3, 12))
+    fig.update_layout(mapbox_center={"lat": lat, "lon": lon}, mapbox_zoom=zoom)
+    return fig
@@ -0,0 +1,152 @@
+"""
+Almacén de latencias por sección del proceso, con exportación Prometheus/JSON.
+
+Cada sección (carga de datos, filtros, mapa, cada gráfica, llamadas a
+Gemini...) guarda sus últimas VENTANA duraciones en una ventana móvil, más el
+total acumulado de ejecuciones y milisegundos. Con eso se calculan p50/p95
+recientes y se exporta un summary de Prometheus (cuantiles de la ventana,
+_sum y _count acumulados) o el mismo resumen en JSON.
+
+No depende de Streamlit: lo usan tiempos.cronometrar() en la app y medir()
+en código que también corre fuera de ella (geminiPrueba, preanalisis).
+Con DASHBOARD_METRICAS_ARCHIVO=ruta.prom (o .json) la app vuelca el resumen
+a ese archivo, p. ej. para el textfile collector de node_exporter.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+# Duraciones recientes que se conservan por sección
+VENTANA = int(os.getenv("DASHBOARD_METRICAS_VENTANA", "500"))
+ARCHIVO_METRICAS = os.getenv("DASHBOARD_METRICAS_ARCHIVO")
+# Segundos mínimos entre dos volcados al archivo
+INTERVALO_VOLCADO = 10.0
+
+NOMBRE_PROMETHEUS = "dashboard_seccion_ms"
+CUANTILES = (0.5, 0.95)
+
+
+def resumir(muestras: Iterable[float]) -> Dict[str, float]:
+    """{'n', 'p50', 'p95', 'ultimo'} de una serie de duraciones en ms"""
+    valores = np.fromiter(muestras, dtype=np.float64)
+    if len(valores) == 0:
+        return {'n': 0, 'p50': float('nan'), 'p95': float('nan'), 'ultimo': float('nan')}
+    p50, p95 = np.percentile(valores, [50, 95])
+    return {'n': len(valores), 'p50': float(p50), 'p95': float(p95), 'ultimo': float(valores[-1])}
+
+
+def _etiqueta(valor: str) -> str:
+    # Escapado de valores de etiqueta del formato de texto de Prometheus
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class AlmacenMetricas:
+    """
+    Duraciones por sección en ventanas móviles, compartidas por todo el proceso.
+
+    Args:
+        ventana: Duraciones recientes que se conservan por sección
+    """
+
+    def __init__(self, ventana: int = VENTANA):
+        self.ventana = ventana
+        self._muestras: Dict[str, Deque[float]] = {}
+        self._totales: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._ultimo_volcado = 0.0
+
+    def registrar(self, seccion: str, ms: float):
+        """Anota una ejecución de la sección"""
+        with self._lock:
+            if seccion not in self._muestras:
+                self._muestras[seccion] = deque(maxlen=self.ventana)
+                self._totales[seccion] = [0, 0.0]
+            self._muestras[seccion].append(ms)
+            total = self._totales[seccion]
+            total[0] += 1
+            total[1] += ms
+
+    def limpiar(self):
+        with self._lock:
+            self._muestras.clear()
+            self._totales.clear()
+
+    def resumen(self) -> Dict[str, Dict[str, float]]:
+        """
+        Resumen por sección.
+
+        Returns:
+            {sección: {'n', 'p50', 'p95', 'ultimo' (de la ventana),
+                       'ejecuciones', 'total_ms' (acumulados)}}
+        """
+        with self._lock:
+            copias = {s: (list(m), tuple(self._totales[s])) for s, m in self._muestras.items()}
+        resultado = {}
+        for seccion, (muestras, (ejecuciones, total_ms)) in sorted(copias.items()):
+            resultado[seccion] = {**resumir(muestras), 'ejecuciones': ejecuciones, 'total_ms': total_ms}
+        return resultado
+
+    def prometheus(self) -> str:
+        """Resumen en formato de texto de Prometheus (un summary por sección)"""
+        lineas = [
+            f"# HELP {NOMBRE_PROMETHEUS} Duración de las secciones del dashboard en ms "
+            f"(cuantiles de las últimas {self.ventana} ejecuciones)",
+            f"# TYPE {NOMBRE_PROMETHEUS} summary",
+        ]
+        for seccion, r in self.resumen().items():
+            etiqueta = f'seccion="{_etiqueta(seccion)}"'
+            for q in CUANTILES:
+                lineas.append(f'{NOMBRE_PROMETHEUS}{{{etiqueta},quantile="{q}"}} {r[f"p{round(q * 100)}"]:.3f}')
+            lineas.append(f"{NOMBRE_PROMETHEUS}_sum{{{etiqueta}}} {r['total_ms']:.3f}")
+            lineas.append(f"{NOMBRE_PROMETHEUS}_count{{{etiqueta}}} {r['ejecuciones']}")
+        return "\n".join(lineas) + "\n"
+
+    def json(self) -> str:
+        """Resumen en JSON, con la hora de generación y el tamaño de la ventana"""
+        return json.dumps({'generado': time.time(), 'ventana': self.ventana, 'secciones': self.resumen()},
+                          ensure_ascii=False, indent=1)
+
+    def volcar(self, ruta: str):
+        """Escribe el resumen en ruta (JSON si termina en .json, si no texto Prometheus)"""
+        contenido = self.json() if ruta.endswith(".json") else self.prometheus()
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        tmp = ruta + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(contenido)
+        os.replace(tmp, ruta)
+
+    def volcar_si_toca(self, ruta: Optional[str] = ARCHIVO_METRICAS):
+        """Vuelca al archivo configurado, como mucho una vez cada INTERVALO_VOLCADO segundos"""
+        if not ruta:
+            return
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora - self._ultimo_volcado < INTERVALO_VOLCADO:
+                return
+            self._ultimo_volcado = ahora
+        try:
+            self.volcar(ruta)
+        except OSError as e:
+            print(f"⚠️ No se pudieron volcar las métricas a {ruta}: {e}")
+
+
+# Almacén compartido por las sesiones del proceso
+METRICAS = AlmacenMetricas()
+
+
+@contextmanager
+def medir(seccion: str) -> Iterator[None]:
+    """Anota la duración del bloque en METRICAS (también si termina con excepción)"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICAS.registrar(seccion, (time.perf_counter() - inicio) * 1000)
@@ -0,0 +1,209 @@
+"""
+Perfil bajo demanda de un rerun del dashboard.
+
+Con ?perfil=1 en la URL se perfila el siguiente rerun completo de la página
+(render_main_page o detail.render) y el parámetro se quita, así que solo se
+perfila ese; con DASHBOARD_PERFIL=1 se perfilan todos. El modo por omisión
+es un muestreador: un hilo toma la pila del hilo del script cada
+INTERVALO_MS y cuenta las pilas completas, con un costo que no depende del
+número de llamadas. Con ?perfil=cprofile (o DASHBOARD_PERFIL=cprofile) se
+usa cProfile, que cuenta cada llamada pero hace más lento el rerun.
+
+Cada perfil se guarda en DASHBOARD_PERFIL_DIR (.perfiles) como:
+
+    <fecha>_<página>.folded   pilas plegadas "a;b;c N" (speedscope, flamegraph.pl)
+    <fecha>_<página>.pstats   en modo cprofile (python -m pstats, snakeviz)
+    <fecha>_<página>.json     metadatos: página, sucursal, filtros, duración y
+                              las funciones con más tiempo propio
+
+Sin el parámetro ni la variable el costo es leer un parámetro de la URL.
+"""
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import streamlit as st
+
+PERFIL_ENTORNO = os.getenv("DASHBOARD_PERFIL", "")
+PERFIL_DIR = os.getenv("DASHBOARD_PERFIL_DIR", ".perfiles")
+# Intervalo del muestreador
+INTERVALO_MS = 1.0
+# Funciones que se listan en los metadatos
+TOP_FUNCIONES = 25
+
+MODO_MUESTREO = "muestreo"
+MODO_CPROFILE = "cprofile"
+
+
+def modo_perfil() -> Optional[str]:
+    """Modo de perfil pedido para este rerun (None = no perfilar)"""
+    valor = st.query_params.get("perfil") or PERFIL_ENTORNO
+    if not valor or valor == "0":
+        return None
+    return MODO_CPROFILE if valor == MODO_CPROFILE else MODO_MUESTREO
+
+
+def _marco(codigo) -> str:
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+class Muestreador:
+    """
+    Cuenta las pilas de un hilo tomadas a intervalos fijos desde otro hilo.
+
+    Args:
+        hilo: Identificador del hilo a muestrear (threading.get_ident())
+        intervalo_ms: Milisegundos entre muestras
+    """
+
+    def __init__(self, hilo: int, intervalo_ms: float = INTERVALO_MS):
+        self.hilo = hilo
+        self.intervalo = intervalo_ms / 1000
+        self.pilas: Counter = Counter()
+        self._detener = threading.Event()
+        self._hilo_muestreo = threading.Thread(target=self._muestrear, name="perfilador", daemon=True)
+
+    def _muestrear(self):
+        while not self._detener.wait(self.intervalo):
+            marco = sys._current_frames().get(self.hilo)
+            pila = []
+            while marco is not None:
+                pila.append(marco.f_code)
+                marco = marco.f_back
+            if pila:
+                self.pilas[tuple(reversed(pila))] += 1
+
+    def iniciar(self):
+        self._hilo_muestreo.start()
+
+    def detener(self):
+        self._detener.set()
+        self._hilo_muestreo.join()
+
+    def plegadas(self) -> List[str]:
+        """Pilas en formato plegado: 'raíz;...;hoja muestras'"""
+        return [f"{';'.join(_marco(c) for c in pila)} {n}" for pila, n in self.pilas.most_common()]
+
+    def tiempo_propio(self, k: int = TOP_FUNCIONES) -> List[Dict]:
+        """Funciones con más muestras en la hoja de la pila (tiempo propio) y en toda la pila"""
+        propio, total = Counter(), Counter()
+        for pila, n in self.pilas.items():
+            propio[pila[-1]] += n
+            for codigo in set(pila):
+                total[codigo] += n
+        muestras = sum(self.pilas.values()) or 1
+        return [{'funcion': _marco(c), 'propio_pct': round(n / muestras * 100, 2),
+                 'total_pct': round(total[c] / muestras * 100, 2)} for c, n in propio.most_common(k)]
+
+
+def _resumen_cprofile(perfil: cProfile.Profile, k: int = TOP_FUNCIONES) -> List[Dict]:
+    estadisticas = pstats.Stats(perfil).stats
+    filas = sorted(estadisticas.items(), key=lambda item: item[1][2], reverse=True)[:k]
+    return [{'funcion': f"{nombre} ({os.path.basename(archivo)}:{linea})", 'llamadas': llamadas,
+             'propio_ms': round(propio * 1000, 3), 'acumulado_ms': round(acumulado * 1000, 3)}
+            for (archivo, linea, nombre), (_, llamadas, propio, acumulado, _) in filas]
+
+
+def _cprofile_plegadas(perfil: cProfile.Profile) -> List[str]:
+    """Aproximación plegada desde cProfile: cada arista llamador;función con su tiempo propio en µs"""
+    lineas = []
+    for (archivo, linea, nombre), (_, _, _, _, llamadores) in pstats.Stats(perfil).stats.items():
+        funcion = f"{nombre} ({os.path.basename(archivo)}:{linea})"
+        for (a, l, n), (_, _, propio, _) in llamadores.items():
+            if propio > 0:
+                lineas.append(f"{n} ({os.path.basename(a)}:{l});{funcion} {round(propio * 1e6)}")
+    return lineas
+
+
+def estado_sesion(claves: Sequence[str]) -> Dict:
+    """Valores de session_state de las claves dadas que existan (filtros, selección)"""
+    return {clave: st.session_state[clave] for clave in claves if clave in st.session_state}
+
+
+def _guardar(pagina: str, modo: str, segundos: float, completo: bool, estado: Dict,
+             plegadas: List[str], funciones: List[Dict], perfil: Optional[cProfile.Profile],
+             muestras: int) -> str:
+    os.makedirs(PERFIL_DIR, exist_ok=True)
+    ahora = time.time()
+    base = os.path.join(PERFIL_DIR, f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(ahora))}"
+                                    f"-{int(ahora * 1000) % 1000:03d}_{pagina}")
+    with open(base + ".folded", "w", encoding="utf-8") as f:
+        f.write("\n".join(plegadas) + "\n")
+    if perfil is not None:
+        perfil.dump_stats(base + ".pstats")
+    metadatos = {
+        'pagina': pagina,
+        'modo': modo,
+        'fecha': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'duracion_ms': round(segundos * 1000, 3),
+        # False si el rerun terminó con st.rerun() u otra excepción
+        'completo': completo,
+        'intervalo_ms': INTERVALO_MS if modo == MODO_MUESTREO else None,
+        'muestras': muestras,
+        'estado': estado,
+        'funciones': funciones,
+        'pid': os.getpid(),
+    }
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(metadatos, f, ensure_ascii=False, indent=2, default=str)
+    return base
+
+
+@contextmanager
+def perfilar_rerun(pagina: str, claves_estado: Sequence[str] = ()) -> Iterator[None]:
+    """
+    Perfila el bloque si el rerun lo pide (?perfil=... o DASHBOARD_PERFIL).
+
+    Args:
+        pagina: Página que se está dibujando (va en el nombre y los metadatos)
+        claves_estado: Claves de session_state que describen la vista (sucursal, filtros)
+    """
+    modo = modo_perfil()
+    if modo is None:
+        yield
+        return
+
+    # Solo este rerun: el siguiente ya no trae el parámetro
+    if "perfil" in st.query_params:
+        del st.query_params["perfil"]
+    estado = estado_sesion(claves_estado)
+    perfil, muestreador = None, None
+    if modo == MODO_CPROFILE:
+        perfil = cProfile.Profile()
+    else:
+        muestreador = Muestreador(threading.get_ident())
+
+    completo = False
+    inicio = time.perf_counter()
+    if perfil is not None:
+        perfil.enable()
+    else:
+        muestreador.iniciar()
+    try:
+        yield
+        completo = True
+    finally:
+        if perfil is not None:
+            perfil.disable()
+        else:
+            muestreador.detener()
+        segundos = time.perf_counter() - inicio
+        if perfil is not None:
+            plegadas, funciones, muestras = _cprofile_plegadas(perfil), _resumen_cprofile(perfil), 0
+        else:
+            plegadas, funciones = muestreador.plegadas(), muestreador.tiempo_propio()
+            muestras = sum(muestreador.pilas.values())
+        try:
+            base = _guardar(pagina, modo, segundos, completo, estado, plegadas, funciones, perfil, muestras)
+            print(f"🔬 Perfil del rerun ({pagina}, {segundos * 1000:,.0f} ms) guardado en {base}.*")
+            if completo:
+                st.toast(f"🔬 Perfil guardado en {base}.*")
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar el perfil en {PERFIL_DIR}: {e}")
@@ -0,0 +1,148 @@
+"""
+Pre-análisis en lote de sucursales con DigiBot.
+
+Genera con asyncio los análisis de un conjunto de sucursales (por defecto las
+de Nivel_Riesgo == 'Alto') y los deja en la caché persistente de análisis,
+así la página de detalle los muestra al instante sin esperar a Gemini. Las
+llamadas se limitan en concurrencia y en peticiones por minuto, y los errores
+transitorios (429, 5xx, red) se reintentan con backoff exponencial.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import pandas as pd
+from google.genai import errors
+
+from geminiPrueba import analyze_branch_async, cache_analisis, clave_sucursal
+
+MAX_CONCURRENTES = int(os.getenv("DIGIBOT_MAX_CONCURRENTES", "4"))
+PETICIONES_POR_MINUTO = int(os.getenv("DIGIBOT_RPM", "60"))
+MAX_REINTENTOS = 3
+ESPERA_BASE_SEGUNDOS = 1.0
+ESPERA_MAXIMA_SEGUNDOS = 30.0
+
+
+class LimitadorTasa:
+    """
+    Espacia el inicio de las peticiones para no pasar de N por minuto.
+
+    Args:
+        por_minuto: Peticiones permitidas por minuto (0 = sin límite)
+    """
+
+    def __init__(self, por_minuto: int):
+        self.intervalo = 60.0 / por_minuto if por_minuto > 0 else 0.0
+        self._siguiente = 0.0
+        self._lock = asyncio.Lock()
+
+    async def esperar(self):
+        async with self._lock:
+            ahora = time.monotonic()
+            inicio = max(ahora, self._siguiente)
+            self._siguiente = inicio + self.intervalo
+        if inicio > ahora:
+            await asyncio.sleep(inicio - ahora)
+
+
+def es_reintentable(error: Exception) -> bool:
+    """
+    429, 5xx, fallas de red y respuestas que no son JSON válido se reintentan;
+    otros errores HTTP (key inválida, petición mal formada) y de configuración
+    (API key faltante) no.
+    """
+    if isinstance(error, errors.APIError):
+        return error.code == 429 or (error.code or 0) >= 500
+    if isinstance(error, json.JSONDecodeError):
+        return True
+    return not isinstance(error, (ValueError, KeyError, TypeError))
+
+
+def sucursales_alto_riesgo(df: pd.DataFrame) -> List[Dict]:
+    """Filas de las sucursales con Nivel_Riesgo 'Alto', de mayor a menor Score_Riesgo"""
+    alto = df[df['Nivel_Riesgo'] == 'Alto'].sort_values('Score_Riesgo', ascending=False)
+    return alto.to_dict('records')
+
+
+def pendientes(sucursales: List[Dict]) -> List[Dict]:
+    """Sucursales que todavía no tienen análisis vigente en la caché"""
+    claves = [clave_sucursal(s) for s in sucursales]
+    existentes = cache_analisis.existentes(claves)
+    return [s for s, clave in zip(sucursales, claves) if clave not in existentes]
+
+
+async def preanalizar(sucursales: List[Dict], max_concurrentes: int = MAX_CONCURRENTES,
+                      por_minuto: int = PETICIONES_POR_MINUTO, max_reintentos: int = MAX_REINTENTOS,
+                      espera_base: float = ESPERA_BASE_SEGUNDOS,
+                      progreso: Optional[Callable[[int, int, str, str], None]] = None,
+                      analizar: Callable[[Dict], Awaitable[Dict]] = analyze_branch_async) -> Dict:
+    """
+    Analiza las sucursales que no estén en la caché.
+
+    Args:
+        sucursales: Filas de sucursales (diccionarios con las columnas del prompt)
+        max_concurrentes: Peticiones a Gemini en vuelo al mismo tiempo
+        por_minuto: Peticiones iniciadas por minuto (incluye reintentos)
+        max_reintentos: Reintentos por sucursal ante errores transitorios
+        espera_base: Espera del primer reintento; se duplica en cada intento (con jitter)
+        progreso: Función (hechas, total, sucursal, estado) llamada al terminar
+            cada sucursal; estado es 'ok', 'cache' o 'error'
+        analizar: Corrutina que analiza una sucursal y guarda el resultado
+
+    Returns:
+        Diccionario con analizadas, en_cache, fallidas ({sucursal: error}),
+        reintentos y segundos
+    """
+    inicio = time.perf_counter()
+    total = len(sucursales)
+    por_hacer = pendientes(sucursales)
+    resumen = {'analizadas': 0, 'en_cache': total - len(por_hacer), 'fallidas': {},
+               'reintentos': 0, 'segundos': 0.0}
+
+    hechas = 0
+
+    def avanzar(sucursal: str, estado: str):
+        nonlocal hechas
+        hechas += 1
+        if progreso is not None:
+            progreso(hechas, total, sucursal, estado)
+
+    por_hacer_ids = {id(s) for s in por_hacer}
+    for s in sucursales:
+        if id(s) not in por_hacer_ids:
+            avanzar(s.get('Sucursal'), 'cache')
+
+    semaforo = asyncio.Semaphore(max_concurrentes)
+    limitador = LimitadorTasa(por_minuto)
+
+    async def una(sucursal_data: Dict):
+        nombre = sucursal_data.get('Sucursal')
+        async with semaforo:
+            for intento in range(max_reintentos + 1):
+                await limitador.esperar()
+                try:
+                    await analizar(sucursal_data)
+                    resumen['analizadas'] += 1
+                    avanzar(nombre, 'ok')
+                    return
+                except Exception as e:
+                    if intento == max_reintentos or not es_reintentable(e):
+                        print(f"❌ Pre-análisis de {nombre} falló: {e}")
+                        resumen['fallidas'][nombre] = str(e)
+                        avanzar(nombre, 'error')
+                        return
+                    resumen['reintentos'] += 1
+                    espera = min(espera_base * 2 ** intento, ESPERA_MAXIMA_SEGUNDOS)
+                    await asyncio.sleep(espera * random.uniform(0.5, 1.0))
+
+    await asyncio.gather(*(una(s) for s in por_hacer))
+    resumen['segundos'] = time.perf_counter() - inicio
+    return resumen
+
+
+def preanalizar_en_lote(sucursales: List[Dict], **kwargs) -> Dict:
+    """Ejecuta preanalizar() desde código síncrono (p. ej. un script de Streamlit)"""
+    return asyncio.run(preanalizar(sucursales, **kwargs))
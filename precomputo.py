@@ -0,0 +1,313 @@
+"""
+Artefacto precalculado con todas las tablas derivadas del libro de sucursales.
+
+El pipeline corre sin Streamlit, una vez por cada libro nuevo:
+
+    python precomputo.py [--excel libro.xlsx] [--salida .artefacto] [--forzar]
+
+Lee las hojas desde el snapshot Parquet (snapshot.py) y escribe en una
+carpeta por versión (hash del SHA-256 del libro y de la huella de derivación):
+
+    sucursales.parquet   Clusters_S6 preparada (tasas, nivel y score de riesgo, coordenadas)
+    cubo.parquet         Celdas del CuboAgregado Región × Cluster × Nivel de Riesgo
+    panel.npy            Panel histórico sucursal × familia × periodo (float32)
+    panel_sucursales.parquet
+    tendencias.npz       Pendiente, intercepto, R² y nivel de cada sucursal y familia
+
+El manifest.json de la carpeta base apunta a la versión vigente, así que el
+dashboard solo lee archivos: no limpia la hoja ni ajusta tendencias al
+arrancar. Si el artefacto no existe o el libro cambió, asegurar_artefacto lo
+genera en el proceso (y avisa) para que la app siga funcionando.
+
+La huella de derivación cubre lo que, aparte del libro, determina las tablas:
+reglas y niveles de riesgo, familias del panel, coordenadas por región,
+FORMATO_ARTEFACTO y el código de los módulos que las calculan. Si cambia
+cualquiera, el artefacto deja de ser vigente y se reconstruye.
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from agregados import CuboAgregado
+from historico import FAMILIAS_PANEL, HistoricoLazy, PanelHistorico
+from preparacion import COORDS_REGION, preparar_sucursales
+from riesgo import NIVELES_RIESGO, REGLAS_RIESGO, clasificar_riesgo
+from snapshot import asegurar_snapshot, leer_hoja
+from tendencias import TablaTendencias
+
+# Directorio de los artefactos (configurable por variable de entorno)
+ARTEFACTO_DIR = os.getenv("RETO_ARTEFACTO_DIR", ".artefacto")
+
+# Se incrementa si cambia el contenido o la forma de las tablas derivadas
+FORMATO_ARTEFACTO = 1
+
+HOJA_SUCURSALES = 'Clusters_S6'
+MANIFEST = "manifest.json"
+
+
+@lru_cache(maxsize=1)
+def huella_derivacion() -> str:
+    """Hash de las reglas, constantes y código de los que salen las tablas derivadas"""
+    h = hashlib.sha256()
+    constantes = {
+        'formato': FORMATO_ARTEFACTO,
+        'reglas_riesgo': REGLAS_RIESGO,
+        'niveles_riesgo': NIVELES_RIESGO,
+        'familias': list(FAMILIAS_PANEL),
+        'coordenadas': COORDS_REGION,
+    }
+    h.update(json.dumps(constantes, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    # Código de preparación, riesgo, cubo, panel, tendencias y de este pipeline
+    for objeto in (preparar_sucursales, clasificar_riesgo, CuboAgregado, PanelHistorico,
+                   TablaTendencias, construir_artefacto):
+        with open(inspect.getsourcefile(objeto), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def _directorio_base(ruta_excel: str, directorio: str) -> str:
+    nombre = os.path.splitext(os.path.basename(ruta_excel))[0]
+    return os.path.join(directorio, nombre)
+
+
+def _leer_manifest(base: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(base, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_manifest(base: str, manifest: Dict):
+    tmp = os.path.join(base, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(base, MANIFEST))
+
+
+@lru_cache(maxsize=2)
+def _leer_sucursales(carpeta: str) -> pd.DataFrame:
+    return pd.read_parquet(os.path.join(carpeta, "sucursales.parquet"))
+
+
+@lru_cache(maxsize=2)
+def _leer_cubo(carpeta: str) -> CuboAgregado:
+    return CuboAgregado(pd.read_parquet(os.path.join(carpeta, "cubo.parquet")))
+
+
+@lru_cache(maxsize=2)
+def _leer_panel(carpeta: str, familias: tuple, periodos: tuple) -> PanelHistorico:
+    # Memory-map de solo lectura: el panel se comparte entre sesiones
+    valores = np.load(os.path.join(carpeta, "panel.npy"), mmap_mode="r")
+    sucursales = pd.read_parquet(os.path.join(carpeta, "panel_sucursales.parquet"))['Sucursal']
+    return PanelHistorico(sucursales.tolist(), list(familias), list(periodos), valores)
+
+
+@lru_cache(maxsize=2)
+def _leer_tendencias(carpeta: str, familias: tuple) -> TablaTendencias:
+    panel_sucursales = pd.read_parquet(os.path.join(carpeta, "panel_sucursales.parquet"))['Sucursal']
+    with np.load(os.path.join(carpeta, "tendencias.npz")) as arreglos:
+        return TablaTendencias(panel_sucursales.tolist(), list(familias), int(arreglos['periodos']),
+                               arreglos['pendiente'], arreglos['intercepto'], arreglos['r2'], arreglos['nivel'])
+
+
+class Artefacto:
+    """
+    Tablas derivadas de una versión del libro, leídas del artefacto.
+
+    Hace también de histórico para la página de detalle (version, panel y
+    tendencias, como HistoricoLazy). Solo guarda la carpeta y el manifest, así
+    que es barato de serializar dentro de st.cache_data; las lecturas se
+    memorizan por carpeta.
+
+    Args:
+        carpeta: Carpeta de la versión (<base>/<version>)
+        manifest: Manifest del artefacto
+    """
+
+    def __init__(self, carpeta: str, manifest: Dict):
+        self.carpeta = carpeta
+        self.manifest = manifest
+
+    @property
+    def version(self) -> str:
+        return self.manifest["version"]
+
+    def sucursales(self) -> pd.DataFrame:
+        """Sucursales preparadas (copia; el resultado memorizado no se altera)"""
+        return _leer_sucursales(self.carpeta).copy()
+
+    def cubo(self) -> CuboAgregado:
+        """Cubo de agregados de todas las sucursales"""
+        return _leer_cubo(self.carpeta)
+
+    def _indices(self, familias: Sequence[str]) -> Optional[list]:
+        """Posición de cada familia en el artefacto; None si son todas en el mismo orden"""
+        guardadas = self.manifest["familias"]
+        faltantes = [f for f in familias if f not in guardadas]
+        if faltantes:
+            raise KeyError(f"El artefacto no tiene las familias {faltantes}")
+        return None if list(familias) == guardadas else [guardadas.index(f) for f in familias]
+
+    def panel(self, familias: Sequence[str] = FAMILIAS_PANEL) -> PanelHistorico:
+        """Panel sucursal × familia × periodo; no debe modificarse"""
+        panel = _leer_panel(self.carpeta, tuple(self.manifest["familias"]), tuple(self.manifest["periodos"]))
+        indices = self._indices(familias)
+        if indices is None:
+            return panel
+        return PanelHistorico(panel.sucursales, list(familias), panel.periodos, panel.valores[:, indices])
+
+    def tendencias(self, familias: Sequence[str] = FAMILIAS_PANEL) -> TablaTendencias:
+        """Pendiente, intercepto y R² de todas las sucursales y familias del panel"""
+        tabla = _leer_tendencias(self.carpeta, tuple(self.manifest["familias"]))
+        indices = self._indices(familias)
+        if indices is None:
+            return tabla
+        return TablaTendencias(tabla.sucursales, list(familias), tabla.periodos, tabla.pendiente[:, indices],
+                               tabla.intercepto[:, indices], tabla.r2[:, indices], tabla.nivel[:, indices])
+
+
+def construir_artefacto(ruta_excel: str, directorio: str = ARTEFACTO_DIR) -> Artefacto:
+    """
+    Calcula todas las tablas derivadas del libro y las escribe como una versión nueva.
+
+    Args:
+        ruta_excel: Ruta del libro de Excel fuente
+        directorio: Directorio de los artefactos
+
+    Returns:
+        El artefacto recién escrito (ya marcado como vigente en el manifest)
+    """
+    inicio = time.perf_counter()
+    snapshot = asegurar_snapshot(ruta_excel)
+    derivacion = huella_derivacion()
+    version = hashlib.sha256(f"{snapshot['sha256']}:{derivacion}".encode()).hexdigest()[:16]
+
+    sucursales = preparar_sucursales(leer_hoja(ruta_excel, HOJA_SUCURSALES))
+    cubo = CuboAgregado.desde_filas(sucursales)
+    historico = HistoricoLazy(ruta_excel)
+    familias = list(FAMILIAS_PANEL)
+    panel = PanelHistorico.desde_ancho(historico.cargar(familias=familias),
+                                       {f: historico.columnas_familia(f) for f in familias})
+    tendencias = TablaTendencias.desde_panel(panel)
+
+    base = _directorio_base(ruta_excel, directorio)
+    os.makedirs(base, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=base)
+    try:
+        sucursales.to_parquet(os.path.join(tmp, "sucursales.parquet"))
+        cubo.celdas.to_parquet(os.path.join(tmp, "cubo.parquet"))
+        np.save(os.path.join(tmp, "panel.npy"), np.asarray(panel.valores))
+        pd.DataFrame({'Sucursal': panel.sucursales}).to_parquet(
+            os.path.join(tmp, "panel_sucursales.parquet"), index=False)
+        np.savez(os.path.join(tmp, "tendencias.npz"), pendiente=tendencias.pendiente,
+                 intercepto=tendencias.intercepto, r2=tendencias.r2, nivel=tendencias.nivel,
+                 periodos=tendencias.periodos)
+
+        # mkdtemp crea la carpeta solo para el dueño; la app puede correr con otro usuario
+        os.chmod(tmp, 0o755)
+        carpeta = os.path.join(base, version)
+        if os.path.isdir(carpeta):
+            shutil.rmtree(carpeta)
+        os.replace(tmp, carpeta)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    manifest = {
+        "formato": FORMATO_ARTEFACTO,
+        "version": version,
+        "fuente": os.path.abspath(ruta_excel),
+        "size": snapshot["size"],
+        "mtime_ns": snapshot["mtime_ns"],
+        "sha256": snapshot["sha256"],
+        "derivacion": derivacion,
+        "creado": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "filas": {"sucursales": len(sucursales), "cubo": len(cubo.celdas), "panel": len(panel.sucursales)},
+        "familias": familias,
+        "periodos": panel.periodos,
+    }
+    anterior = _leer_manifest(base)
+    _escribir_manifest(base, manifest)
+
+    # Conservar la versión vigente y la anterior (una app con la anterior cargada sigue leyendo)
+    conservar = {version, anterior.get("version") if anterior else None}
+    for d in os.listdir(base):
+        if os.path.isdir(os.path.join(base, d)) and not d.startswith(".") and d not in conservar:
+            shutil.rmtree(os.path.join(base, d), ignore_errors=True)
+    return Artefacto(carpeta, manifest)
+
+
+def asegurar_artefacto(ruta_excel: str, directorio: str = ARTEFACTO_DIR, avisar: bool = True) -> Artefacto:
+    """
+    Devuelve el artefacto vigente del libro.
+
+    La validación compara formato, huella de derivación, tamaño y mtime con
+    el manifest (y el SHA-256 solo si difieren). Si el libro no está
+    disponible se sirve el último artefacto escrito. Si falta, el libro cambió
+    o cambiaron las reglas o el código de derivación, se construye aquí
+    mismo; lo normal es haberlo generado antes con el pipeline.
+    """
+    base = _directorio_base(ruta_excel, directorio)
+    manifest = _leer_manifest(base)
+    existe = (
+        manifest is not None
+        and manifest.get("formato") == FORMATO_ARTEFACTO
+        and os.path.isdir(os.path.join(base, manifest["version"]))
+    )
+    if existe and not os.path.exists(ruta_excel):
+        # Sin el libro no se puede recalcular: se sirve el último artefacto escrito
+        if manifest.get("derivacion") != huella_derivacion():
+            print(f"⚠️ El artefacto de {ruta_excel} se calculó con otras reglas o código y el "
+                  f"libro no está disponible para recalcularlo; se sirve el último escrito")
+        return Artefacto(os.path.join(base, manifest["version"]), manifest)
+
+    if existe and manifest.get("derivacion") == huella_derivacion():
+        artefacto = Artefacto(os.path.join(base, manifest["version"]), manifest)
+        stat = os.stat(ruta_excel)
+        if manifest["size"] == stat.st_size and manifest["mtime_ns"] == stat.st_mtime_ns:
+            return artefacto
+        snapshot = asegurar_snapshot(ruta_excel)
+        if snapshot["sha256"] == manifest["sha256"]:
+            # Mismo contenido con otro mtime (p. ej. checkout de git): solo actualizar la huella
+            manifest.update(size=snapshot["size"], mtime_ns=snapshot["mtime_ns"])
+            _escribir_manifest(base, manifest)
+            return artefacto
+
+    if avisar:
+        print(f"⚠️ No hay artefacto vigente para {ruta_excel} (libro, reglas o código cambiaron); "
+              f"calculándolo (ejecute 'python precomputo.py' después de cada cambio)")
+    return construir_artefacto(ruta_excel, directorio)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--excel", default="analisis_completo_sucursales_20251127_031525.xlsx")
+    parser.add_argument("--salida", default=ARTEFACTO_DIR, help="Directorio de los artefactos")
+    parser.add_argument("--forzar", action="store_true", help="Recalcular aunque el artefacto esté vigente")
+    args = parser.parse_args()
+
+    if args.forzar:
+        artefacto = construir_artefacto(args.excel, args.salida)
+    else:
+        artefacto = asegurar_artefacto(args.excel, args.salida, avisar=False)
+    manifest = artefacto.manifest
+    print(f"Artefacto {manifest['version']} en {artefacto.carpeta} "
+          f"(formato {manifest['formato']}, creado {manifest['creado']}, {manifest['segundos']} s)")
+    for tabla, filas in manifest["filas"].items():
+        print(f"  {tabla}: {filas:,} filas")
+
+
+if __name__ == "__main__":
+    main()
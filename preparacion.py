@@ -0,0 +1,62 @@
+"""
+Preparación de la hoja Clusters_S6 para el dashboard.
+
+Limpieza, tasas, nivel y score de riesgo y coordenadas simuladas por región:
+lo que hace load_data después de leer la hoja, fuera de Streamlit para poder
+ejecutarlo y medirlo sin la app (benchmarks/bench_suite.py).
+"""
+import numpy as np
+import pandas as pd
+
+from riesgo import clasificar_riesgo
+
+# Coordenadas aproximadas para mapa de México (simuladas por región)
+COORDS_REGION = {
+    'Norte': {'lat': 28.6353, 'lon': -106.0889},
+    'Sur': {'lat': 16.7569, 'lon': -93.1292},
+    'Centro 1': {'lat': 19.0414, 'lon': -98.2063},
+    'Centro 2': {'lat': 20.5888, 'lon': -100.3899},
+    'Occidente': {'lat': 20.6597, 'lon': -103.3496},
+    'Perla': {'lat': 21.1619, 'lon': -86.8515}
+}
+
+
+def preparar_sucursales(df_clusters: pd.DataFrame) -> pd.DataFrame:
+    """
+    Deja la hoja Clusters_S6 lista para el dashboard.
+
+    Args:
+        df_clusters: Hoja Clusters_S6 tal como se lee del libro
+
+    Returns:
+        Sucursales únicas con región, más Tasa_Morosidad, Tasa_Castigos,
+        Nivel_Riesgo, Score_Riesgo, lat y lon
+    """
+    # Limpiar datos
+    df_clusters = df_clusters.dropna(subset=['Región'])
+
+    # Dejar solo sucursales únicas
+    df_clusters = df_clusters.drop_duplicates(subset=['Sucursal'])
+
+    # Calcular métricas de riesgo
+    df_clusters['Tasa_Morosidad'] = (df_clusters['Saldo_Insoluto_Vencido_Actual'] /
+                                      df_clusters['Saldo_Insoluto_Total_Actual'] * 100).fillna(0)
+    df_clusters['Tasa_Castigos'] = (df_clusters['Castigos_Actual'] /
+                                     df_clusters['Saldo_Insoluto_Total_Actual'] * 100).fillna(0)
+
+    # Clasificación de riesgo (tabla de reglas en riesgo.py, vectorizada)
+    df_clusters['Nivel_Riesgo'] = clasificar_riesgo(df_clusters)
+
+    # Score de riesgo (0-100)
+    df_clusters['Score_Riesgo'] = (
+        (df_clusters['FPD_Actual'] / (df_clusters['FPD_Actual'].max() + 1) * 40) +
+        (df_clusters['Tasa_Morosidad'] / (df_clusters['Tasa_Morosidad'].max() + 1) * 30) +
+        (df_clusters['ICV_Actual'] / (df_clusters['ICV_Actual'].max() + 1) * 30)
+    )
+
+    # Agregar coordenadas con variación aleatoria para cada sucursal
+    np.random.seed(42)
+    df_clusters['lat'] = df_clusters['Región'].map(lambda x: COORDS_REGION.get(x, {'lat': 19.4326})['lat']) + np.random.uniform(-1, 1, len(df_clusters))
+    df_clusters['lon'] = df_clusters['Región'].map(lambda x: COORDS_REGION.get(x, {'lon': -99.1332})['lon']) + np.random.uniform(-1, 1, len(df_clusters))
+
+    return df_clusters
@@ -0,0 +1,93 @@
+"""
+Presentación de tablas del dashboard con st.column_config.
+
+Las tablas por región, por cluster y el Top 10 copiaban su DataFrame y
+convertían cada celda en texto con un lambda (f"${x:,.0f}", f"{x:.2f}%").
+Eso recorre todas las celdas en Python en cada rerun y, como las columnas
+quedan como texto, el navegador ordena "$9,000" después de "$10,000".
+PresentadorTabla deja los valores numéricos tal cual y declara el formato
+(moneda, porcentaje, decimal) y la etiqueta de cada columna en column_config;
+el formato lo aplica el navegador.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import streamlit as st
+
+# Formatos de NumberColumn por tipo de columna
+FORMATOS = {
+    # "dollar" con step=1 se muestra sin decimales: $1,234,567
+    'moneda': dict(format='dollar', step=1),
+    'porcentaje': dict(format='%.2f%%'),
+    'decimal': dict(format='%.2f'),
+}
+
+
+class PresentadorTabla:
+    """
+    Columnas, etiquetas y formatos de una tabla.
+
+    Args:
+        columnas: Secuencia de (columna, etiqueta, tipo); tipo es una clave de
+            FORMATOS o None para mostrar la columna sin formato (texto, categorías)
+    """
+
+    def __init__(self, columnas: Sequence[Tuple[str, Optional[str], Optional[str]]]):
+        self.columnas: List[str] = [c for c, _, _ in columnas]
+        self.column_config: Dict = {}
+        for columna, etiqueta, tipo in columnas:
+            if tipo is not None:
+                self.column_config[columna] = st.column_config.NumberColumn(etiqueta, **FORMATOS[tipo])
+            elif etiqueta is not None:
+                self.column_config[columna] = st.column_config.Column(etiqueta)
+
+    def preparar(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Las columnas de la tabla en su orden (el mismo DataFrame si ya lo están)"""
+        if list(df.columns) == self.columnas:
+            return df
+        return df[self.columnas]
+
+    def dataframe(self, df: pd.DataFrame, **kwargs):
+        """st.dataframe de la tabla con sus formatos (kwargs se pasan a st.dataframe)"""
+        kwargs.setdefault('use_container_width', True)
+        kwargs.setdefault('hide_index', True)
+        return st.dataframe(self.preparar(df), column_config=self.column_config, **kwargs)
+
+
+# Tablas "Por Región" y "Por Cluster" (CuboAgregado.por)
+_COLUMNAS_METRICAS = [
+    ('Num_Sucursales', None, None),
+    ('Capital_Dispersado', None, 'moneda'),
+    ('Saldo_Insoluto', None, 'moneda'),
+    ('Saldo_Vencido', None, 'moneda'),
+    ('FPD_Promedio', None, 'porcentaje'),
+    ('ICV_Promedio', None, 'porcentaje'),
+    ('Morosidad_Promedio', None, 'porcentaje'),
+    ('Score_Riesgo', None, 'decimal'),
+]
+TABLA_REGION = PresentadorTabla([('Región', None, None)] + _COLUMNAS_METRICAS)
+TABLA_CLUSTER = PresentadorTabla([('Cluster', None, None)] + _COLUMNAS_METRICAS)
+
+# Top de sucursales en riesgo (filas de df_clusters)
+COLUMNAS_TOP_RIESGO = [
+    ('Sucursal', None, None),
+    ('Región', None, None),
+    ('Cluster_KM', 'Cluster', None),
+    ('FPD_Actual', 'FPD %', 'porcentaje'),
+    ('ICV_Actual', 'ICV %', 'porcentaje'),
+    ('Capital_Dispersado_Actual', 'Capital Dispersado', 'moneda'),
+    ('Saldo_Insoluto_Total_Actual', 'Saldo Insoluto', 'moneda'),
+    ('Castigos_Actual', 'Castigos', 'moneda'),
+    ('Quitas_Actual', 'Quitas', 'moneda'),
+    ('Score_Riesgo', 'Score Riesgo', 'decimal'),
+    ('Nivel_Riesgo', 'Nivel Riesgo', None),
+]
+TABLA_TOP_RIESGO = PresentadorTabla(COLUMNAS_TOP_RIESGO)
+
+# Ranking completo (IndiceRanking.pagina): posición y todas las métricas rankeables
+TABLA_RANKING = PresentadorTabla(
+    [('Posición', '#', None)] + COLUMNAS_TOP_RIESGO[:5] + [
+        ('Tasa_Morosidad', 'Morosidad %', 'porcentaje'),
+        ('Saldo_Insoluto_Vencido_Actual', 'Saldo Vencido', 'moneda'),
+    ] + COLUMNAS_TOP_RIESGO[5:]
+)
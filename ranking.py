@@ -0,0 +1,117 @@
+"""
+Índice de rankings de sucursales por métrica.
+
+Al crearse guarda, por cada métrica, las posiciones de las filas ordenadas
+de mayor a menor (y de menor a mayor), sin NaN y con los empates en el orden
+de las filas, igual que nlargest/nsmallest. El top-k bajo una máscara de
+filtros recorre ese orden por bloques crecientes hasta juntar k filas, en
+lugar de ordenar las filas filtradas en cada rerun; las páginas del ranking
+completo se sacan del orden filtrado con una sola indexación.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Métricas seleccionables en el ranking: columna -> etiqueta
+METRICAS_RANKING = {
+    'Score_Riesgo': 'Score de Riesgo',
+    'FPD_Actual': 'FPD',
+    'ICV_Actual': 'ICV',
+    'Tasa_Morosidad': 'Morosidad',
+    'Saldo_Insoluto_Vencido_Actual': 'Saldo Vencido',
+    'Castigos_Actual': 'Castigos',
+}
+# Filas del orden que se revisan en el primer bloque de un top-k
+BLOQUE_INICIAL = 256
+
+
+class IndiceRanking:
+    """
+    Órdenes precalculados de df por métrica.
+
+    Args:
+        df: DataFrame de sucursales (no se modifica ni se copia)
+        metricas: Columnas numéricas que se pueden rankear
+    """
+
+    def __init__(self, df: pd.DataFrame, metricas=METRICAS_RANKING):
+        self.df = df
+        self.n = len(df)
+        self.metricas = list(metricas)
+        self._descendente: Dict[str, np.ndarray] = {}
+        self._ascendente: Dict[str, np.ndarray] = {}
+        for col in self.metricas:
+            valores = df[col].to_numpy(dtype=np.float64)
+            validos = ~np.isnan(valores)
+            # argsort estable: en empates queda primero la fila anterior (como nlargest)
+            self._descendente[col] = np.argsort(-valores, kind='stable')[:validos.sum()]
+            self._ascendente[col] = np.argsort(valores, kind='stable')[:validos.sum()]
+
+    def _orden(self, metrica: str, ascendente: bool) -> np.ndarray:
+        return (self._ascendente if ascendente else self._descendente)[metrica]
+
+    def top(self, metrica: str, k: int, mascara: Optional[np.ndarray] = None,
+            ascendente: bool = False) -> np.ndarray:
+        """
+        Posiciones de fila (iloc) de las k sucursales con mayor (o menor)
+        valor de la métrica entre las filas de la máscara.
+
+        Equivale a df[mascara].nlargest(k, metrica) pero solo revisa el
+        principio del orden: si la máscara deja pasar una fracción p de las
+        filas, se leen del orden unas k / p posiciones.
+        """
+        orden = self._orden(metrica, ascendente)
+        if mascara is None or mascara.all():
+            return orden[:k]
+        encontradas = []
+        faltan = k
+        inicio, bloque = 0, max(BLOQUE_INICIAL, 2 * k)
+        while faltan > 0 and inicio < len(orden):
+            parte = orden[inicio:inicio + bloque]
+            seleccion = parte[mascara[parte]][:faltan]
+            encontradas.append(seleccion)
+            faltan -= len(seleccion)
+            inicio += bloque
+            bloque *= 2
+        return np.concatenate(encontradas) if encontradas else orden[:0]
+
+    def filtrado(self, metrica: str, mascara: Optional[np.ndarray] = None,
+                 ascendente: bool = False) -> np.ndarray:
+        """Orden completo de las filas de la máscara (sin las que tienen NaN en la métrica)"""
+        orden = self._orden(metrica, ascendente)
+        if mascara is None or mascara.all():
+            return orden
+        return orden[mascara[orden]]
+
+    def pagina(self, metrica: str, pagina: int, tamano: int, mascara: Optional[np.ndarray] = None,
+               ascendente: bool = False) -> pd.DataFrame:
+        """
+        Una página del ranking completo.
+
+        Args:
+            metrica: Columna del ranking
+            pagina: Número de página, desde 1
+            tamano: Filas por página
+            mascara: Filas que entran al ranking (None = todas)
+            ascendente: True = de menor a mayor
+
+        Returns:
+            Filas de la página con la columna Posición (1 = primera del ranking)
+        """
+        inicio = (pagina - 1) * tamano
+        if inicio + tamano <= BLOQUE_INICIAL:
+            # Las primeras páginas salen del recorrido corto de top()
+            posiciones = self.top(metrica, inicio + tamano, mascara, ascendente)[inicio:]
+        else:
+            posiciones = self.filtrado(metrica, mascara, ascendente)[inicio:inicio + tamano]
+        filas = self.df.iloc[posiciones]
+        filas.insert(0, 'Posición', np.arange(inicio + 1, inicio + 1 + len(filas)))
+        return filas
+
+    def total(self, metrica: str, mascara: Optional[np.ndarray] = None) -> int:
+        """Número de filas en el ranking de la métrica con la máscara"""
+        orden = self._descendente[metrica]
+        if mascara is None:
+            return len(orden)
+        return int(mascara[orden].sum())
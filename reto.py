@@ -1,12 +1,27 @@
 import streamlit as st
-import pandas as pd
 import altair as alt
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-import unicodedata
-import re
 import detail
+from precomputo import asegurar_artefacto
+from indices import indice_busqueda, motor_filtros, vecindario_sucursales
+from agregados import CuboAgregado
+from tendencias import FAMILIAS_DETERIORO
+from preanalisis import pendientes, preanalizar_en_lote, sucursales_alto_riesgo
+from geminiPrueba import cache_analisis
+from mapa import figura_con_vecindario, figura_mapa, firma_mascara
+from presentacion import TABLA_CLUSTER, TABLA_RANKING, TABLA_REGION, TABLA_TOP_RIESGO
+from ranking import METRICAS_RANKING, IndiceRanking
+from tiempos import SCRIPT_COMPLETO, cronometrar, panel_tiempos
+from metricas import METRICAS
+from perfilador import perfilar_rerun
+from graficas import GRAFICAS
+
+# Sucursales que ofrece el selector de vecindario del mapa (las de mayor score)
+MAX_OPCIONES_VECINDARIO = 1000
+
+# Estado que se guarda con cada perfil de rerun (ver perfilador.py)
+CLAVES_PERFIL = ['selected_sucursal', 'buscar_sucursal', 'region_filter_reto',
+                 'cluster_filter', 'risk_filter', 'fpd_slider', 'icv_slider', 'morosidad_slider',
+                 'ranking_metrica', 'ranking_orden', 'ranking_pagina', 'tendencia_familia']
 
 # -----------------------
 # STATE
@@ -181,82 +196,71 @@ div[data-testid="stDataEditor"] div[aria-colindex="5"] div[role="checkbox"]::aft
 def load_data():
     excel_file = 'analisis_completo_sucursales_20251127_031525.xlsx'    
     
-    # Cargar datos principales
-    df_clusters = pd.read_excel(excel_file, sheet_name='Clusters_S6')
-    df_completos = pd.read_excel(excel_file, sheet_name='Datos_Completos')
+    with cronometrar("Carga de datos: artefacto", mostrar=False):
+        # Tablas derivadas (sucursales preparadas, cubo, panel y tendencias) del
+        # artefacto precalculado con precomputo.py; se genera aquí solo si falta
+        artefacto = asegurar_artefacto(excel_file)
+        df_clusters = artefacto.sucursales()
+        # El histórico se lee del mismo artefacto (panel y tendencias, bajo demanda)
+        historico = artefacto
     
-    # Limpiar datos
-    df_clusters = df_clusters.dropna(subset=['Región'])
-    
-    # Dejar solo sucursales únicas
-    df_clusters = df_clusters.drop_duplicates(subset=['Sucursal'])
-    
-    # Calcular métricas de riesgo
-    df_clusters['Tasa_Morosidad'] = (df_clusters['Saldo_Insoluto_Vencido_Actual'] / 
-                                      df_clusters['Saldo_Insoluto_Total_Actual'] * 100).fillna(0)
-    df_clusters['Tasa_Castigos'] = (df_clusters['Castigos_Actual'] / 
-                                     df_clusters['Saldo_Insoluto_Total_Actual'] * 100).fillna(0)
-    
-    # Clasificación de riesgo mejorada
-    def clasificar_riesgo(row):
-        score = 0
-        
-        # FPD
-        if row['FPD_Actual'] > 15:
-            score += 3
-        elif row['FPD_Actual'] > 8:
-            score += 2
-        elif row['FPD_Actual'] > 5:
-            score += 1
-            
-        # ICV
-        if row['ICV_Actual'] > 10:
-            score += 3
-        elif row['ICV_Actual'] > 6:
-            score += 2
-        elif row['ICV_Actual'] > 3:
-            score += 1
-            
-        # Morosidad
-        if row['Tasa_Morosidad'] > 10:
-            score += 3
-        elif row['Tasa_Morosidad'] > 5:
-            score += 2
-        elif row['Tasa_Morosidad'] > 2:
-            score += 1
-        
-        if score >= 6:
-            return 'Alto'
-        elif score >= 3:
-            return 'Medio'
-        else:
-            return 'Bajo'
-    
-    df_clusters['Nivel_Riesgo'] = df_clusters.apply(clasificar_riesgo, axis=1)
-    
-    # Score de riesgo (0-100)
-    df_clusters['Score_Riesgo'] = (
-        (df_clusters['FPD_Actual'] / (df_clusters['FPD_Actual'].max() + 1) * 40) +
-        (df_clusters['Tasa_Morosidad'] / (df_clusters['Tasa_Morosidad'].max() + 1) * 30) +
-        (df_clusters['ICV_Actual'] / (df_clusters['ICV_Actual'].max() + 1) * 30)
-    )
-    
-    # Coordenadas aproximadas para mapa de México (simuladas por región)
-    coords_region = {
-        'Norte': {'lat': 28.6353, 'lon': -106.0889},
-        'Sur': {'lat': 16.7569, 'lon': -93.1292},
-        'Centro 1': {'lat': 19.0414, 'lon': -98.2063},
-        'Centro 2': {'lat': 20.5888, 'lon': -100.3899},
-        'Occidente': {'lat': 20.6597, 'lon': -103.3496},
-        'Perla': {'lat': 21.1619, 'lon': -86.8515}
-    }
-    
-    # Agregar coordenadas con variación aleatoria para cada sucursal
-    np.random.seed(42)
-    df_clusters['lat'] = df_clusters['Región'].map(lambda x: coords_region.get(x, {'lat': 19.4326})['lat']) + np.random.uniform(-1, 1, len(df_clusters))
-    df_clusters['lon'] = df_clusters['Región'].map(lambda x: coords_region.get(x, {'lon': -99.1332})['lon']) + np.random.uniform(-1, 1, len(df_clusters))
-    
-    return df_clusters, df_completos
+    return df_clusters, historico
+
+
+@st.cache_resource
+def cargar_indice_busqueda():
+    # Índice de nombres normalizados (el mismo que usan las herramientas de DigiBot)
+    df_clusters, artefacto = load_data()
+    return indice_busqueda(artefacto.version, df_clusters)
+
+
+@st.cache_resource
+def cargar_motor_filtros():
+    # Códigos categóricos y métricas ordenadas para los filtros de la barra lateral
+    # (el mismo motor que usan las herramientas de DigiBot)
+    df_clusters, artefacto = load_data()
+    return motor_filtros(artefacto.version, df_clusters)
+
+
+@st.cache_resource
+def cargar_cubo():
+    # Agregados Región × Cluster × Nivel de Riesgo de todas las sucursales (del artefacto)
+    _, artefacto = load_data()
+    return artefacto.cubo()
+
+
+@st.cache_resource(max_entries=32)
+def cargar_figura_mapa(firma: str, _df_filtrado):
+    # Mapa de las sucursales filtradas; la firma de la máscara identifica las filas
+    return figura_mapa(_df_filtrado)
+
+
+@st.cache_data(max_entries=32)
+def contar_alto_riesgo(firma: str, version_cache: int, _df_filtrado):
+    # (sucursales de alto riesgo, cuántas ya tienen análisis) de la selección; se
+    # recalcula al cambiar los filtros o al guardar análisis en este proceso
+    alto_riesgo = sucursales_alto_riesgo(_df_filtrado)
+    return len(alto_riesgo), len(alto_riesgo) - len(pendientes(alto_riesgo))
+
+
+@st.cache_resource
+def cargar_ranking():
+    # Órdenes por métrica de todas las sucursales (top-k y ranking completo)
+    return IndiceRanking(cargar_motor_filtros().df)
+
+
+@st.cache_resource
+def cargar_vecindario():
+    # Índice espacial de todas las sucursales (el mismo que usa la página de detalle)
+    df_clusters, artefacto = load_data()
+    return vecindario_sucursales(artefacto.version, df_clusters)
+
+
+@st.cache_resource
+def cargar_tendencias():
+    # Pendientes de todas las sucursales y métricas (compartidas con la página de detalle)
+    _, historico = load_data()
+    return historico.tendencias()
 
 # -----------------------
 # NAVIGATION
@@ -269,58 +273,372 @@ def go_to_main():
 def go_to_detail(suc):
     st.session_state.selected_sucursal = suc
     st.session_state.page = "detail"
-    for key in ["region_filter", "cluster_filter", "risk_filter"]:
+    # La fila seleccionada del ranking se olvida para no volver al detalle al regresar
+    for key in ["region_filter", "cluster_filter", "risk_filter", "ranking_tabla"]:
         if key in st.session_state:
             del st.session_state[key]
     st.rerun()
 
+# -----------------------
+# GRÁFICAS (especificación memorizada por datos en graficas.GRAFICAS)
+# -----------------------
+def grafica_montos_region(metricas_region):
+    # Preparar datos para gráfico de barras agrupadas
+    chart_data = metricas_region.melt(
+        id_vars=['Región'],
+        value_vars=['Capital_Dispersado', 'Saldo_Insoluto'],
+        var_name='Métrica',
+        value_name='Monto'
+    )
+    
+    # Crear selección interactiva por leyenda
+    selection = alt.selection_point(fields=['Métrica'], bind='legend')
+    
+    chart = alt.Chart(chart_data).mark_bar().encode(
+        x=alt.X('Región:N', title='Región'),
+        y=alt.Y('Monto:Q', title='Monto ($)', axis=alt.Axis(format='$,.0f')),
+        color=alt.Color('Métrica:N',
+                    scale=alt.Scale(domain=['Capital_Dispersado', 'Saldo_Insoluto'],
+                                    range=['#2e7d32', '#66bb6a']),
+                    legend=alt.Legend(title='Métrica (Click para filtrar)')),
+        xOffset='Métrica:N',
+        opacity=alt.condition(selection, alt.value(1), alt.value(0.2)),
+        tooltip=[
+            alt.Tooltip('Región:N', title='Región'),
+            alt.Tooltip('Métrica:N', title='Métrica'),
+            alt.Tooltip('Monto:Q', title='Monto', format='$,.0f')
+        ]
+    ).add_params(
+        selection
+    ).properties(
+        height=400
+    )
+    return chart
+
+
+def grafica_indicadores_region(metricas_region):
+    # Preparar datos para gráfico de indicadores (solo FPD e ICV, no Morosidad)
+    indicators_data = metricas_region.melt(
+        id_vars=['Región'],
+        value_vars=['FPD_Promedio', 'ICV_Promedio'],
+        var_name='Indicador',
+        value_name='Valor'
+    )
+    
+    # Crear selección interactiva por leyenda
+    selection2 = alt.selection_point(fields=['Indicador'], bind='legend')
+    
+    chart2 = alt.Chart(indicators_data).mark_bar().encode(
+        x=alt.X('Región:N', title='Región'),
+        y=alt.Y('Valor:Q', title='Valor'),
+        color=alt.Color('Indicador:N',
+                    scale=alt.Scale(scheme='greens'),
+                    legend=alt.Legend(title='Indicador (Click para filtrar)')),
+        xOffset='Indicador:N',
+        opacity=alt.condition(selection2, alt.value(1), alt.value(0.2)),
+        tooltip=[
+            alt.Tooltip('Región:N', title='Región'),
+            alt.Tooltip('Indicador:N', title='Indicador'),
+            alt.Tooltip('Valor:Q', title='Valor', format=',.2f')
+        ]
+    ).add_params(
+        selection2
+    ).properties(
+        height=400
+    )
+    return chart2
+
+
+def grafica_riesgo_cluster(cluster_risk):
+    # Sucursales por cluster y nivel de riesgo
+    chart3 = alt.Chart(cluster_risk).mark_bar().encode(
+        x=alt.X('Cluster_KM:N', title='Cluster'),
+        y=alt.Y('Cantidad:Q', title='Número de Sucursales'),
+        color=alt.Color('Nivel_Riesgo:N',
+                    scale=alt.Scale(domain=['Bajo', 'Medio', 'Alto'],
+                                    range=['#2e7d32', '#ef6c00', '#c62828']),
+                    legend=alt.Legend(title='Nivel de Riesgo')),
+        tooltip=[
+            alt.Tooltip('Cluster_KM:N', title='Cluster'),
+            alt.Tooltip('Nivel_Riesgo:N', title='Nivel Riesgo'),
+            alt.Tooltip('Cantidad:Q', title='Sucursales')
+        ]
+    ).properties(
+        height=400
+    ).interactive()
+    return chart3
+
+
+def grafica_score_cluster(metricas_cluster):
+    # Score de riesgo promedio por cluster
+    chart4 = alt.Chart(metricas_cluster).mark_bar(color='#2e7d32').encode(
+        x=alt.X('Cluster:N', title='Cluster'),
+        y=alt.Y('Score_Riesgo:Q', title='Score de Riesgo Promedio'),
+        tooltip=[
+            alt.Tooltip('Cluster:N', title='Cluster'),
+            alt.Tooltip('Score_Riesgo:Q', title='Score', format='.2f'),
+            alt.Tooltip('Num_Sucursales:Q', title='Sucursales')
+        ]
+    ).properties(
+        height=400
+    ).interactive()
+    return chart4
+
+
+# -----------------------
+# SECCIONES CON RERUN PROPIO (fragmentos)
+# -----------------------
+# Reciben de render_main_page lo que depende de los filtros; sus propios
+# controles solo vuelven a ejecutar la sección (ver tiempos.py)
+@st.fragment
+def seccion_mapa(df_filtered, mascara, num_filtradas, conteo_riesgo):
+    # Mapa con el selector de vecindario; el selector y el radio solo vuelven a dibujar el mapa
+    with cronometrar("Mapa"):
+        if num_filtradas > 0:
+            # Figura memorizada por conjunto de sucursales filtradas; con muchas
+            # sucursales se agregan por zonas en el servidor (ver mapa.py)
+            with cronometrar("Mapa: figura", mostrar=False):
+                fig_map = cargar_figura_mapa(firma_mascara(mascara), df_filtered)
+
+            # Vecindario de una sucursal: consulta al índice espacial, sin recorrer las filas
+            col_vecindario, col_radio = st.columns([3, 2])
+            with col_vecindario:
+                if num_filtradas > MAX_OPCIONES_VECINDARIO:
+                    opciones = df_filtered.nlargest(MAX_OPCIONES_VECINDARIO, 'Score_Riesgo')['Sucursal']
+                else:
+                    opciones = df_filtered['Sucursal']
+                sucursal_vecindario = st.selectbox(
+                    "Ver vecindario de", opciones, index=None, placeholder="Selecciona una sucursal",
+                    key='vecindario_sucursal'
+                )
+            with col_radio:
+                radio_vecindario = st.slider("Radio (km)", min_value=10, max_value=500, value=100, step=10,
+                                             key='vecindario_radio')
+
+            if sucursal_vecindario:
+                vecindario = cargar_vecindario()
+                cercanas = vecindario.vecinos_de(sucursal_vecindario, radio_km=radio_vecindario)
+                fig_map = figura_con_vecindario(fig_map, sucursal_vecindario,
+                                                *vecindario.coordenadas(sucursal_vecindario),
+                                                cercanas, radio_vecindario)
+        
+            with cronometrar("Mapa: plotly_chart", mostrar=False):
+                st.plotly_chart(fig_map, use_container_width=True)
+
+            if sucursal_vecindario:
+                alto_cercanas = int((cercanas['Nivel_Riesgo'] == 'Alto').sum())
+                st.caption(f"{len(cercanas)} sucursales a menos de {radio_vecindario} km de "
+                           f"{sucursal_vecindario} · {alto_cercanas} en riesgo alto")
+        
+            # Contador de sucursales por nivel de riesgo
+            col1, col2, col3 = st.columns(3)
+        
+            with col1:
+                st.markdown(f"<div class='risk-badge-high'>Alto Riesgo: {conteo_riesgo.get('Alto', 0)} sucursales</div>", unsafe_allow_html=True)
+            with col2:
+                st.markdown(f"<div class='risk-badge-medium'>Medio Riesgo: {conteo_riesgo.get('Medio', 0)} sucursales</div>", unsafe_allow_html=True)
+ 
+            with col3:
+                st.markdown(f"<div class='risk-badge-low'>Bajo Riesgo: {conteo_riesgo.get('Bajo', 0)} sucursales</div>", unsafe_allow_html=True)
+
+        else:
+            st.warning("⚠️ No hay sucursales que coincidan con los filtros seleccionados")
+
+
+@st.fragment
+def seccion_top_riesgo(df_clusters, df_filtered, mascara):
+    # Top 10 en riesgo y pre-análisis de DigiBot; marcar una fila o pre-analizar no recalcula el resto de la página
+    with cronometrar("Top 10"):
+        if len(df_filtered) > 0:
+            # Top 10 por score de riesgo desde el orden precalculado; los valores
+            # quedan numéricos y el formato ($, %) lo declara el presentador
+            ranking = cargar_ranking()
+            top_10_riesgo = TABLA_TOP_RIESGO.preparar(df_clusters.iloc[ranking.top('Score_Riesgo', 10, mascara)])
+            tabla_top10 = top_10_riesgo.assign(**{'Ver Detalle': False})
+        
+            num_filas = min(len(tabla_top10), 10)
+            alto_tabla_top = 35 + num_filas * 35 
+        
+        
+            edited = st.data_editor(
+                tabla_top10,
+                use_container_width=True,
+                height=alto_tabla_top,
+                hide_index=True,
+                column_config={
+                    **TABLA_TOP_RIESGO.column_config,
+                    "Ver Detalle": st.column_config.CheckboxColumn(
+                        label="Ver",
+                        help="Da clic para ver el detalle de una sucursal específica"
+                    )
+                },
+                disabled=[col for col in tabla_top10.columns if col != "Ver Detalle"]
+            )
+
+            # 🔹 Detectar cuál checkbox fue activado
+            seleccionados = edited[edited["Ver Detalle"] == True]
+            if not seleccionados.empty:
+                sucursal = seleccionados.iloc[0]["Sucursal"]
+                seleccionados = edited[edited["Ver Detalle"] == False]
+                go_to_detail(sucursal)
+
+            # Pre-análisis de DigiBot de las sucursales de alto riesgo filtradas:
+            # quedan en la caché compartida y el detalle se abre sin esperar a Gemini
+            # (la lista completa solo se arma al pulsar el botón)
+            total_alto, analizadas = contar_alto_riesgo(firma_mascara(mascara), cache_analisis.version,
+                                                        df_filtered)
+            if total_alto:
+                faltantes = total_alto - analizadas
+                col_info, col_boton = st.columns([3, 1])
+                with col_info:
+                    st.caption(f"🤖 DigiBot: {analizadas} de {total_alto} "
+                               "sucursales de alto riesgo ya tienen análisis")
+                with col_boton:
+                    preanalizar = st.button("Pre-analizar alto riesgo", key='preanalizar_alto',
+                                            disabled=faltantes == 0, use_container_width=True)
+                if preanalizar:
+                    barra = st.progress(0.0, text="DigiBot está analizando las sucursales...")
+
+                    def mostrar_progreso(hechas, total, sucursal, estado):
+                        barra.progress(hechas / total, text=f"{hechas}/{total} · {sucursal}")
+
+                    resumen = preanalizar_en_lote(sucursales_alto_riesgo(df_filtered),
+                                                  progreso=mostrar_progreso)
+                    barra.empty()
+                    if resumen['fallidas']:
+                        st.warning(f"⚠️ {resumen['analizadas']} analizadas, "
+                                   f"{len(resumen['fallidas'])} fallaron: {', '.join(resumen['fallidas'])}")
+                    else:
+                        st.success(f"✅ {resumen['analizadas']} sucursales analizadas "
+                                   f"en {resumen['segundos']:.1f} s")
+        
+            # ---------------------------
+        
+        else:
+            st.warning("⚠️ No hay datos disponibles con los filtros actuales")
+
+
+@st.fragment
+def seccion_ranking(mascara, num_filtradas):
+    # Ranking paginado; cambiar métrica, orden o página solo vuelve a ejecutar esta sección
+    with cronometrar("Ranking"):
+        if num_filtradas > 0:
+            ranking = cargar_ranking()
+            col1, col2, col3 = st.columns([2, 1, 1])
+            with col1:
+                metrica_ranking = st.selectbox("Ordenar por", list(METRICAS_RANKING),
+                                               format_func=METRICAS_RANKING.get, key='ranking_metrica')
+            with col2:
+                ascendente = st.radio("Orden", ["Mayor a menor", "Menor a mayor"], horizontal=True,
+                                      key='ranking_orden') == "Menor a mayor"
+            with col3:
+                tamano_pagina = st.selectbox("Filas por página", [25, 50, 100], key='ranking_tamano')
+
+            total_ranking = ranking.total(metrica_ranking, mascara)
+            num_paginas = max(1, -(-total_ranking // tamano_pagina))
+            # Si cambian los filtros o el tamaño de página, la página actual puede quedar fuera
+            if st.session_state.get('ranking_pagina', 1) > num_paginas:
+                st.session_state.ranking_pagina = num_paginas
+            pagina = st.number_input(f"Página (de {num_paginas:,})", min_value=1, max_value=num_paginas,
+                                     step=1, key='ranking_pagina')
+
+            tabla_ranking = ranking.pagina(metrica_ranking, pagina, tamano_pagina, mascara, ascendente)
+            st.caption(f"Sucursales {tabla_ranking['Posición'].iloc[0]:,}–{tabla_ranking['Posición'].iloc[-1]:,} "
+                       f"de {total_ranking:,} · selecciona una fila para ver su detalle"
+                       if len(tabla_ranking) else "Sin sucursales con valor en esta métrica")
+            evento = TABLA_RANKING.dataframe(tabla_ranking, key='ranking_tabla', on_select='rerun',
+                                             selection_mode='single-row')
+            if evento.selection.rows:
+                go_to_detail(tabla_ranking['Sucursal'].iloc[evento.selection.rows[0]])
+
+
+@st.fragment
+def seccion_deterioro(df_filtered, num_filtradas):
+    # Sucursales con deterioro más rápido; cambiar de indicador solo vuelve a ejecutar esta sección
+    with cronometrar("Deterioro"):
+        if num_filtradas > 0:
+            tendencias = cargar_tendencias()
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                familia_tendencia = st.selectbox("Indicador", FAMILIAS_DETERIORO, key='tendencia_familia')
+                # Los montos en $ se comparan como % de su nivel para no favorecer a sucursales grandes
+                es_porcentaje = familia_tendencia in ('ICV', 'FPD')
+                st.caption(f"Pendiente de la tendencia lineal de los últimos {tendencias.periodos} periodos. "
+                           + ("Ordenado por puntos porcentuales por periodo." if es_porcentaje
+                              else "Ordenado por cambio por periodo como % del nivel promedio."))
+
+            # Ranking sobre la tabla de tendencias precalculada, restringido a los filtros
+            ranking = tendencias.ranking(
+                familia_tendencia, k=10, sucursales=df_filtered['Sucursal'], relativa=not es_porcentaje
+            )
+            ranking = ranking.merge(df_filtered[['Sucursal', 'Región', 'Nivel_Riesgo']], on='Sucursal', how='left')
+            ranking = ranking[['Sucursal', 'Región', 'Nivel_Riesgo', 'Pendiente', 'Pendiente_Relativa', 'R2']]
+
+            with col2:
+                st.dataframe(
+                    ranking,
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        'Nivel_Riesgo': 'Nivel Riesgo',
+                        'Pendiente': st.column_config.NumberColumn(
+                            'Pendiente (pp/periodo)' if es_porcentaje else 'Pendiente ($/periodo)',
+                            format='%.2f' if es_porcentaje else '$%.0f'
+                        ),
+                        'Pendiente_Relativa': st.column_config.NumberColumn('% del nivel / periodo', format='%.2f%%'),
+                        'R2': st.column_config.NumberColumn('Ajuste R²', format='%.2f'),
+                    }
+                )
+        else:
+            st.warning("⚠️ No hay datos disponibles con los filtros actuales")
+
+
 # -----------------------
 # MAIN PAGE
 # -----------------------
 def render_main_page():
-    # Cargar datos
-    df_clusters, df_completos = load_data()
+    # Cargar datos (el DataFrame compartido del motor de filtros; no se modifica)
+    with cronometrar("Carga de datos", mostrar=False):
+        motor = cargar_motor_filtros()
+    df_clusters = motor.df
 
     # ========================================
     # SIDEBAR - FILTROS
     # ========================================
     
-    with st.sidebar:
+    with st.sidebar, cronometrar("Filtros", mostrar=False):
         st.header("Filtros de Análisis")
         
         st.markdown('<div class="sidebar-fixed-container">', unsafe_allow_html=True)
         
         # Filtro de búsqueda por nombre de sucursal
-        search_term = st.text_input("Buscar sucursal:")
+        search_term = st.text_input("Buscar sucursal:", key='buscar_sucursal')
         filtered_sucursales = []
         
-        def normalize(text):
-            if not isinstance(text, str):
-                return ""
-            text = unicodedata.normalize('NFKD', text)
-            text = text.encode('ascii', 'ignore').decode("utf-8")
-            return text.lower()
-        
         if search_term:
-            term_normalized = re.sub(r"[^a-z\s]", "", normalize(search_term))
-            df_clusters["Sucursal_normalizada"] = df_clusters["Sucursal"].apply(normalize)
-            filtered_df = df_clusters[df_clusters["Sucursal_normalizada"].str.contains(term_normalized, case=False)]
-            if len(filtered_df) > 0:
-                # Mostrar lista de sucursales filtradas
-                filtered_sucursales = filtered_df['Sucursal'].tolist()
+            indice = cargar_indice_busqueda()
+            filtered_sucursales = indice.buscar(search_term)
+            if len(filtered_sucursales) > 0:
+                # Mostrar lista de sucursales filtradas (ordenadas por relevancia)
                 st.write("Selecciona para ir al detalle")
                 for i, suc in enumerate(filtered_sucursales):
                     if st.button(f"{suc} ▾", key=f"search_{i}_{suc}", type='secondary'):
                         go_to_detail(suc)
             else:
                 st.warning("No se encontraron sucursales que coincidan con la búsqueda.")
+                sugerencias = indice.sugerir(search_term)
+                if sugerencias:
+                    st.write("¿Quisiste decir?")
+                    for i, suc in enumerate(sugerencias):
+                        if st.button(f"{suc} ▾", key=f"sugerencia_{i}_{suc}", type='secondary'):
+                            go_to_detail(suc)
 
         # Filtro de región
-        regiones = ['Todas'] + sorted(df_clusters['Región'].unique().tolist())
+        regiones = ['Todas'] + motor.categorias('Región')
         region_seleccionada = st.selectbox("Región", regiones, key=f"region_filter_{st.session_state.page}")
 
         # Filtro de cluster
-        clusters = ['Todos'] + sorted(df_clusters['Cluster_KM'].unique().tolist())
+        clusters = ['Todos'] + motor.categorias('Cluster_KM')
         cluster_seleccionado = st.selectbox("Cluster", clusters, key='cluster_filter')
 
         # Filtro de nivel de riesgo
@@ -338,54 +656,61 @@ def render_main_page():
         fpd_range = st.slider(
             "FPD (%)",
             min_value=0.0,
-            max_value=float(df_clusters['FPD_Actual'].max()),
-            value=(0.0, float(df_clusters['FPD_Actual'].max())),
+            max_value=motor.maximo('FPD_Actual'),
+            value=(0.0, motor.maximo('FPD_Actual')),
             key='fpd_slider'
         )
 
         icv_range = st.slider(
             "ICV (%)",
             min_value=0.0,
-            max_value=float(df_clusters['ICV_Actual'].max()),
-            value=(0.0, float(df_clusters['ICV_Actual'].max())),
+            max_value=motor.maximo('ICV_Actual'),
+            value=(0.0, motor.maximo('ICV_Actual')),
             key='icv_slider'
         )
 
         morosidad_range = st.slider(
             "Morosidad (%)",
             min_value=0.0,
-            max_value=float(df_clusters['Tasa_Morosidad'].max()),
-            value=(0.0, float(df_clusters['Tasa_Morosidad'].max())),
+            max_value=motor.maximo('Tasa_Morosidad'),
+            value=(0.0, motor.maximo('Tasa_Morosidad')),
             key='morosidad_slider'
         )
         
         st.markdown('</div>', unsafe_allow_html=True)
 
-    # Aplicar filtros
-    df_filtered = df_clusters.copy()
-    
-    # Filtrar por nombre de sucursal si se encontraron coincidencias
-    if len(filtered_sucursales) > 0:
-        df_filtered = df_filtered[df_filtered['Sucursal'].isin(filtered_sucursales)]
-
-    if region_seleccionada != 'Todas':
-        df_filtered = df_filtered[df_filtered['Región'] == region_seleccionada]
-
-    if cluster_seleccionado != 'Todos':
-        df_filtered = df_filtered[df_filtered['Cluster_KM'] == cluster_seleccionado]
-
-    if nivel_riesgo_seleccionado:
-        df_filtered = df_filtered[df_filtered['Nivel_Riesgo'].isin(nivel_riesgo_seleccionado)]
-
-    # Filtros de métricas
-    df_filtered = df_filtered[
-        (df_filtered['FPD_Actual'] >= fpd_range[0]) &
-        (df_filtered['FPD_Actual'] <= fpd_range[1]) &
-        (df_filtered['ICV_Actual'] >= icv_range[0]) &
-        (df_filtered['ICV_Actual'] <= icv_range[1]) &
-        (df_filtered['Tasa_Morosidad'] >= morosidad_range[0]) &
-        (df_filtered['Tasa_Morosidad'] <= morosidad_range[1])
-    ]
+    with cronometrar("Agregados", mostrar=False):
+        # Aplicar filtros: una sola máscara compuesta sobre el DataFrame base
+        filtros_categoricos = {
+            'Región': [region_seleccionada] if region_seleccionada != 'Todas' else None,
+            'Cluster_KM': [cluster_seleccionado] if cluster_seleccionado != 'Todos' else None,
+            'Nivel_Riesgo': nivel_riesgo_seleccionado,
+        }
+        filtros_rango = {
+            'FPD_Actual': fpd_range,
+            'ICV_Actual': icv_range,
+            'Tasa_Morosidad': morosidad_range,
+        }
+        mascara = motor.mascara(
+            # Filtrar por nombre de sucursal si se encontraron coincidencias
+            categorias={'Sucursal': filtered_sucursales, **filtros_categoricos},
+            rangos=filtros_rango
+        )
+        df_filtered = motor.filtrar(mascara)
+
+        # Agregados para KPIs, pestañas y resumen: si solo hay filtros categóricos
+        # se toman celdas del cubo precalculado; con búsqueda o sliders activos se
+        # agregan las filas filtradas en una sola pasada
+        cubo_global = cargar_cubo()
+        solo_categoricos = not filtered_sucursales and all(
+            motor.rango_completo(col, *rango) for col, rango in filtros_rango.items()
+        )
+        if solo_categoricos:
+            cubo = cubo_global.seleccionar(*filtros_categoricos.values())
+        else:
+            cubo = CuboAgregado.desde_filas(df_filtered)
+        num_filtradas = cubo.num_sucursales
+        conteo_riesgo = cubo.conteo(['Nivel_Riesgo'])
     
     # ========================================
     # Título principal
@@ -398,59 +723,60 @@ def render_main_page():
     # ========================================
     st.header("Indicadores Clave de Desempeño")
 
-    col1, col2, col3, col4 = st.columns(4)
+    with cronometrar("KPIs"):
+        col1, col2, col3, col4 = st.columns(4)
 
-    with col1:
-        icv_promedio = df_filtered['ICV_Actual'].mean()
-        icv_global = df_clusters['ICV_Actual'].mean()
-        delta_icv = icv_promedio - icv_global
-        delta_color = "#c62828" if delta_icv > 0 else "#2e7d32"
-        delta_text = f"+{delta_icv:.2f}%" if delta_icv > 0 else f"{delta_icv:.2f}%"
-        st.markdown(f"""
-        <div class='metric-card'>
-            <h4>ICV Promedio</h4>
-            <p>{icv_promedio:.2f}%</p>
-            <small style='color: {delta_color}; font-weight: 600;'>{delta_text} vs promedio</small>
-        </div>
-        """, unsafe_allow_html=True)
+        with col1:
+            icv_promedio = cubo.promedio('ICV_Actual')
+            icv_global = cubo_global.promedio('ICV_Actual')
+            delta_icv = icv_promedio - icv_global
+            delta_color = "#c62828" if delta_icv > 0 else "#2e7d32"
+            delta_text = f"+{delta_icv:.2f}%" if delta_icv > 0 else f"{delta_icv:.2f}%"
+            st.markdown(f"""
+            <div class='metric-card'>
+                <h4>ICV Promedio</h4>
+                <p>{icv_promedio:.2f}%</p>
+                <small style='color: {delta_color}; font-weight: 600;'>{delta_text} vs promedio</small>
+            </div>
+            """, unsafe_allow_html=True)
 
-    with col2:
-        capital_dispersado = df_filtered['Capital_Dispersado_Actual'].sum()
-        capital_global = df_clusters['Capital_Dispersado_Actual'].sum()
-        pct_capital = (capital_dispersado / capital_global * 100) if capital_global > 0 else 0
-        st.markdown(f"""
-        <div class='metric-card'>
-            <h4>Capital Dispersado</h4>
-            <p>${capital_dispersado:,.0f}</p>
-            <small style='color: #14532d; font-weight: 600;'>{pct_capital:.1f}% del total</small>
-        </div>
-        """, unsafe_allow_html=True)
+        with col2:
+            capital_dispersado = cubo.suma('Capital_Dispersado_Actual')
+            capital_global = cubo_global.suma('Capital_Dispersado_Actual')
+            pct_capital = (capital_dispersado / capital_global * 100) if capital_global > 0 else 0
+            st.markdown(f"""
+            <div class='metric-card'>
+                <h4>Capital Dispersado</h4>
+                <p>${capital_dispersado:,.0f}</p>
+                <small style='color: #14532d; font-weight: 600;'>{pct_capital:.1f}% del total</small>
+            </div>
+            """, unsafe_allow_html=True)
 
-    with col3:
-        saldo_insoluto = df_filtered['Saldo_Insoluto_Total_Actual'].sum()
-        saldo_global = df_clusters['Saldo_Insoluto_Total_Actual'].sum()
-        pct_saldo = (saldo_insoluto / saldo_global * 100) if saldo_global > 0 else 0
-        st.markdown(f"""
-        <div class='metric-card'>
-            <h4>Saldo Insoluto Total</h4>
-            <p>${saldo_insoluto:,.0f}</p>
-            <small style='color: #14532d; font-weight: 600;'>{pct_saldo:.1f}% del total</small>
-        </div>
-        """, unsafe_allow_html=True)
-
-    with col4:
-        fpd_promedio = df_filtered['FPD_Actual'].mean()
-        fpd_global = df_clusters['FPD_Actual'].mean()
-        delta_fpd = fpd_promedio - fpd_global
-        delta_color_fpd = "#c62828" if delta_fpd > 0 else "#2e7d32"
-        delta_text_fpd = f"+{delta_fpd:.2f}%" if delta_fpd > 0 else f"{delta_fpd:.2f}%"
-        st.markdown(f"""
-        <div class='metric-card'>
-            <h4>FPD Promedio</h4>
-            <p>{fpd_promedio:.2f}%</p>
-            <small style='color: {delta_color_fpd}; font-weight: 600;'>{delta_text_fpd} vs promedio</small>
-        </div>
-        """, unsafe_allow_html=True)
+        with col3:
+            saldo_insoluto = cubo.suma('Saldo_Insoluto_Total_Actual')
+            saldo_global = cubo_global.suma('Saldo_Insoluto_Total_Actual')
+            pct_saldo = (saldo_insoluto / saldo_global * 100) if saldo_global > 0 else 0
+            st.markdown(f"""
+            <div class='metric-card'>
+                <h4>Saldo Insoluto Total</h4>
+                <p>${saldo_insoluto:,.0f}</p>
+                <small style='color: #14532d; font-weight: 600;'>{pct_saldo:.1f}% del total</small>
+            </div>
+            """, unsafe_allow_html=True)
+
+        with col4:
+            fpd_promedio = cubo.promedio('FPD_Actual')
+            fpd_global = cubo_global.promedio('FPD_Actual')
+            delta_fpd = fpd_promedio - fpd_global
+            delta_color_fpd = "#c62828" if delta_fpd > 0 else "#2e7d32"
+            delta_text_fpd = f"+{delta_fpd:.2f}%" if delta_fpd > 0 else f"{delta_fpd:.2f}%"
+            st.markdown(f"""
+            <div class='metric-card'>
+                <h4>FPD Promedio</h4>
+                <p>{fpd_promedio:.2f}%</p>
+                <small style='color: {delta_color_fpd}; font-weight: 600;'>{delta_text_fpd} vs promedio</small>
+            </div>
+            """, unsafe_allow_html=True)
 
     st.markdown("---")
 
@@ -459,59 +785,7 @@ def render_main_page():
     # ========================================
     st.header("Mapa de Sucursales por Nivel de Riesgo")
 
-    if len(df_filtered) > 0:
-        # Crear mapa con Plotly
-        fig_map = px.scatter_mapbox(
-            df_filtered,
-            lat="lat",
-            lon="lon",
-            color="Nivel_Riesgo",
-            size="Score_Riesgo",
-            hover_name="Sucursal",
-            hover_data={
-                "Región": True,
-                "Cluster_KM": True,
-                "FPD_Actual": ":.2f",
-                "ICV_Actual": ":.2f",
-                "Tasa_Morosidad": ":.2f",
-                "lat": False,
-                "lon": False,
-                "Score_Riesgo": ":.2f"
-            },
-            color_discrete_map={
-                'Bajo': '#2e7d32',
-                'Medio': '#ef6c00',
-                'Alto': '#c62828'
-            },
-            zoom=4,
-            height=500,
-            title=f"Sucursales Filtradas: {len(df_filtered)}"
-        )
-        
-        fig_map.update_layout(
-            mapbox_style="carto-positron",
-            mapbox_center={"lat": 23.6345, "lon": -102.5528},
-            margin={"r":0,"t":40,"l":0,"b":0}
-        )
-        
-        st.plotly_chart(fig_map, use_container_width=True)
-        
-        # Contador de sucursales por región
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            sucursales_alto_list = df_filtered[df_filtered['Nivel_Riesgo'] == 'Alto']['Sucursal'].tolist()
-            st.markdown(f"<div class='risk-badge-high'>Alto Riesgo: {len(sucursales_alto_list)} sucursales</div>", unsafe_allow_html=True)
-        with col2:
-            sucursales_medio_list = df_filtered[df_filtered['Nivel_Riesgo'] == 'Medio']['Sucursal'].tolist()
-            st.markdown(f"<div class='risk-badge-medium'>Medio Riesgo: {len(sucursales_medio_list)} sucursales</div>", unsafe_allow_html=True)
- 
-        with col3:
-            sucursales_bajo_list = df_filtered[df_filtered['Nivel_Riesgo'] == 'Bajo']['Sucursal'].tolist()
-            st.markdown(f"<div class='risk-badge-low'>Bajo Riesgo: {len(sucursales_bajo_list)} sucursales</div>", unsafe_allow_html=True)
-
-    else:
-        st.warning("⚠️ No hay sucursales que coincidan con los filtros seleccionados")
+    seccion_mapa(df_filtered, mascara, num_filtradas, conteo_riesgo)
 
     st.markdown("---")
 
@@ -522,24 +796,10 @@ def render_main_page():
 
     tab1, tab2 = st.tabs(["Por Región", "Por Cluster"])
 
-    with tab1:
-        if len(df_filtered) > 0:
-            # Agrupar por región
-            metricas_region = df_filtered.groupby('Región').agg({
-                'Sucursal': 'count',
-                'Capital_Dispersado_Actual': 'sum',
-                'Saldo_Insoluto_Total_Actual': 'sum',
-                'Saldo_Insoluto_Vencido_Actual': 'sum',
-                'FPD_Actual': 'mean',
-                'ICV_Actual': 'mean',
-                'Tasa_Morosidad': 'mean',
-                'Score_Riesgo': 'mean'
-            }).reset_index()
-            
-            metricas_region.columns = [
-                'Región', 'Num_Sucursales', 'Capital_Dispersado', 'Saldo_Insoluto',
-                'Saldo_Vencido', 'FPD_Promedio', 'ICV_Promedio', 'Morosidad_Promedio', 'Score_Riesgo'
-            ]
+    with tab1, cronometrar("Por Región"):
+        if num_filtradas > 0:
+            # Métricas por región (derivadas del cubo)
+            metricas_region = cubo.por('Región')
             
             # Gráfico de métricas por región con Altair
             col1, col2 = st.columns(2)
@@ -547,162 +807,43 @@ def render_main_page():
             with col1:
                 st.subheader("Capital Dispersado y Saldo Insoluto por Región")
                 
-                # Preparar datos para gráfico de barras agrupadas
-                chart_data = metricas_region.melt(
-                    id_vars=['Región'],
-                    value_vars=['Capital_Dispersado', 'Saldo_Insoluto'],
-                    var_name='Métrica',
-                    value_name='Monto'
-                )
-                
-                # Crear selección interactiva por leyenda
-                selection = alt.selection_point(fields=['Métrica'], bind='legend')
-                
-                chart = alt.Chart(chart_data).mark_bar().encode(
-                    x=alt.X('Región:N', title='Región'),
-                    y=alt.Y('Monto:Q', title='Monto ($)', axis=alt.Axis(format='$,.0f')),
-                    color=alt.Color('Métrica:N',
-                                scale=alt.Scale(domain=['Capital_Dispersado', 'Saldo_Insoluto'],
-                                                range=['#2e7d32', '#66bb6a']),
-                                legend=alt.Legend(title='Métrica (Click para filtrar)')),
-                    xOffset='Métrica:N',
-                    opacity=alt.condition(selection, alt.value(1), alt.value(0.2)),
-                    tooltip=[
-                        alt.Tooltip('Región:N', title='Región'),
-                        alt.Tooltip('Métrica:N', title='Métrica'),
-                        alt.Tooltip('Monto:Q', title='Monto', format='$,.0f')
-                    ]
-                ).add_params(
-                    selection
-                ).properties(
-                    height=400
-                )
-                
-                st.altair_chart(chart, use_container_width=True)
+                GRAFICAS.dibujar('montos_region', metricas_region[['Región', 'Capital_Dispersado', 'Saldo_Insoluto']],
+                                 grafica_montos_region)
             
             with col2:
                 st.subheader("Indicadores de Riesgo por Región")
                 
-                # Preparar datos para gráfico de indicadores (solo FPD e ICV, no Morosidad)
-                indicators_data = metricas_region.melt(
-                    id_vars=['Región'],
-                    value_vars=['FPD_Promedio', 'ICV_Promedio'],
-                    var_name='Indicador',
-                    value_name='Valor'
-                )
-                
-                # Crear selección interactiva por leyenda
-                selection2 = alt.selection_point(fields=['Indicador'], bind='legend')
-                
-                chart2 = alt.Chart(indicators_data).mark_bar().encode(
-                    x=alt.X('Región:N', title='Región'),
-                    y=alt.Y('Valor:Q', title='Valor'),
-                    color=alt.Color('Indicador:N',
-                                scale=alt.Scale(scheme='greens'),
-                                legend=alt.Legend(title='Indicador (Click para filtrar)')),
-                    xOffset='Indicador:N',
-                    opacity=alt.condition(selection2, alt.value(1), alt.value(0.2)),
-                    tooltip=[
-                        alt.Tooltip('Región:N', title='Región'),
-                        alt.Tooltip('Indicador:N', title='Indicador'),
-                        alt.Tooltip('Valor:Q', title='Valor', format=',.2f')
-                    ]
-                ).add_params(
-                    selection2
-                ).properties(
-                    height=400
-                )
-                
-                st.altair_chart(chart2, use_container_width=True)
+                GRAFICAS.dibujar('indicadores_region', metricas_region[['Región', 'FPD_Promedio', 'ICV_Promedio']],
+                                 grafica_indicadores_region)
             
             # Tabla detallada de métricas por región
             st.subheader("Tabla Detallada de Métricas por Región")
             
-            tabla_display = metricas_region.copy()
-            tabla_display['Capital_Dispersado'] = tabla_display['Capital_Dispersado'].apply(lambda x: f"${x:,.0f}")
-            tabla_display['Saldo_Insoluto'] = tabla_display['Saldo_Insoluto'].apply(lambda x: f"${x:,.0f}")
-            tabla_display['Saldo_Vencido'] = tabla_display['Saldo_Vencido'].apply(lambda x: f"${x:,.0f}")
-            tabla_display['FPD_Promedio'] = tabla_display['FPD_Promedio'].apply(lambda x: f"{x:.2f}%")
-            tabla_display['ICV_Promedio'] = tabla_display['ICV_Promedio'].apply(lambda x: f"{x:.2f}%")
-            tabla_display['Morosidad_Promedio'] = tabla_display['Morosidad_Promedio'].apply(lambda x: f"{x:.2f}%")
-            tabla_display['Score_Riesgo'] = tabla_display['Score_Riesgo'].apply(lambda x: f"{x:.2f}")
-            
-            st.dataframe(tabla_display, use_container_width=True, hide_index=True)
+            TABLA_REGION.dataframe(metricas_region)
 
-    with tab2:
-        if len(df_filtered) > 0:
-            # Agrupar por cluster
-            metricas_cluster = df_filtered.groupby('Cluster_KM').agg({
-                'Sucursal': 'count',
-                'Capital_Dispersado_Actual': 'sum',
-                'Saldo_Insoluto_Total_Actual': 'sum',
-                'Saldo_Insoluto_Vencido_Actual': 'sum',
-                'FPD_Actual': 'mean',
-                'ICV_Actual': 'mean',
-                'Tasa_Morosidad': 'mean',
-                'Score_Riesgo': 'mean'
-            }).reset_index()
-            
-            metricas_cluster.columns = [
-                'Cluster', 'Num_Sucursales', 'Capital_Dispersado', 'Saldo_Insoluto',
-                'Saldo_Vencido', 'FPD_Promedio', 'ICV_Promedio', 'Morosidad_Promedio', 'Score_Riesgo'
-            ]
+    with tab2, cronometrar("Por Cluster"):
+        if num_filtradas > 0:
+            # Métricas por cluster (derivadas del cubo)
+            metricas_cluster = cubo.por('Cluster_KM', nombre='Cluster')
             
             col1, col2 = st.columns(2)
             
             with col1:
                 st.subheader("Distribución de Sucursales por Cluster y Riesgo")
                 
-                cluster_risk = df_filtered.groupby(['Cluster_KM', 'Nivel_Riesgo']).size().reset_index(name='Cantidad')
-                
-                chart3 = alt.Chart(cluster_risk).mark_bar().encode(
-                    x=alt.X('Cluster_KM:N', title='Cluster'),
-                    y=alt.Y('Cantidad:Q', title='Número de Sucursales'),
-                    color=alt.Color('Nivel_Riesgo:N',
-                                scale=alt.Scale(domain=['Bajo', 'Medio', 'Alto'],
-                                                range=['#2e7d32', '#ef6c00', '#c62828']),
-                                legend=alt.Legend(title='Nivel de Riesgo')),
-                    tooltip=[
-                        alt.Tooltip('Cluster_KM:N', title='Cluster'),
-                        alt.Tooltip('Nivel_Riesgo:N', title='Nivel Riesgo'),
-                        alt.Tooltip('Cantidad:Q', title='Sucursales')
-                    ]
-                ).properties(
-                    height=400
-                ).interactive()
-                
-                st.altair_chart(chart3, use_container_width=True)
+                cluster_risk = cubo.conteo(['Cluster_KM', 'Nivel_Riesgo']).reset_index(name='Cantidad')
+                GRAFICAS.dibujar('riesgo_cluster', cluster_risk, grafica_riesgo_cluster)
             
             with col2:
                 st.subheader("Score de Riesgo Promedio por Cluster")
                 
-                chart4 = alt.Chart(metricas_cluster).mark_bar(color='#2e7d32').encode(
-                    x=alt.X('Cluster:N', title='Cluster'),
-                    y=alt.Y('Score_Riesgo:Q', title='Score de Riesgo Promedio'),
-                    tooltip=[
-                        alt.Tooltip('Cluster:N', title='Cluster'),
-                        alt.Tooltip('Score_Riesgo:Q', title='Score', format='.2f'),
-                        alt.Tooltip('Num_Sucursales:Q', title='Sucursales')
-                    ]
-                ).properties(
-                    height=400
-                ).interactive()
-                
-                st.altair_chart(chart4, use_container_width=True)
+                GRAFICAS.dibujar('score_cluster', metricas_cluster[['Cluster', 'Score_Riesgo', 'Num_Sucursales']],
+                                 grafica_score_cluster)
             
             # Tabla detallada de métricas por cluster
             st.subheader("Tabla Detallada de Métricas por Cluster")
             
-            tabla_cluster_display = metricas_cluster.copy()
-            tabla_cluster_display['Capital_Dispersado'] = tabla_cluster_display['Capital_Dispersado'].apply(lambda x: f"${x:,.0f}")
-            tabla_cluster_display['Saldo_Insoluto'] = tabla_cluster_display['Saldo_Insoluto'].apply(lambda x: f"${x:,.0f}")
-            tabla_cluster_display['Saldo_Vencido'] = tabla_cluster_display['Saldo_Vencido'].apply(lambda x: f"${x:,.0f}")
-            tabla_cluster_display['FPD_Promedio'] = tabla_cluster_display['FPD_Promedio'].apply(lambda x: f"{x:.2f}%")
-            tabla_cluster_display['ICV_Promedio'] = tabla_cluster_display['ICV_Promedio'].apply(lambda x: f"{x:.2f}%")
-            tabla_cluster_display['Morosidad_Promedio'] = tabla_cluster_display['Morosidad_Promedio'].apply(lambda x: f"{x:.2f}%")
-            tabla_cluster_display['Score_Riesgo'] = tabla_cluster_display['Score_Riesgo'].apply(lambda x: f"{x:.2f}")
-            
-            st.dataframe(tabla_cluster_display, use_container_width=True, hide_index=True)
+            TABLA_CLUSTER.dataframe(metricas_cluster)
 
     st.markdown("---")
 
@@ -711,61 +852,25 @@ def render_main_page():
     # ========================================
     st.header("Top 10 Sucursales en Riesgo")
 
-    if len(df_filtered) > 0:
-        # Obtener top 10 por score de riesgo
-        top_10_riesgo = df_filtered.nlargest(10, 'Score_Riesgo')[
-            ['Sucursal', 'Región', 'Cluster_KM', 'FPD_Actual', 'ICV_Actual',
-            'Capital_Dispersado_Actual', 'Saldo_Insoluto_Total_Actual',
-            'Castigos_Actual', 'Quitas_Actual', 'Score_Riesgo', 'Nivel_Riesgo']
-        ].copy()
-        
-        # Tabla con todas las métricas
-        # st.subheader("Top 10 Sucursales - Indicadores de Riesgo")
-        
-        tabla_top10 = top_10_riesgo.copy()
-        tabla_top10['FPD_Actual'] = tabla_top10['FPD_Actual'].apply(lambda x: f"{x:.2f}%")
-        tabla_top10['ICV_Actual'] = tabla_top10['ICV_Actual'].apply(lambda x: f"{x:.2f}%")
-        tabla_top10['Capital_Dispersado_Actual'] = tabla_top10['Capital_Dispersado_Actual'].apply(lambda x: f"${x:,.0f}")
-        tabla_top10['Saldo_Insoluto_Total_Actual'] = tabla_top10['Saldo_Insoluto_Total_Actual'].apply(lambda x: f"${x:,.0f}")
-        tabla_top10['Castigos_Actual'] = tabla_top10['Castigos_Actual'].apply(lambda x: f"${x:,.0f}")
-        tabla_top10['Quitas_Actual'] = tabla_top10['Quitas_Actual'].apply(lambda x: f"${x:,.0f}")
-        tabla_top10['Score_Riesgo'] = tabla_top10['Score_Riesgo'].apply(lambda x: f"{x:.2f}")
-        tabla_top10['Ver'] = False
-        
-        tabla_top10.columns = [
-            'Sucursal', 'Región', 'Cluster', 'FPD %', 'ICV %',
-            'Capital Dispersado', 'Saldo Insoluto', 'Castigos', 'Quitas', 'Score Riesgo', 'Nivel Riesgo', 'Ver Detalle'
-        ]
-        
-        num_filas = min(len(tabla_top10), 10)
-        alto_tabla_top = 35 + num_filas * 35 
-        
-        
-        edited = st.data_editor(
-            tabla_top10,
-            use_container_width=True,
-            height=alto_tabla_top,
-            hide_index=True,
-            column_config={
-                "Ver Detalle": st.column_config.CheckboxColumn(
-                    label="Ver",
-                    help="Da clic para ver el detalle de una sucursal específica"
-                )
-            },
-            disabled=[col for col in tabla_top10.columns if col != "Ver Detalle"]
-        )
+    seccion_top_riesgo(df_clusters, df_filtered, mascara)
 
-        # 🔹 Detectar cuál checkbox fue activado
-        seleccionados = edited[edited["Ver Detalle"] == True]
-        if not seleccionados.empty:
-            sucursal = seleccionados.iloc[0]["Sucursal"]
-            seleccionados = edited[edited["Ver Detalle"] == False]
-            go_to_detail(sucursal)
-        
-        # ---------------------------
-        
-    else:
-        st.warning("⚠️ No hay datos disponibles con los filtros actuales")
+    st.markdown("---")
+
+    # ========================================
+    # RANKING COMPLETO DE SUCURSALES (PAGINADO)
+    # ========================================
+    st.header("Ranking Completo de Sucursales")
+
+    seccion_ranking(mascara, num_filtradas)
+
+    st.markdown("---")
+
+    # ========================================
+    # SUCURSALES CON DETERIORO MÁS RÁPIDO
+    # ========================================
+    st.header("Sucursales con Deterioro más Rápido")
+
+    seccion_deterioro(df_filtered, num_filtradas)
 
     st.markdown("---")
 
@@ -777,19 +882,19 @@ def render_main_page():
     with col1:
         st.markdown("### Datos Filtrados")
         st.info(f"""
-        - **Sucursales analizadas**: {len(df_filtered)}
-        - **Regiones**: {df_filtered['Región'].nunique() if len(df_filtered) > 0 else 0}
-        - **Clusters**: {df_filtered['Cluster_KM'].nunique() if len(df_filtered) > 0 else 0}
+        - **Sucursales analizadas**: {num_filtradas}
+        - **Regiones**: {cubo.num_valores('Región')}
+        - **Clusters**: {cubo.num_valores('Cluster_KM')}
         """)
 
     with col2:
         st.markdown("### Alertas de Riesgo")
-        if len(df_filtered) > 0:
-            pct_alto = len(df_filtered[df_filtered['Nivel_Riesgo'] == 'Alto']) / len(df_filtered) * 100
+        if num_filtradas > 0:
+            pct_alto = conteo_riesgo.get('Alto', 0) / num_filtradas * 100
             st.warning(f"""
-            - **Alto riesgo**: {len(df_filtered[df_filtered['Nivel_Riesgo'] == 'Alto'])} ({pct_alto:.1f}%)
-            - **Medio riesgo**: {len(df_filtered[df_filtered['Nivel_Riesgo'] == 'Medio'])}
-            - **Bajo riesgo**: {len(df_filtered[df_filtered['Nivel_Riesgo'] == 'Bajo'])}
+            - **Alto riesgo**: {conteo_riesgo.get('Alto', 0)} ({pct_alto:.1f}%)
+            - **Medio riesgo**: {conteo_riesgo.get('Medio', 0)}
+            - **Bajo riesgo**: {conteo_riesgo.get('Bajo', 0)}
             """)
         else:
             st.info("No hay datos para mostrar")
@@ -811,7 +916,14 @@ def render_main_page():
     </div>
     """, unsafe_allow_html=True)
 
-if st.session_state.page == "reto":
-    render_main_page()  
-elif st.session_state.page == "detail":
-    detail.render(go_to_main, load_data)     
\ No newline at end of file
+# Un rerun de fragmento no pasa por aquí: solo se anota el de su sección.
+# Con ?perfil=1 (o DASHBOARD_PERFIL) el rerun se perfila y se guarda en .perfiles/
+with cronometrar(SCRIPT_COMPLETO), perfilar_rerun(st.session_state.page, CLAVES_PERFIL):
+    if st.session_state.page == "reto":
+        render_main_page()
+    elif st.session_state.page == "detail":
+        detail.render(go_to_main, load_data)
+
+# Panel de rendimiento (DASHBOARD_TIEMPOS=1 o ?tiempos=1) y volcado de métricas a archivo
+panel_tiempos()
+METRICAS.volcar_si_toca()     
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Clasificación de riesgo de sucursales basada en una tabla de reglas.
+
+Los umbrales y puntos de cada indicador viven en REGLAS_RIESGO y la
+clasificación se calcula vectorizada sobre columnas completas con NumPy,
+en lugar de recorrer el DataFrame fila por fila.
+"""
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Cada regla suma puntos según el tramo en que cae el indicador.
+# Los umbrales son estrictos: un valor suma puntos[i] si umbrales[i-1] < valor <= umbrales[i].
+# Valores faltantes (NaN) no suman puntos.
+REGLAS_RIESGO: List[Dict] = [
+    {'columna': 'FPD_Actual',     'umbrales': [5, 8, 15], 'puntos': [0, 1, 2, 3]},
+    {'columna': 'ICV_Actual',     'umbrales': [3, 6, 10], 'puntos': [0, 1, 2, 3]},
+    {'columna': 'Tasa_Morosidad', 'umbrales': [2, 5, 10], 'puntos': [0, 1, 2, 3]},
+]
+
+# Nivel según el puntaje total: Bajo < 3 <= Medio < 6 <= Alto
+NIVELES_RIESGO: Dict = {
+    'umbrales': [3, 6],
+    'etiquetas': ['Bajo', 'Medio', 'Alto'],
+}
+
+
+def puntaje_riesgo(df: pd.DataFrame, reglas: List[Dict] = REGLAS_RIESGO) -> np.ndarray:
+    """
+    Calcula el puntaje de riesgo de todas las filas a la vez.
+
+    Args:
+        df: DataFrame con las columnas referenciadas por las reglas
+        reglas: Tabla de reglas (por defecto REGLAS_RIESGO)
+
+    Returns:
+        Arreglo de enteros con el puntaje de cada fila
+    """
+    score = np.zeros(len(df), dtype=np.int64)
+    for regla in reglas:
+        valores = df[regla['columna']].to_numpy(dtype=np.float64)
+        tramo = np.digitize(valores, regla['umbrales'], right=True)
+        puntos = np.asarray(regla['puntos'], dtype=np.int64)[tramo]
+        score += np.where(np.isnan(valores), 0, puntos)
+    return score
+
+
+def clasificar_riesgo(df: pd.DataFrame, reglas: List[Dict] = REGLAS_RIESGO,
+                      niveles: Dict = NIVELES_RIESGO) -> pd.Series:
+    """
+    Asigna el nivel de riesgo ('Alto', 'Medio', 'Bajo') a cada sucursal.
+
+    Args:
+        df: DataFrame de sucursales
+        reglas: Tabla de reglas de puntaje
+        niveles: Umbrales de puntaje y etiquetas de cada nivel
+
+    Returns:
+        Serie con el nivel de riesgo, alineada al índice de df
+    """
+    score = puntaje_riesgo(df, reglas)
+    idx = np.digitize(score, niveles['umbrales'], right=False)
+    etiquetas = np.asarray(niveles['etiquetas'], dtype=object)
+    return pd.Series(etiquetas[idx], index=df.index, name='Nivel_Riesgo')
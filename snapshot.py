@@ -0,0 +1,166 @@
+"""
+Snapshot columnar del libro de Excel de sucursales.
+
+El libro se convierte una sola vez a Parquet (un archivo por hoja) y se guarda
+en disco identificado por la huella del archivo fuente. Los arranques
+posteriores leen el Parquet con memory-map en lugar de volver a parsear el XML
+con openpyxl. Si el libro cambia, el snapshot se reconstruye automáticamente.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Directorio donde se guardan los snapshots (configurable por variable de entorno)
+SNAPSHOT_DIR = os.getenv("RETO_SNAPSHOT_DIR", ".snapshot")
+
+# Se incrementa si cambia la forma en que se escribe el snapshot
+FORMATO_SNAPSHOT = 1
+
+MANIFEST = "manifest.json"
+
+
+def _hash_archivo(ruta: str) -> str:
+    """Calcula el SHA-256 del contenido del archivo"""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _directorio_base(ruta_excel: str) -> str:
+    nombre = os.path.splitext(os.path.basename(ruta_excel))[0]
+    return os.path.join(SNAPSHOT_DIR, nombre)
+
+
+def _leer_manifest(directorio: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(directorio, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_manifest(directorio: str, manifest: Dict):
+    tmp = os.path.join(directorio, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, os.path.join(directorio, MANIFEST))
+
+
+def _construir_snapshot(ruta_excel: str, directorio: str, huella: Dict) -> Dict:
+    """Parsea el libro completo una vez y escribe cada hoja como Parquet"""
+    hojas = pd.read_excel(ruta_excel, sheet_name=None)
+
+    os.makedirs(os.path.dirname(directorio) or ".", exist_ok=True)
+    destino = os.path.join(directorio, huella["sha256"][:16])
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=os.path.dirname(directorio) or ".")
+    try:
+        archivos = {}
+        for i, (hoja, df) in enumerate(hojas.items()):
+            archivo = f"hoja_{i:02d}.parquet"
+            df.to_parquet(os.path.join(tmp, archivo), index=False)
+            archivos[hoja] = archivo
+
+        # Reemplazar cualquier versión anterior del snapshot
+        if os.path.isdir(directorio):
+            shutil.rmtree(directorio)
+        os.makedirs(directorio)
+        os.replace(tmp, destino)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    manifest = {
+        "formato": FORMATO_SNAPSHOT,
+        "fuente": os.path.abspath(ruta_excel),
+        **huella,
+        "hojas": archivos,
+    }
+    _escribir_manifest(directorio, manifest)
+    return manifest
+
+
+def asegurar_snapshot(ruta_excel: str) -> Dict:
+    """
+    Devuelve el manifest de un snapshot vigente para el libro, construyéndolo
+    si no existe o si el archivo fuente cambió.
+
+    La validación rápida compara tamaño y mtime; solo si difieren se recalcula
+    el hash del contenido para decidir si hace falta reconstruir.
+    """
+    directorio = _directorio_base(ruta_excel)
+    stat = os.stat(ruta_excel)
+    manifest = _leer_manifest(directorio)
+
+    vigente = (
+        manifest is not None
+        and manifest.get("formato") == FORMATO_SNAPSHOT
+        and os.path.isdir(os.path.join(directorio, manifest["sha256"][:16]))
+    )
+
+    if vigente and manifest["size"] == stat.st_size and manifest["mtime_ns"] == stat.st_mtime_ns:
+        return manifest
+
+    sha256 = _hash_archivo(ruta_excel)
+    huella = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+
+    if vigente and manifest["sha256"] == sha256:
+        # Mismo contenido con otro mtime (p. ej. checkout de git): solo actualizar la huella
+        manifest.update(huella)
+        _escribir_manifest(directorio, manifest)
+        return manifest
+
+    return _construir_snapshot(ruta_excel, directorio, huella)
+
+
+def version_snapshot(ruta_excel: str) -> str:
+    """Identificador corto del contenido actual del libro"""
+    return asegurar_snapshot(ruta_excel)["sha256"][:16]
+
+
+def ruta_hoja(ruta_excel: str, hoja: str) -> str:
+    """Ruta del archivo Parquet que contiene una hoja del libro"""
+    manifest = asegurar_snapshot(ruta_excel)
+    if hoja not in manifest["hojas"]:
+        raise KeyError(f"La hoja '{hoja}' no existe en {ruta_excel}")
+    return os.path.join(
+        _directorio_base(ruta_excel), manifest["sha256"][:16], manifest["hojas"][hoja]
+    )
+
+
+def leer_hoja(ruta_excel: str, hoja: str, columnas: Optional[List[str]] = None,
+              filtros=None) -> pd.DataFrame:
+    """
+    Lee una hoja del libro desde su snapshot Parquet (memory-mapped).
+
+    Args:
+        ruta_excel: Ruta del libro de Excel fuente
+        hoja: Nombre de la hoja
+        columnas: Subconjunto de columnas a leer (None = todas)
+        filtros: Filtros de filas en formato pyarrow, p. ej. [('Sucursal', 'in', [...])]
+
+    Returns:
+        DataFrame con los datos solicitados
+    """
+    try:
+        ruta = ruta_hoja(ruta_excel, hoja)
+    except OSError as e:
+        # Sin permisos de escritura u otro problema de disco: leer directo del Excel
+        print(f"⚠️ No se pudo usar el snapshot ({e}); leyendo {ruta_excel} directamente")
+        tabla = pa.Table.from_pandas(pd.read_excel(ruta_excel, sheet_name=hoja), preserve_index=False)
+        if filtros:
+            tabla = tabla.filter(pq.filters_to_expression(filtros))
+        if columnas is not None:
+            tabla = tabla.select(columnas)
+        return tabla.to_pandas()
+
+    tabla = pq.read_table(ruta, columns=columnas, filters=filtros, memory_map=True)
+    return tabla.to_pandas()
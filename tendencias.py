@@ -0,0 +1,120 @@
+"""
+Tendencias lineales de todas las sucursales y métricas del panel histórico.
+
+Las pendientes, interceptos y R² de la regresión lineal simple (valor contra
+periodo) se calculan de una vez, vectorizados sobre el arreglo
+sucursal × familia × periodo. La página de detalle solo consulta la tabla y la
+página principal la reutiliza para el ranking de sucursales que más rápido se
+deterioran.
+"""
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Familias donde una pendiente positiva significa deterioro
+FAMILIAS_DETERIORO = ["ICV", "FPD", "Saldo Insoluto Vencido", "Saldo 30-89", "Castigos", "Quitas"]
+
+
+class TablaTendencias:
+    """
+    Resultado de la regresión por sucursal y familia.
+
+    Args:
+        sucursales: Nombres de sucursal (filas)
+        familias: Familias de métricas (columnas)
+        periodos: Número de periodos usados en el ajuste
+        pendiente, intercepto, r2, nivel: Arreglos de forma (sucursales, familias)
+    """
+
+    def __init__(self, sucursales: List[str], familias: List[str], periodos: int,
+                 pendiente: np.ndarray, intercepto: np.ndarray, r2: np.ndarray, nivel: np.ndarray):
+        self.sucursales = pd.Index(sucursales)
+        self.familias = list(familias)
+        self.periodos = periodos
+        self.pendiente = pendiente
+        self.intercepto = intercepto
+        self.r2 = r2
+        # Promedio de la serie; sirve para expresar la pendiente en % del nivel
+        self.nivel = nivel
+        self._familia = {f: j for j, f in enumerate(self.familias)}
+
+    @classmethod
+    def desde_panel(cls, panel) -> 'TablaTendencias':
+        """
+        Ajusta y = intercepto + pendiente * t (t = 0 … periodos-1) para todas
+        las series del panel en una sola pasada. Los NaN se ignoran.
+        """
+        y = panel.valores.astype(np.float64)
+        t = np.arange(y.shape[-1], dtype=np.float64)
+        validos = ~np.isnan(y)
+        tv = np.where(validos, t, 0.0)
+        yv = np.where(validos, y, 0.0)
+
+        n = validos.sum(axis=-1)
+        sum_x = tv.sum(axis=-1)
+        sum_y = yv.sum(axis=-1)
+        sum_xy = (tv * yv).sum(axis=-1)
+        sum_x2 = (tv ** 2).sum(axis=-1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pendiente = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x ** 2)
+            intercepto = (sum_y - pendiente * sum_x) / n
+            nivel = sum_y / n
+
+            ajuste = intercepto[..., None] + pendiente[..., None] * t
+            ss_res = np.where(validos, (y - ajuste) ** 2, 0.0).sum(axis=-1)
+            ss_tot = np.where(validos, (y - nivel[..., None]) ** 2, 0.0).sum(axis=-1)
+            r2 = np.where(ss_tot > 0, 1 - ss_res / ss_tot, np.nan)
+
+        return cls(panel.sucursales, panel.familias, y.shape[-1],
+                   pendiente, intercepto, r2, nivel)
+
+    def de(self, sucursal: str, familia: str):
+        """(pendiente, intercepto, r2) de una sucursal y familia"""
+        i = self.sucursales.get_loc(sucursal)
+        j = self._familia[familia]
+        return self.pendiente[i, j], self.intercepto[i, j], self.r2[i, j]
+
+    def linea(self, sucursal: str, familia: str) -> np.ndarray:
+        """Valores de la recta ajustada en cada periodo"""
+        pendiente, intercepto, _ = self.de(sucursal, familia)
+        return intercepto + pendiente * np.arange(self.periodos)
+
+    def ranking(self, familia: str, k: int = 10, sucursales: Optional[Iterable[str]] = None,
+                relativa: bool = False) -> pd.DataFrame:
+        """
+        Sucursales con mayor pendiente (deterioro más rápido) en una familia.
+
+        Args:
+            familia: Familia de métricas
+            k: Número de sucursales a devolver
+            sucursales: Restringir el ranking a estas sucursales (None = todas)
+            relativa: Ordenar por pendiente como % del nivel promedio de la serie
+                (útil para montos en $, que dependen del tamaño de la sucursal)
+
+        Returns:
+            DataFrame con Sucursal, Pendiente, Pendiente_Relativa y R2
+        """
+        j = self._familia[familia]
+        if sucursales is None:
+            filas = np.arange(len(self.sucursales))
+        else:
+            filas = self.sucursales.get_indexer(pd.Index(sucursales))
+            filas = filas[filas >= 0]
+
+        pendiente = self.pendiente[filas, j]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            relativa_pct = pendiente / np.abs(self.nivel[filas, j]) * 100
+        clave = relativa_pct if relativa else pendiente
+        clave = np.where(np.isnan(clave), -np.inf, clave)
+
+        k = min(k, len(filas))
+        top = np.argpartition(-clave, k - 1)[:k] if k > 0 else np.empty(0, dtype=int)
+        top = top[np.argsort(-clave[top], kind='stable')]
+        return pd.DataFrame({
+            'Sucursal': self.sucursales[filas[top]],
+            'Pendiente': pendiente[top],
+            'Pendiente_Relativa': relativa_pct[top],
+            'R2': self.r2[filas[top], j],
+        })
@@ -0,0 +1,103 @@
+"""
+Tiempos de rerun del dashboard por sección.
+
+Las secciones con controles propios (mapa, Top 10, ranking, deterioro,
+sucursales cercanas y chat) son fragmentos de Streamlit: al usar sus
+controles solo se vuelve a ejecutar la función de la sección, no todo el
+script. cronometrar() guarda en la sesión cuánto tardó la última ejecución
+de cada sección y del script completo, para comparar un rerun completo
+contra el de un fragmento. Con DASHBOARD_TIEMPOS=1 cada sección muestra
+además su tiempo al final.
+
+Cada duración se anota también en el almacén del proceso (metricas.py). El
+panel de rendimiento (DASHBOARD_TIEMPOS=1 o ?tiempos=1 en la URL) muestra
+p50/p95 por sección de la sesión y del proceso, y permite descargar el
+resumen en formato Prometheus o JSON.
+"""
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from metricas import METRICAS, resumir
+
+MOSTRAR_TIEMPOS = os.getenv("DASHBOARD_TIEMPOS", "0") == "1"
+# Nombre con el que se anota el rerun completo del script
+SCRIPT_COMPLETO = "Script completo"
+# Duraciones recientes por sección que se conservan en la sesión
+VENTANA_SESION = 200
+
+
+def tiempos_sesion() -> Dict[str, Dict]:
+    """
+    {sección: {'ms': duración de la última ejecución, 'ejecuciones': número de
+    ejecuciones, 'muestras': últimas VENTANA_SESION duraciones}}
+    """
+    if 'tiempos_rerun' not in st.session_state:
+        st.session_state.tiempos_rerun = {}
+    return st.session_state.tiempos_rerun
+
+
+@contextmanager
+def cronometrar(seccion: str, mostrar: bool = True) -> Iterator[None]:
+    """
+    Anota la duración del bloque como la última ejecución de la sección.
+
+    Si el bloque termina con st.rerun() (una excepción de control de
+    Streamlit) también se anota, pero no se escribe nada en la página.
+    Con mostrar=False tampoco se escribe el tiempo con DASHBOARD_TIEMPOS=1
+    (para partes de una sección, como una gráfica o una llamada a Gemini).
+    """
+    inicio = time.perf_counter()
+    completo = False
+    try:
+        yield
+        completo = True
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        METRICAS.registrar(seccion, ms)
+        # Fuera de un rerun (hilos de lote, scripts) solo se anota en el proceso
+        if get_script_run_ctx(suppress_warning=True) is not None:
+            registro = tiempos_sesion().setdefault(seccion, {'ms': 0.0, 'ejecuciones': 0})
+            registro['ms'] = ms
+            registro['ejecuciones'] += 1
+            registro.setdefault('muestras', deque(maxlen=VENTANA_SESION)).append(ms)
+            if completo and mostrar and MOSTRAR_TIEMPOS:
+                st.caption(f"⏱️ {seccion}: {ms:,.0f} ms")
+
+
+def _tabla(resumen: Dict[str, Dict]) -> pd.DataFrame:
+    filas = [{'Sección': seccion, 'p50 (ms)': r['p50'], 'p95 (ms)': r['p95'],
+              'Última (ms)': r['ultimo'], 'Ejecuciones': r['n']} for seccion, r in resumen.items()]
+    return pd.DataFrame(filas).sort_values('p95 (ms)', ascending=False) if filas else pd.DataFrame()
+
+
+def panel_tiempos():
+    """
+    Panel de rendimiento en la barra lateral: p50/p95 por sección de la
+    sesión y del proceso. Solo se dibuja con DASHBOARD_TIEMPOS=1 o ?tiempos=1.
+    """
+    if not (MOSTRAR_TIEMPOS or st.query_params.get("tiempos") == "1"):
+        return
+    sesion = {s: resumir(r.get('muestras', [r['ms']])) for s, r in tiempos_sesion().items()}
+    proceso = METRICAS.resumen()
+    formato = {c: st.column_config.NumberColumn(format="%.1f") for c in ('p50 (ms)', 'p95 (ms)', 'Última (ms)')}
+    with st.sidebar.expander("⏱️ Rendimiento por sección"):
+        tab_sesion, tab_proceso = st.tabs(["Sesión", "Proceso"])
+        with tab_sesion:
+            st.dataframe(_tabla(sesion), hide_index=True, column_config=formato)
+        with tab_proceso:
+            st.dataframe(_tabla(proceso), hide_index=True, column_config=formato)
+            st.caption(f"Últimas {METRICAS.ventana} ejecuciones por sección de todas las sesiones")
+        col_prom, col_json = st.columns(2)
+        with col_prom:
+            st.download_button("Prometheus", METRICAS.prometheus(), file_name="dashboard_metricas.prom",
+                               mime="text/plain")
+        with col_json:
+            st.download_button("JSON", METRICAS.json(), file_name="dashboard_metricas.json",
+                               mime="application/json")